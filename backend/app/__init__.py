@@ -1,8 +1,10 @@
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, verify_jwt_in_request, get_jwt
 from .config import Config
 import os
+import hmac
+import time
 
 jwt = JWTManager()
 
@@ -26,11 +28,59 @@ def create_app(config_class=Config):
     from .routes.forecast import forecast_bp
     from .routes.data import data_bp
     from .routes.admin import admin_bp
+    from .routes.reports import reports_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(forecast_bp, url_prefix='/api/forecast')
     app.register_blueprint(data_bp, url_prefix='/api/data')
     app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    
+    # Every request reads one dataset version, pinned until it ends
+    from .services.excel_handler import excel_handler
+    
+    @app.before_request
+    def pin_dataset_version():
+        g.dataset_pin = excel_handler.versions.acquire()
+    
+    @app.teardown_request
+    def release_dataset_version(exc):
+        pin = g.pop('dataset_pin', None)
+        if pin is not None:
+            excel_handler.versions.release(pin)
+    
+    # Request counts, latency and payload sizes per route
+    from .services.metrics import metrics
+    metrics.directory = app.config.get('METRICS_DIR') or os.path.join(app.config['RUNTIME_DIR'], 'metrics')
+    
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+    
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            metrics.observe_request(
+                request.blueprint or '',
+                request.url_rule.rule if request.url_rule else 'unmatched',
+                request.method,
+                response.status_code,
+                time.perf_counter() - started,
+                request.content_length or 0,
+                response.content_length or 0
+            )
+        return response
+    
+    from .utils.uploads import UploadTooLarge
+    
+    @app.errorhandler(413)
+    @app.errorhandler(UploadTooLarge)
+    def upload_too_large(e):
+        return jsonify({
+            'success': False,
+            'message': f"File too large (max {app.config.get('MAX_UPLOAD_MB', 16)} MB)"
+        }), 413
     
     # Health check endpoint for Railway
     @app.route('/api/health')
@@ -41,6 +91,20 @@ def create_app(config_class=Config):
             'environment': os.environ.get('RAILWAY_ENVIRONMENT', 'development')
         }), 200
     
+    # Prometheus scrape endpoint, totals over all workers
+    @app.route('/api/metrics')
+    def metrics_endpoint():
+        token = app.config.get('METRICS_TOKEN')
+        if token:
+            if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+                return jsonify({'success': False, 'message': 'Invalid metrics token'}), 401
+        else:
+            # Without a scrape token, admins only (as the admin routes)
+            verify_jwt_in_request()
+            if not get_jwt().get('is_admin', False):
+                return jsonify({'success': False, 'message': 'Admin required'}), 403
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+    
     # API root endpoint
     @app.route('/api')
     def api_root():
@@ -1,6 +1,19 @@
 import os
+import hashlib
+import tempfile
 from datetime import timedelta
 
+
+def runtime_dir(data_dir):
+    """
+    Default directory for runtime state (job records, worker metrics) of
+    the app serving data_dir: outside the data tree, shared by the workers
+    of one deployment
+    """
+    digest = hashlib.sha1(os.path.abspath(data_dir).encode()).hexdigest()[:10]
+    return os.path.join(tempfile.gettempdir(), f"dkn-forecast-{digest}")
+
+
 class Config:
     # Server settings - Railway provides PORT
     PORT = int(os.environ.get('PORT', 5000))
@@ -35,10 +48,32 @@ class Config:
     # Data storage
     DATA_DIR = os.environ.get('DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
     
+    # Runtime state, kept out of DATA_DIR (see runtime_dir)
+    RUNTIME_DIR = os.environ.get('RUNTIME_DIR') or runtime_dir(DATA_DIR)
+    
+    # Published dataset versions kept on disk (the live one always is)
+    DATASET_VERSIONS_KEEP = int(os.environ.get('DATASET_VERSIONS_KEEP', 3))
+    
     # Upload settings
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    # Uploads are spooled to disk in chunks, so large caps do not cost memory
+    MAX_UPLOAD_MB = int(os.environ.get('MAX_UPLOAD_MB', 16))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_MB * 1024 * 1024
     ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
     
+    # Background ingestion: job records, concurrent jobs, parser processes
+    # (sheets of one workbook parse concurrently, up to INGEST_PARSE_PROCESSES)
+    JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(RUNTIME_DIR, 'jobs'))
+    INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', 1))
+    INGEST_PARSE_PROCESSES = int(os.environ.get('INGEST_PARSE_PROCESSES', 2))
+    MAX_BULK_UNCOMPRESSED = int(os.environ.get('MAX_BULK_UNCOMPRESSED', 512 * 1024 * 1024))
+    
+    # Metrics: per-process values are shared through METRICS_DIR (default
+    # RUNTIME_DIR/metrics) so /api/metrics reports all gunicorn workers;
+    # with METRICS_TOKEN set, scrapes need 'Authorization: Bearer <token>',
+    # otherwise an admin JWT
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
     # Environment detection
     RAILWAY_ENVIRONMENT = os.environ.get('RAILWAY_ENVIRONMENT', 'development')
     DEBUG = RAILWAY_ENVIRONMENT == 'development'
@@ -0,0 +1 @@
+from .dataset import SeriesBlock, ProductDataset
@@ -0,0 +1,181 @@
+import numpy as np
+
+
+class SeriesBlock:
+    """
+    One data type of one series (a product's baseline, an APS class's
+    actuals, ...) for every year: a sorted int year index and a contiguous
+    (years, periods) float array. Weekly years shorter than the block are
+    NaN-padded and `lengths` keeps each year's period count. Blocks of a
+    rolling forecast also carry the closed periods per year.
+
+    Reads like a {year: values} mapping; year lookups accept int or str
+    keys in O(1) and return array views.
+    """
+
+    __slots__ = ('years', 'values', 'lengths', 'closed', '_index')
+
+    def __init__(self, years, values, lengths=None, closed=None):
+        self.years = np.asarray(years, dtype=np.int64)
+        self.values = np.ascontiguousarray(values, dtype=float)
+        if lengths is None:
+            lengths = np.full(len(self.years), self.values.shape[1], dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.closed = None if closed is None else np.asarray(closed, dtype=np.int64)
+        self._index = {int(y): i for i, y in enumerate(self.years)}
+
+    @classmethod
+    def from_yearly(cls, yearly, periods=None):
+        """Build from a {year: [values]} dict; year keys may be strings"""
+        items = sorted((int(y), v) for y, v in (yearly or {}).items())
+        width = periods or max((len(v) for _, v in items), default=12)
+        values = np.full((len(items), width), np.nan)
+        lengths = np.zeros(len(items), dtype=np.int64)
+        for r, (_, v) in enumerate(items):
+            n = min(len(v), width)
+            values[r, :n] = np.asarray(v[:n], dtype=float)
+            lengths[r] = n
+        return cls([y for y, _ in items], values, lengths)
+
+    @property
+    def periods(self):
+        return self.values.shape[1]
+
+    def __len__(self):
+        return len(self.years)
+
+    def __contains__(self, year):
+        return self._row(year) is not None
+
+    def __getitem__(self, year):
+        i = self._row(year)
+        if i is None:
+            raise KeyError(year)
+        return self.values[i, :self.lengths[i]]
+
+    def _row(self, year):
+        try:
+            return self._index.get(int(year))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, year, default=None):
+        """Values for year as an array view, or default"""
+        i = self._row(year)
+        return default if i is None else self.values[i, :self.lengths[i]]
+
+    def keys(self):
+        return [int(y) for y in self.years]
+
+    def items(self):
+        for i, y in enumerate(self.years):
+            yield int(y), self.values[i, :self.lengths[i]]
+
+    def closed_for(self, year):
+        """Closed periods for year in a rolling-forecast block (0 otherwise)"""
+        i = self._row(year)
+        if i is None or self.closed is None:
+            return 0
+        return int(self.closed[i])
+
+    def to_dict(self):
+        """{year: [values]} for JSON, NaN as 0.0"""
+        return {
+            year: np.nan_to_num(values, nan=0.0).tolist()
+            for year, values in self.items()
+        }
+
+    def closed_dict(self):
+        return {int(y): int(c) for y, c in zip(self.years, self.closed)} if self.closed is not None else {}
+
+
+class ProductDataset:
+    """
+    Everything loaded for one product: SeriesBlocks for the product-level
+    baseline, actuals, delivered and market share, one block per APS class
+    for each of baseline / actuals / delivered, and the weights both as read
+    and resolved into WeightTables. Weekly products resolve one table per
+    year, as weeks fall in different calendar months from year to year.
+    """
+
+    __slots__ = (
+        'product', 'periods', 'baseline', 'actual', 'delivered', 'market_share',
+        'aps', 'aps_actual', 'aps_delivered', 'weights', 'weight_table', 'weight_tables', 'stacked'
+    )
+
+    EMPTY = SeriesBlock([], np.zeros((0, 12)))
+
+    def __init__(
+        self,
+        product,
+        baseline=None,
+        actual=None,
+        delivered=None,
+        market_share=None,
+        aps=None,
+        aps_actual=None,
+        aps_delivered=None,
+        weights=None,
+        weight_table=None,
+        weight_tables=None
+    ):
+        self.product = product
+        self.baseline = baseline if baseline is not None else self.EMPTY
+        self.actual = actual if actual is not None else self.EMPTY
+        self.delivered = delivered if delivered is not None else self.EMPTY
+        self.market_share = market_share if market_share is not None else self.EMPTY
+        self.aps = aps or {}
+        self.aps_actual = aps_actual or {}
+        self.aps_delivered = aps_delivered or {}
+        self.weights = weights
+        self.weight_table = weight_table
+        self.weight_tables = weight_tables or {}
+        self.periods = max(
+            [b.periods for b in [self.baseline, *self.aps.values()] if len(b)],
+            default=12
+        )
+        self.stacked = self._stack()
+
+    def series(self, kind='baseline', aps_class=None):
+        """SeriesBlock for a data type, product-level or one APS class"""
+        if aps_class is None:
+            return getattr(self, kind)
+        kinds = {'baseline': self.aps, 'actual': self.aps_actual, 'delivered': self.aps_delivered}
+        return kinds[kind].get(aps_class, self.EMPTY)
+
+    def weights_for(self, year):
+        """WeightTable for simulating one year (the yearless table for monthly data)"""
+        return self.weight_tables.get(int(year), self.weight_table)
+
+    def with_baseline(self, baseline, aps):
+        """Copy sharing everything but the baseline blocks (rolling forecasts)"""
+        return ProductDataset(
+            self.product, baseline, self.actual, self.delivered, self.market_share,
+            aps, self.aps_actual, self.aps_delivered, self.weights, self.weight_table,
+            self.weight_tables
+        )
+
+    def _stack(self):
+        """
+        APS baselines as one block for batch simulation:
+        {'aps': [names], 'years': [sorted years],
+         'values': (aps, years, periods) array, NaN where missing,
+         'closed': (aps, years) closed periods, rolling blocks only}
+        """
+        names = sorted(self.aps)
+        years = sorted({int(y) for block in self.aps.values() for y in block.years})
+        year_idx = {y: i for i, y in enumerate(years)}
+        values = np.full((len(names), len(years), self.periods), np.nan)
+        closed = np.zeros((len(names), len(years)), dtype=np.int64)
+        rolling = False
+        for a, aps in enumerate(names):
+            block = self.aps[aps]
+            cols = [year_idx[int(y)] for y in block.years]
+            values[a, cols, :block.periods] = block.values
+            if block.closed is not None:
+                closed[a, cols] = block.closed
+                rolling = True
+        stacked = {'aps': names, 'years': years, 'values': values}
+        if rolling:
+            stacked['closed'] = closed
+        return stacked
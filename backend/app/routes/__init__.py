@@ -1,4 +1,5 @@
 from .auth import auth_bp
 from .forecast import forecast_bp
 from .data import data_bp
-from .admin import admin_bp
\ No newline at end of file
+from .admin import admin_bp
+from .reports import reports_bp
\ No newline at end of file
@@ -1,10 +1,15 @@
 from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt
+import io
 import os
 import tempfile
 
 from ..services.excel_handler import excel_handler
-from ..utils.constants import PRODUCT_APS_MAPPING, EXCEL_SHEETS
+from ..services.calibration import calibration_service
+from ..services.aggregates import aggregate_service
+from ..services.ingestion import ingestion_service
+from ..utils.constants import PRODUCT_APS_MAPPING, EXCEL_SHEETS, XLSX_MIMETYPE
+from ..utils.uploads import spool_upload, upload_extension, UploadTooLarge
 from ..config import Config
 
 admin_bp = Blueprint('admin', __name__)
@@ -17,7 +22,7 @@ def admin_required():
 @admin_bp.route('/upload', methods=['POST'])
 @jwt_required()
 def upload_data():
-    """Upload Excel file with product data"""
+    """Queue an Excel file with product data for background ingestion"""
     if not admin_required():
         return jsonify({'success': False, 'message': 'Admin required'}), 403
     
@@ -35,74 +40,56 @@ def upload_data():
     if not file.filename.endswith(('.xlsx', '.xls')):
         return jsonify({'success': False, 'message': 'File must be Excel (.xlsx or .xls)'}), 400
     
-    try:
-        import pandas as pd
-        import os
-        
-        # Read Excel file directly from the upload
-        xl = pd.ExcelFile(file)
-        available_sheets = xl.sheet_names
-        
-        files_created = []
-        warnings = []
-        
-        # Ensure data directory exists
-        data_dir = current_app.config.get('DATA_DIR', 'data')
-        os.makedirs(data_dir, exist_ok=True)
-        
-        # Helper for case-insensitive sheet matching
-        def find_sheet(name):
-            name_lower = name.lower().replace(' ', '')
-            for sheet in available_sheets:
-                if sheet.lower().replace(' ', '') == name_lower:
-                    return sheet
-            return None
-        
-        # Helper to save CSV
-        def save_csv(sheet_name, output_name):
-            sheet = find_sheet(sheet_name)
-            if sheet:
-                df = pd.read_excel(xl, sheet_name=sheet)
-                if aps_class and sheet_name not in ['Weights', 'MarketShare']:
-                    output_path = os.path.join(data_dir, f"{product_code}_{aps_class}_{output_name}.csv")
-                else:
-                    output_path = os.path.join(data_dir, f"{product_code}_{output_name}.csv")
-                df.to_csv(output_path, index=False)
-                files_created.append(f"{sheet_name}: {os.path.basename(output_path)}")
-                return True
-            return False
-        
-        # Process required sheets
-        if not save_csv('Baseline', 'post_processed'):
-            return jsonify({
-                'success': False,
-                'message': f'Baseline sheet not found. Available sheets: {available_sheets}'
-            }), 400
-        
-        # Process optional sheets
-        if aps_class is None:
-            if not save_csv('Weights', 'weights'):
-                warnings.append('Weights sheet not found')
-            save_csv('MarketShare', 'market_share')
-        
-        save_csv('Actuals', 'actual')
-        save_csv('Delivered', 'Delivered')
-        
-        return jsonify({
-            'success': True,
-            'message': f'Data uploaded for {product_code}',
-            'files_created': files_created,
-            'warnings': warnings
-        }), 200
-        
-    except Exception as e:
-        import traceback
-        print(f"Upload error: {e}")
-        traceback.print_exc()
-        return jsonify({
-            'success': False,
-            'message': str(e)
-        }), 500
+    job = ingestion_service.submit(file, product_code, aps_class)
+    
+    return jsonify({
+        'success': True,
+        'message': f'Upload queued for {product_code}',
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/admin/jobs/{job['id']}"
+    }), 202
+
+@admin_bp.route('/upload/bulk', methods=['POST'])
+@jwt_required()
+def upload_bulk():
+    """
+    Queue a zip of workbooks, or one workbook covering many products, for
+    background ingestion as a single job (see IngestionService.submit_bulk
+    for how sheets are routed to products and APS classes)
+    """
+    if not admin_required():
+        return jsonify({'success': False, 'message': 'Admin required'}), 403
+    
+    if 'file' not in request.files:
+        return jsonify({'success': False, 'message': 'No file provided'}), 400
+    
+    file = request.files['file']
+    if not file.filename.lower().endswith(('.zip', '.xlsx', '.xls')):
+        return jsonify({'success': False, 'message': 'File must be a .zip or Excel workbook'}), 400
+    
+    job = ingestion_service.submit_bulk(file)
+    
+    return jsonify({
+        'success': True,
+        'message': f'Bulk upload queued from {file.filename}',
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': f"/api/admin/jobs/{job['id']}"
+    }), 202
+
+@admin_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_job(job_id):
+    """Status, progress and per-sheet timings of an ingestion job"""
+    if not admin_required():
+        return jsonify({'success': False, 'message': 'Admin required'}), 403
+    
+    job = ingestion_service.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': f'Unknown job {job_id}'}), 404
+    
+    return jsonify({'success': True, 'job': job}), 200
 
 @admin_bp.route('/template', methods=['GET'])
 @jwt_required()
@@ -118,9 +105,9 @@ def download_template():
     include_aps = request.args.get('include_aps', 'false').lower() == 'true'
     
     try:
-        template_path = excel_handler.generate_template_excel(product_code, include_aps)
         return send_file(
-            template_path,
+            io.BytesIO(excel_handler.generate_template_excel(product_code, include_aps)),
+            mimetype=XLSX_MIMETYPE,
             as_attachment=True,
             download_name=f'{product_code}_template.xlsx'
         )
@@ -183,39 +170,101 @@ def delete_product(product):
     deleted_files = []
     errors = []
     
-    data_dir = Config.DATA_DIR
-    
-    if not os.path.exists(data_dir):
+    if not os.path.exists(excel_handler.data_dir):
         return jsonify({
             'success': True,
             'deleted_files': [],
             'errors': []
         }), 200
     
+    # Remove the files from a staged version, published in one step
     if aps_class:
         pattern = f"{product}_{aps_class.replace(' ', '_')}_"
-        for filename in os.listdir(data_dir):
-            if filename.startswith(pattern):
-                try:
-                    os.remove(os.path.join(data_dir, filename))
-                    deleted_files.append(filename)
-                except Exception as e:
-                    errors.append(f"Failed to delete {filename}: {str(e)}")
     else:
-        for filename in os.listdir(data_dir):
-            if filename.startswith(f"{product}_"):
+        pattern = f"{product}_"
+    with excel_handler.versions.commit() as staged:
+        for filename in os.listdir(staged):
+            if filename.startswith(pattern):
                 try:
-                    os.remove(os.path.join(data_dir, filename))
+                    os.remove(os.path.join(staged, filename))
                     deleted_files.append(filename)
                 except Exception as e:
                     errors.append(f"Failed to delete {filename}: {str(e)}")
     
+    # This request stays pinned to the old version; build the new one's aggregates
+    if deleted_files:
+        with staged.pin():
+            aggregate_service.refresh()
+    
     return jsonify({
         'success': len(errors) == 0,
         'deleted_files': deleted_files,
         'errors': errors
     }), 200 if len(errors) == 0 else 207
 
+@admin_bp.route('/calibration', methods=['POST'])
+@jwt_required()
+def run_calibration():
+    """Fit candidate weights from historical actuals"""
+    if not admin_required():
+        return jsonify({'success': False, 'message': 'Admin required'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        reports = calibration_service.run(
+            products=data.get('products'),
+            min_obs=int(data.get('min_obs', 3)),
+            tolerance=float(data.get('tolerance', 0.02))
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'reports': reports
+    }), 200
+
+@admin_bp.route('/calibration/<product>', methods=['GET'])
+@jwt_required()
+def preview_calibration(product):
+    """Candidate vs active weights with the fit report"""
+    if not admin_required():
+        return jsonify({'success': False, 'message': 'Admin required'}), 403
+    
+    preview = calibration_service.preview(product)
+    if preview is None:
+        return jsonify({'success': False, 'message': f'No candidate weights for {product}'}), 404
+    
+    return jsonify({'success': True, **preview}), 200
+
+@admin_bp.route('/calibration/<product>/promote', methods=['POST'])
+@jwt_required()
+def promote_calibration(product):
+    """Replace the active weights with the candidate"""
+    if not admin_required():
+        return jsonify({'success': False, 'message': 'Admin required'}), 403
+    
+    if not calibration_service.promote(product):
+        return jsonify({'success': False, 'message': f'No candidate weights for {product}'}), 404
+    
+    return jsonify({'success': True, 'product': product}), 200
+
+@admin_bp.route('/normalize-data', methods=['POST'])
+@jwt_required()
+def normalize_data():
+    """Rewrite data files saved before the canonical schema into it"""
+    if not admin_required():
+        return jsonify({'success': False, 'message': 'Admin required'}), 403
+    
+    with excel_handler.versions.commit() as staged:
+        rewritten = excel_handler.normalize_data_dir(staged.staging)
+    if rewritten:
+        with staged.pin():
+            aggregate_service.refresh()
+    
+    return jsonify({'success': True, 'rewritten': rewritten}), 200
+
 @admin_bp.route('/preview', methods=['POST'])
 @jwt_required()
 def preview_upload():
@@ -228,35 +277,13 @@ def preview_upload():
     
     file = request.files['file']
     
+    # Spool to disk so the read-only workbook streams from a file
+    fd, path = tempfile.mkstemp(suffix=upload_extension(file.filename or ''))
+    os.close(fd)
+    
     try:
-        import pandas as pd
-        import numpy as np
-        
-        xl = pd.ExcelFile(file)
-        sheets_preview = {}
-        
-        for sheet_name in xl.sheet_names:
-            df = pd.read_excel(xl, sheet_name=sheet_name)
-            
-            # Replace NaN with None for JSON serialization
-            df = df.replace({np.nan: None})
-            
-            # Convert to JSON-serializable format
-            preview_data = df.head(5).to_dict('records')
-            
-            # Convert any remaining non-serializable types
-            for row in preview_data:
-                for key, value in row.items():
-                    if isinstance(value, (np.integer, np.floating)):
-                        row[key] = float(value)
-                    elif pd.isna(value):
-                        row[key] = None
-            
-            sheets_preview[sheet_name] = {
-                'columns': [str(c) for c in df.columns.tolist()],
-                'row_count': len(df),
-                'preview': preview_data
-            }
+        spool_upload(file, path, current_app.config.get('MAX_CONTENT_LENGTH'))
+        sheets_preview = excel_handler.preview_workbook(path)
         
         return jsonify({
             'success': True,
@@ -264,6 +291,8 @@ def preview_upload():
             'expected_sheets': EXCEL_SHEETS
         }), 200
         
+    except UploadTooLarge:
+        raise
     except Exception as e:
         import traceback
         error_msg = str(e)
@@ -272,4 +301,7 @@ def preview_upload():
         return jsonify({
             'success': False,
             'message': error_msg
-        }), 400
\ No newline at end of file
+        }), 400
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
\ No newline at end of file
@@ -1,8 +1,9 @@
 import os
 import numpy as np
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required
 from ..services.excel_handler import excel_handler
+from ..services.data_store import data_store
 from ..utils.constants import PRODUCT_APS_MAPPING
 
 data_bp = Blueprint('data', __name__)
@@ -11,11 +12,20 @@ data_bp = Blueprint('data', __name__)
 @data_bp.route('/template/<product>', methods=['GET'])
 @jwt_required()
 def get_template(product):
-    """Generate and return template Excel file path"""
+    """
+    Generate the template Excel file for a product and return its path
+    on the server (downloads are served by /api/admin/template)
+    """
     include_aps = request.args.get('include_aps', 'false').lower() == 'true'
     
     try:
-        template_path = excel_handler.generate_template_excel(product, include_aps)
+        # Outside DATA_DIR, which only holds published dataset versions
+        directory = os.path.join(current_app.config['RUNTIME_DIR'], 'templates')
+        os.makedirs(directory, exist_ok=True)
+        template_path = os.path.join(directory, f"{product}_template.xlsx")
+        with open(f"{template_path}.tmp", 'wb') as f:
+            f.write(excel_handler.generate_template_excel(product, include_aps))
+        os.replace(f"{template_path}.tmp", template_path)
         return jsonify({
             'success': True,
             'template_path': template_path,
@@ -28,37 +38,54 @@ def get_template(product):
         }), 500
 
 
+def _series(product, kind, aps_class):
+    """SeriesBlock for a product data type, or None when nothing is loaded"""
+    dataset = data_store.product(product, aps_class)
+    if dataset is None:
+        return None
+    block = dataset.series(kind, aps_class)
+    return block if len(block) else None
+
+
+def _year_values(product, kind, year, key, not_found, no_year):
+    """JSON response with one year of a data type"""
+    aps_class = request.args.get('aps_class')
+    
+    block = _series(product, kind, aps_class)
+    if block is None:
+        return jsonify({
+            'success': False,
+            'message': not_found
+        }), 404
+    
+    values = block.get(year)
+    if values is None:
+        return jsonify({
+            'success': False,
+            'message': no_year
+        }), 404
+    
+    # Convert any NaN to 0
+    return jsonify({
+        'success': True,
+        key: np.nan_to_num(values, nan=0.0).tolist()
+    }), 200
+
+
 @data_bp.route('/years/<product>', methods=['GET'])
 @jwt_required()
 def get_available_years(product):
     """Get available years for a product"""
     aps_class = request.args.get('aps_class')
     
-    print(f"[DEBUG] ===== GET YEARS =====")
-    print(f"[DEBUG] Product: {product}, APS Class: {aps_class}")
-    
-    baseline_path = excel_handler.get_product_filename(product, 'post_processed', aps_class)
-    print(f"[DEBUG] Baseline path: {baseline_path}")
-    print(f"[DEBUG] File exists: {os.path.exists(baseline_path) if baseline_path else False}")
-    
-    # List files in data directory for debugging
-    data_dir = excel_handler.data_dir
-    if os.path.exists(data_dir):
-        files = [f for f in os.listdir(data_dir) if f.startswith(product)]
-        print(f"[DEBUG] Files for {product}: {files}")
-    
-    baseline_data = excel_handler.read_yearly_data(baseline_path)
-    print(f"[DEBUG] Baseline data keys: {list(baseline_data.keys()) if baseline_data else 'Empty'}")
-    
-    if baseline_data and len(baseline_data) > 0:
-        years = sorted(list(baseline_data.keys()), reverse=True)
-        print(f"[DEBUG] Returning years: {years}")
+    block = _series(product, 'baseline', aps_class)
+    if block is not None:
+        years = sorted(block.keys(), reverse=True)
         return jsonify({
             'success': True,
             'years': years
         }), 200
     
-    print(f"[DEBUG] No data found for {product}")
     return jsonify({
         'success': False,
         'years': [],
@@ -70,225 +97,72 @@ def get_available_years(product):
 @jwt_required()
 def get_baseline_data(product, year):
     """Get baseline data for a specific product and year"""
-    aps_class = request.args.get('aps_class')
-    
-    print(f"[DEBUG] ===== GET BASELINE =====")
-    print(f"[DEBUG] Product: {product}, Year: {year}, APS Class: {aps_class}")
-    
-    baseline_path = excel_handler.get_product_filename(product, 'post_processed', aps_class)
-    print(f"[DEBUG] Baseline path: {baseline_path}")
-    
-    if not baseline_path or not os.path.exists(baseline_path):
-        print(f"[DEBUG] File not found: {baseline_path}")
-        return jsonify({
-            'success': False,
-            'message': 'Baseline file not found'
-        }), 404
-    
-    yearly_data = excel_handler.read_yearly_data(baseline_path)
-    print(f"[DEBUG] Available years: {list(yearly_data.keys()) if yearly_data else 'None'}")
-    
-    if yearly_data and year in yearly_data:
-        baseline = yearly_data[year]
-        print(f"[DEBUG] Baseline for {year}: {baseline}")
-        
-        # Convert any NaN to 0
-        baseline = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in baseline]
-        
-        return jsonify({
-            'success': True,
-            'baseline': baseline
-        }), 200
-    
-    # Try integer conversion of year keys
-    if yearly_data:
-        for y in yearly_data.keys():
-            if int(y) == int(year):
-                baseline = yearly_data[y]
-                baseline = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in baseline]
-                print(f"[DEBUG] Found baseline with key conversion: {baseline}")
-                return jsonify({
-                    'success': True,
-                    'baseline': baseline
-                }), 200
-    
-    print(f"[DEBUG] No data for year {year}")
-    return jsonify({
-        'success': False,
-        'message': f'No data for year {year}'
-    }), 404
+    return _year_values(
+        product, 'baseline', year, 'baseline',
+        'Baseline file not found', f'No data for year {year}'
+    )
 
 
 @data_bp.route('/actuals/<product>/<int:year>', methods=['GET'])
 @jwt_required()
 def get_actuals_data(product, year):
     """Get actuals data for a specific product and year"""
-    aps_class = request.args.get('aps_class')
-    
-    print(f"[DEBUG] ===== GET ACTUALS =====")
-    print(f"[DEBUG] Product: {product}, Year: {year}, APS Class: {aps_class}")
-    
-    actuals_path = excel_handler.get_product_filename(product, 'actual', aps_class)
-    print(f"[DEBUG] Actuals path: {actuals_path}")
-    
-    if not actuals_path or not os.path.exists(actuals_path):
-        print(f"[DEBUG] Actuals file not found")
-        return jsonify({
-            'success': False,
-            'message': 'Actuals file not found'
-        }), 404
-    
-    yearly_data = excel_handler.read_yearly_data(actuals_path)
-    
-    if yearly_data and year in yearly_data:
-        actuals = yearly_data[year]
-        actuals = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in actuals]
-        return jsonify({
-            'success': True,
-            'actuals': actuals
-        }), 200
-    
-    # Try integer conversion
-    if yearly_data:
-        for y in yearly_data.keys():
-            if int(y) == int(year):
-                actuals = yearly_data[y]
-                actuals = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in actuals]
-                return jsonify({
-                    'success': True,
-                    'actuals': actuals
-                }), 200
-    
-    return jsonify({
-        'success': False,
-        'message': f'No actuals for year {year}'
-    }), 404
+    return _year_values(
+        product, 'actual', year, 'actuals',
+        'Actuals file not found', f'No actuals for year {year}'
+    )
 
 
 @data_bp.route('/delivered/<product>/<int:year>', methods=['GET'])
 @jwt_required()
 def get_delivered_data(product, year):
     """Get delivered data for a specific product and year"""
-    aps_class = request.args.get('aps_class')
-    
-    print(f"[DEBUG] ===== GET DELIVERED =====")
-    print(f"[DEBUG] Product: {product}, Year: {year}, APS Class: {aps_class}")
-    
-    delivered_path = excel_handler.get_product_filename(product, 'Delivered', aps_class)
-    print(f"[DEBUG] Delivered path: {delivered_path}")
-    
-    if not delivered_path or not os.path.exists(delivered_path):
-        print(f"[DEBUG] Delivered file not found")
-        return jsonify({
-            'success': False,
-            'message': 'Delivered file not found'
-        }), 404
-    
-    yearly_data = excel_handler.read_yearly_data(delivered_path)
-    
-    if yearly_data and year in yearly_data:
-        delivered = yearly_data[year]
-        delivered = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in delivered]
-        return jsonify({
-            'success': True,
-            'delivered': delivered
-        }), 200
-    
-    # Try integer conversion
-    if yearly_data:
-        for y in yearly_data.keys():
-            if int(y) == int(year):
-                delivered = yearly_data[y]
-                delivered = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in delivered]
-                return jsonify({
-                    'success': True,
-                    'delivered': delivered
-                }), 200
-    
-    return jsonify({
-        'success': False,
-        'message': f'No delivered data for year {year}'
-    }), 404
+    return _year_values(
+        product, 'delivered', year, 'delivered',
+        'Delivered file not found', f'No delivered data for year {year}'
+    )
 
 
 @data_bp.route('/weights/<product>', methods=['GET'])
 @jwt_required()
 def get_weights(product):
     """Get weights for a product"""
-    print(f"[DEBUG] ===== GET WEIGHTS =====")
-    print(f"[DEBUG] Product: {product}")
-    
-    weights_path = excel_handler.get_product_filename(product, 'weights', None)
-    print(f"[DEBUG] Weights path: {weights_path}")
-    
-    if not weights_path or not os.path.exists(weights_path):
-        print(f"[DEBUG] Weights file not found")
+    dataset = data_store.product(product)
+    if dataset is None or dataset.weights is None:
         return jsonify({
             'success': False,
             'message': 'Weights file not found'
         }), 404
     
-    weights = excel_handler.read_weights(weights_path)
-    
-    if weights:
-        return jsonify({
-            'success': True,
-            'weights': weights
-        }), 200
-    
     return jsonify({
-        'success': False,
-        'message': 'Could not read weights'
-    }), 404
+        'success': True,
+        'weights': dataset.weights
+    }), 200
 
 
 @data_bp.route('/market-share/<product>', methods=['GET'])
 @jwt_required()
 def get_market_share(product):
     """Get market share data for a product"""
-    print(f"[DEBUG] ===== GET MARKET SHARE =====")
-    print(f"[DEBUG] Product: {product}")
-    
-    ms_path = excel_handler.get_product_filename(product, 'market_share', None)
-    print(f"[DEBUG] Market share path: {ms_path}")
-    
-    if not ms_path or not os.path.exists(ms_path):
-        print(f"[DEBUG] Market share file not found")
+    block = _series(product, 'market_share', None)
+    if block is None:
         return jsonify({
             'success': False,
             'message': 'Market share file not found'
         }), 404
     
-    yearly_data = excel_handler.read_yearly_data(ms_path)
-    
-    if yearly_data:
-        # Clean NaN values
-        cleaned_data = {}
-        for year, values in yearly_data.items():
-            cleaned_data[year] = [0.0 if (isinstance(v, float) and np.isnan(v)) else float(v) for v in values]
-        
-        return jsonify({
-            'success': True,
-            'market_share': cleaned_data
-        }), 200
-    
     return jsonify({
-        'success': False,
-        'message': 'Could not read market share data'
-    }), 404
+        'success': True,
+        'market_share': block.to_dict()
+    }), 200
 
 
 @data_bp.route('/products', methods=['GET'])
 @jwt_required()
 def get_products():
     """Get list of available products and their APS classes"""
-    print(f"[DEBUG] ===== GET PRODUCTS =====")
-    
     products, aps_classes = excel_handler.discover_products_and_aps()
     
-    print(f"[DEBUG] Discovered products: {products}")
-    print(f"[DEBUG] APS classes: {aps_classes}")
-    
     return jsonify({
         'success': True,
         'products': products,
@@ -5,7 +5,16 @@ import numpy as np
 from ..services.excel_handler import excel_handler
 from ..services.simulation import simulation_engine
 from ..services.market_share import market_share_service
+from ..services.goal_seek import goal_seek_service
+from ..services.promo_optimizer import promo_optimizer
+from ..services.attribution import attribution_service
+from ..services.fanout import fanout_service
+from ..services.rollup import rollup_service
+from ..services.rolling import rolling_service
+from ..services.data_store import data_store
 from ..utils.constants import MONTHS, PRODUCT_APS_MAPPING
+from ..utils.periods import period_labels, is_weekly, iso_weeks
+from ..utils.timing import server_timing, current_timer
 
 forecast_bp = Blueprint('forecast', __name__)
 
@@ -24,39 +33,56 @@ def get_products():
 
 @forecast_bp.route('/data/<product>', methods=['GET'])
 @jwt_required()
+@server_timing
 def get_product_data(product):
-    """Get all data for a product"""
+    """
+    Get all data for a product. The Server-Timing header splits the time
+    into dataset loading (file_read, block_build, dataset), series, rolling
+    and serialize; ?timing=1 also returns it as a 'timing' field.
+    """
     aps_class = request.args.get('aps_class')
+    timer = current_timer()
     
-    # Load baseline data
-    baseline_path = excel_handler.get_product_filename(product, 'post_processed', aps_class)
-    baseline_data = excel_handler.read_yearly_data(baseline_path)
+    dataset = data_store.product(product, aps_class)
+    timer.lap('dataset')
+    baseline = dataset.series('baseline', aps_class) if dataset is not None else None
     
-    if not baseline_data:
+    if baseline is None or not len(baseline):
         return jsonify({
             'success': False,
             'message': f'No baseline data found for {product}'
         }), 404
     
-    # Load other data
-    actuals_path = excel_handler.get_product_filename(product, 'actual', aps_class)
-    delivered_path = excel_handler.get_product_filename(product, 'Delivered', aps_class)
+    baseline_data = baseline.to_dict()
     
-    actuals_data = excel_handler.read_yearly_data(actuals_path, 10)
-    if actuals_data:
-        # Pad actuals to 12 months
+    # Monthly actuals cover Jan-Oct, padded to 12 months (weekly are sent in full)
+    actuals = dataset.series('actual', aps_class)
+    actuals_data = actuals.to_dict()
+    if actuals.periods == 12:
         for year in actuals_data:
-            actuals_data[year] = actuals_data[year] + [None, None]
+            actuals_data[year] = actuals_data[year][:10] + [None, None]
+    
+    delivered_data = dataset.series('delivered', aps_class).to_dict()
     
-    delivered_data = excel_handler.read_yearly_data(delivered_path)
+    # Weights and market share are product-level
+    weights = dataset.weights
+    market_share_data = dataset.market_share.to_dict()
+    timer.lap('series')
     
-    # Load weights (product-level)
-    weights_path = excel_handler.get_product_filename(product, 'weights', None)
-    weights = excel_handler.read_weights(weights_path)
+    # Rolling forecast: actuals for closed months, baseline for open months
+    rolling = None
+    if request.args.get('mode') == 'rolling':
+        blended = rolling_service.product(product)
+        if blended is not None:
+            block = blended.series('baseline', aps_class)
+            rolling = {
+                'baseline': block.to_dict(),
+                'closed_months': block.closed_dict()
+            }
+        timer.lap('rolling')
     
-    # Load market share (product-level)
-    ms_path = excel_handler.get_product_filename(product, 'market_share', None)
-    market_share_data = excel_handler.read_yearly_data(ms_path)
+    # Periods per year: 12 for monthly data, 52/53 for weekly
+    periods = dataset.periods
     
     # Get available years
     available_years = set(baseline_data.keys())
@@ -65,7 +91,7 @@ def get_product_data(product):
     if delivered_data:
         available_years.update(delivered_data.keys())
     
-    return jsonify({
+    payload = {
         'success': True,
         'product': product,
         'aps_class': aps_class,
@@ -74,91 +100,302 @@ def get_product_data(product):
         'delivered': delivered_data,
         'weights': weights,
         'market_share': market_share_data,
+        'rolling': rolling,
+        'periods': periods,
+        'period_labels': period_labels(periods),
         'available_years': sorted(list(available_years), reverse=True)
-    }), 200
+    }
+    return _timed_json(payload, timer)
+
+def _year(value, field):
+    """A year from a JSON payload; ValueError (a 400) when it is not one"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be a year, got {value!r}")
+
+def _build_ms_adjustments(data):
+    """Market share adjustments for the requested mode, one per baseline period"""
+    return market_share_service.calculate_adjustments(
+        data.get('ms_mode', 'relative'),
+        data.get('ms_params', {}),
+        # JSON object keys arrive as strings; the years are compared as ints
+        {
+            _year(year, 'market_share_data key'): values
+            for year, values in (data.get('market_share_data') or {}).items()
+        },
+        _year(data.get('selected_year', 2025), 'selected_year'),
+        len(data.get('baseline_vals') or MONTHS)
+    )
+
+
+def _build_scenario(data, ms_adjustments):
+    """compute_simulation keyword arguments from a /simulate-style payload"""
+    ms_mode = data.get('ms_mode', 'relative')
+    
+    return {
+        'baseline_vals': data.get('baseline_vals', [0] * 12),
+        'weights': data.get('weights', {}),
+        'ms_settings': {
+            'mode': ms_mode,
+            'delta': data.get('ms_params', {}).get('delta', 0),
+            'adjustments': ms_adjustments
+        },
+        # Event settings
+        'promo_settings': data.get('promo_settings', {'month': None}),
+        'shortage_settings': data.get('shortage_settings', {'month': None}),
+        'regulation_settings': data.get('regulation_settings', {'month': None}),
+        'custom_settings': data.get('custom_settings', {'month': None}),
+        # Toggle settings
+        'toggle_settings': data.get('toggle_settings', {}),
+        # Locked events
+        'locked_events': data.get('locked_events', {}),
+        'damp_k': data.get('damp_k', 0.5),
+        'year': data.get('selected_year'),
+        # Rolling forecast: leading months that keep their actuals
+        'closed_months': data.get('closed_months', 0)
+    }
+
+
+def _timed_json(payload, timer, status=200):
+    """jsonify a payload, timing serialization; ?timing=1 adds the stages so far"""
+    if request.args.get('timing') == '1':
+        payload['timing'] = timer.as_dict()
+    response = jsonify(payload)
+    timer.lap('serialize')
+    return response, status
+
 
 @forecast_bp.route('/simulate', methods=['POST'])
 @jwt_required()
+@server_timing
 def simulate():
-    """Run simulation with provided parameters"""
+    """
+    Run simulation with provided parameters. The Server-Timing header
+    splits the time into json, market_share, the engine stages (calendar,
+    toggles, events, dampening, apply), exceeded and serialize; ?timing=1
+    also returns it as a 'timing' field.
+    """
+    timer = current_timer()
     data = request.get_json()
-    
-    # Extract parameters
-    baseline_vals = data.get('baseline_vals', [0] * 12)
-    weights = data.get('weights', {})
-    
-    # Market share settings
-    ms_mode = data.get('ms_mode', 'relative')
-    ms_params = data.get('ms_params', {})
-    
-    if ms_mode == 'relative':
-        ms_adjustments = market_share_service.calculate_relative_change(
-            ms_params.get('delta', 0)
-        )
-    elif ms_mode == 'historical':
-        ms_adjustments = market_share_service.calculate_historical_trend(
-            data.get('market_share_data'),
-            data.get('selected_year', 2025),
-            ms_params.get('trend_strength', 100),
-            ms_params.get('apply_seasonality', True)
-        )
-    elif ms_mode == 'competitive':
-        ms_adjustments = market_share_service.calculate_competitive_intelligence(
-            ms_params
-        )
-    elif ms_mode == 'macro':
-        ms_adjustments = market_share_service.calculate_macro_scenario(
-            ms_params.get('market_growth', 0),
-            ms_params.get('our_capacity', 0)
-        )
-    else:
-        ms_adjustments = {m: 1.0 for m in MONTHS}
-    
-    ms_settings = {
-        'mode': ms_mode,
-        'adjustments': ms_adjustments
-    }
-    
-    # Event settings
-    promo_settings = data.get('promo_settings', {'month': None})
-    shortage_settings = data.get('shortage_settings', {'month': None})
-    regulation_settings = data.get('regulation_settings', {'month': None})
-    custom_settings = data.get('custom_settings', {'month': None})
-    
-    # Toggle settings
-    toggle_settings = data.get('toggle_settings', {})
-    
-    # Locked events
-    locked_events = data.get('locked_events', {})
+    timer.lap('json')
     
     # Run simulation
-    result = simulation_engine.compute_simulation(
-        baseline_vals=baseline_vals,
-        weights=weights,
-        ms_settings=ms_settings,
-        promo_settings=promo_settings,
-        shortage_settings=shortage_settings,
-        regulation_settings=regulation_settings,
-        custom_settings=custom_settings,
-        toggle_settings=toggle_settings,
-        locked_events=locked_events,
-        damp_k=data.get('damp_k', 0.5)
-    )
+    try:
+        ms_adjustments = _build_ms_adjustments(data)
+        timer.lap('market_share')
+        scenario = _build_scenario(data, ms_adjustments)
+        result = simulation_engine.compute_simulation(**scenario)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     
     # Calculate exceeded months for warnings
     exceeded = simulation_engine.calculate_exceeded_months(
         result['simulated'],
-        baseline_vals,
+        scenario['baseline_vals'],
         sensitivity=1.5
     )
+    timer.lap('exceeded')
     
-    return jsonify({
+    return _timed_json({
         'success': True,
         'simulated': result['simulated'],
         'final_multipliers': result['final_multipliers'],
         'applied_details': result['applied_details'],
         'ms_adjustments': ms_adjustments,
         'exceeded_months': exceeded
+    }, timer)
+
+@forecast_bp.route('/goal-seek', methods=['POST'])
+@jwt_required()
+def goal_seek():
+    """
+    Find the promo pct or market share delta that reaches a target.
+    
+    Body is a /simulate payload plus:
+        'goal': {
+            'variable': 'promo_pct' | 'ms_delta',
+            'target': 850000,
+            'target_month': null | 'May',
+            'promo_month': 'May',      # defaults to promo_settings.month
+            'bounds': [0, 50],         # defaults to the slider range
+            'tolerance': 0.001
+        }
+    """
+    data = request.get_json()
+    goal = data.get('goal', {})
+    
+    if 'target' not in goal:
+        return jsonify({
+            'success': False,
+            'message': 'Goal target required'
+        }), 400
+    
+    try:
+        ms_adjustments = _build_ms_adjustments(data)
+        scenario = _build_scenario(data, ms_adjustments)
+        result = goal_seek_service.solve(
+            scenario,
+            variable=goal.get('variable', 'promo_pct'),
+            target=goal['target'],
+            target_month=goal.get('target_month'),
+            promo_month=goal.get('promo_month'),
+            bounds=goal.get('bounds'),
+            tolerance=goal.get('tolerance', 1e-3),
+            start=goal.get('start')
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    exceeded = simulation_engine.calculate_exceeded_months(
+        result['result']['simulated'],
+        scenario['baseline_vals'],
+        sensitivity=1.5
+    )
+    
+    return jsonify({
+        'success': True,
+        **result,
+        'exceeded_months': exceeded
+    }), 200
+
+@forecast_bp.route('/optimize-promos', methods=['POST'])
+@jwt_required()
+def optimize_promos():
+    """
+    Pick promo months that maximize the annual simulated total.
+    
+    Body is a /simulate payload plus:
+        'optimizer': {
+            'pcts': [20, 10],          # one pct level per promotion
+            'max_per_quarter': 1,
+            'no_adjacent': true,
+            'max_exceeded': 0,         # months over the warning threshold
+            'months': ['Feb', ...],    # allowed months, defaults to all
+            'top_n': 5
+        }
+    """
+    data = request.get_json()
+    options = data.get('optimizer', {})
+    
+    if not options.get('pcts'):
+        return jsonify({
+            'success': False,
+            'message': 'At least one promo pct level is required'
+        }), 400
+    
+    try:
+        ms_adjustments = _build_ms_adjustments(data)
+        scenario = _build_scenario(data, ms_adjustments)
+        result = promo_optimizer.optimize(
+            scenario,
+            pcts=options['pcts'],
+            max_per_quarter=options.get('max_per_quarter'),
+            no_adjacent=options.get('no_adjacent', True),
+            max_exceeded=options.get('max_exceeded'),
+            months=options.get('months'),
+            top_n=options.get('top_n', 5)
+        )
+    except (ValueError, KeyError) as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        **result
+    }), 200
+
+@forecast_bp.route('/attribution', methods=['POST'])
+@jwt_required()
+def attribution():
+    """Per-factor leave-one-out and marginal contributions for a /simulate payload"""
+    data = request.get_json()
+    
+    try:
+        ms_adjustments = _build_ms_adjustments(data)
+        scenario = _build_scenario(data, ms_adjustments)
+        result = attribution_service.attribute(scenario)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        **result
+    }), 200
+
+@forecast_bp.route('/fanout', methods=['POST'])
+@jwt_required()
+def fanout():
+    """
+    Apply one event specification to every product (and APS class).
+    
+    Body is a /simulate payload without baseline_vals/weights, plus
+    'selected_year', optional 'include_aps' (default true), 'products' and
+    'rolling' (simulate rolling-forecast baselines).
+    """
+    data = request.get_json()
+    
+    try:
+        result = fanout_service.simulate(
+            data,
+            year=data.get('selected_year', 2025),
+            include_aps=data.get('include_aps', True),
+            products=data.get('products'),
+            rolling=data.get('rolling', False)
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        **result
+    }), 200
+
+@forecast_bp.route('/rollup/<product>', methods=['POST'])
+@jwt_required()
+def rollup(product):
+    """
+    Simulate all APS classes of a product, roll them up and reconcile
+    against the product-level baseline. Body as for /fanout.
+    """
+    data = request.get_json() or {}
+    
+    try:
+        result = rollup_service.rollup(
+            product,
+            data,
+            _year(data.get('selected_year', 2025), 'selected_year'),
+            rolling=data.get('rolling', False)
+        )
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    if result is None:
+        return jsonify({
+            'success': False,
+            'message': f'No data found for {product}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        **result
     }), 200
 
 @forecast_bp.route('/export', methods=['POST'])
@@ -177,6 +414,21 @@ def export_simulation():
     ms_mode = data.get('ms_mode', '')
     applied_details = data.get('applied_details', {})
     
+    # Labels follow the product's periods (as /data sends them), not the series length
+    try:
+        periods = data.get('periods')
+        if periods is None:
+            dataset = data_store.product(product, aps_class) if product else None
+            periods = dataset.periods if dataset is not None else len(MONTHS)
+        periods = int(periods)
+        if is_weekly(periods):
+            periods = iso_weeks(_year(year, 'year'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
     # Build CSV content
     rows = []
     headers = [
@@ -186,7 +438,7 @@ def export_simulation():
     ]
     rows.append(','.join(headers))
     
-    for i, month in enumerate(MONTHS):
+    for i, month in enumerate(period_labels(periods)):
         baseline_val = baseline[i] if i < len(baseline) else 0
         sim_val = simulated[i] if i < len(simulated) else 0
         mult = multipliers.get(month, 1.0)
@@ -0,0 +1,125 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+
+from ..services.backtest import backtest_service
+from ..services.data_store import data_store
+from ..services.aggregates import aggregate_service
+
+reports_bp = Blueprint('reports', __name__)
+
+
+@reports_bp.route('/accuracy', methods=['GET', 'POST'])
+@jwt_required()
+def accuracy_report():
+    """
+    Portfolio forecast accuracy report (MAPE, WAPE, bias) for every product,
+    APS class and year. POST {'scenarios': {name: event spec}} to score
+    simulated scenarios as well.
+    """
+    scenarios = None
+    if request.method == 'POST':
+        scenarios = (request.get_json() or {}).get('scenarios')
+    
+    try:
+        report = backtest_service.report(scenarios)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'version': data_store.version(),
+        **report
+    }), 200
+
+
+def _csv_arg(name):
+    value = request.args.get(name)
+    return [v.strip() for v in value.split(',') if v.strip()] if value else None
+
+
+@reports_bp.route('/aggregates', methods=['GET'])
+@jwt_required()
+def aggregates():
+    """
+    Pre-computed quarterly / annual totals, YoY growth and YTD for the
+    portfolio and every product. Query: kinds=baseline,actual,...,
+    products=HP,CN, include_aps=true.
+    """
+    kinds = _csv_arg('kinds') or list(aggregate_service.KINDS)
+    unknown = [k for k in kinds if k not in aggregate_service.KINDS]
+    if unknown:
+        message = f'Unknown kinds: {unknown}'
+        if 'simulated' in unknown:
+            message += '; simulated aggregates come from POST /aggregates/scenario'
+        return jsonify({
+            'success': False,
+            'message': message
+        }), 400
+    products = _csv_arg('products')
+    include_aps = request.args.get('include_aps', 'false').lower() == 'true'
+    
+    summary = aggregate_service.summary()
+    result = {}
+    for product, entry in summary['products'].items():
+        if products and product not in products:
+            continue
+        result[product] = {
+            'periods': entry['periods'],
+            'series': {
+                kind: entry['series'][kind] if include_aps else {'product': entry['series'][kind]['product']}
+                for kind in kinds
+            }
+        }
+    
+    return jsonify({
+        'success': True,
+        'version': data_store.version(),
+        'portfolio': {kind: summary['portfolio'][kind] for kind in kinds},
+        'products': result
+    }), 200
+
+
+@reports_bp.route('/aggregates/<product>', methods=['GET'])
+@jwt_required()
+def product_aggregates(product):
+    """All aggregates of one product, APS classes included"""
+    entry = aggregate_service.summary()['products'].get(product)
+    if entry is None:
+        return jsonify({
+            'success': False,
+            'message': f'No data for {product}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'version': data_store.version(),
+        'product': product,
+        **entry
+    }), 200
+
+
+@reports_bp.route('/aggregates/scenario', methods=['POST'])
+@jwt_required()
+def scenario_aggregates():
+    """
+    Aggregates of a simulated scenario. Body: {'scenario': event spec
+    (as for /forecast/fanout), 'products': [codes]}
+    """
+    data = request.get_json() or {}
+    
+    try:
+        result = aggregate_service.scenario(data.get('scenario') or {}, data.get('products'))
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'version': data_store.version(),
+        **result
+    }), 200
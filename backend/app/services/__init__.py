@@ -1,3 +1,16 @@
 from .simulation import simulation_engine
 from .excel_handler import excel_handler
-from .market_share import market_share_service
\ No newline at end of file
+from .market_share import market_share_service
+from .goal_seek import goal_seek_service
+from .promo_optimizer import promo_optimizer
+from .attribution import attribution_service
+from .data_store import data_store
+from .fanout import fanout_service
+from .rollup import rollup_service
+from .backtest import backtest_service
+from .rolling import rolling_service
+from .calibration import calibration_service
+
+from .aggregates import aggregate_service
+from .ingestion import ingestion_service
+from .metrics import metrics
\ No newline at end of file
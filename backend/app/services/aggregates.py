@@ -0,0 +1,209 @@
+import numpy as np
+from .simulation import simulation_engine
+from .market_share import market_share_service
+from .data_store import data_store
+from ..utils.periods import period_months, is_weekly, iso_weeks
+
+QUARTERS = ['Q1', 'Q2', 'Q3', 'Q4']
+
+
+class AggregateService:
+    """
+    Quarterly and annual totals, YoY growth and cumulative YTD for the
+    baseline, actual and delivered series of every product and APS class,
+    plus portfolio totals over the product-level series.
+
+    Aggregates are built once per dataset version (at the first request
+    after an upload, or eagerly through refresh()) and served from the
+    DataStore cache. Periods map to quarters through their calendar month,
+    so monthly and weekly products add up on the same quarters. Simulated
+    series depend on the scenario and are aggregated on request (scenario()).
+    """
+
+    KINDS = ('baseline', 'actual', 'delivered')
+
+    def __init__(self, engine=None, store=None):
+        self.engine = engine or simulation_engine
+        self.store = store or data_store
+
+    def refresh(self):
+        """Build the aggregates for the current data (called after uploads)"""
+        return self.summary()
+
+    def summary(self):
+        """
+        {'products': {code: {'periods', 'series': {kind: {'product', 'aps'}}}},
+         'portfolio': {kind: aggregate}}
+        """
+        return self.store.derived('aggregates', self._build)
+
+    def scenario(self, spec, products=None):
+        """Aggregates of one simulated scenario (not cached)"""
+        portfolio = self.store.portfolio()
+        codes = [p for p in sorted(portfolio) if not products or p in products]
+        series = {p: self._simulated_series(portfolio[p], spec) for p in codes}
+        return {
+            'products': series,
+            'portfolio': self._portfolio([series[p]['product'] for p in codes])
+        }
+
+    def _build(self, portfolio):
+        products = {}
+        for product in sorted(portfolio):
+            data = portfolio[product]
+            series = {
+                'baseline': self._series(data.baseline, data.aps),
+                'actual': self._series(data.actual, data.aps_actual),
+                'delivered': self._series(data.delivered, data.aps_delivered)
+            }
+            products[product] = {'periods': data.periods, 'series': series}
+        return {
+            'products': products,
+            'portfolio': {
+                kind: self._portfolio([products[p]['series'][kind]['product'] for p in products])
+                for kind in self.KINDS
+            }
+        }
+
+    def _series(self, block, aps_blocks):
+        return {
+            'product': self._aggregate(block.years, block.values, block.lengths),
+            'aps': {
+                aps: self._aggregate(b.years, b.values, b.lengths)
+                for aps, b in sorted(aps_blocks.items())
+            }
+        }
+
+    def _simulated_series(self, data, spec):
+        """Simulate product and APS baselines for every year, then aggregate"""
+        names = [None] + sorted(data.aps)
+        blocks = [data.baseline] + [data.aps[a] for a in names[1:]]
+        years = sorted({int(y) for b in blocks for y in b.years})
+        values = np.full((len(names), len(years), data.periods), np.nan)
+        lengths = np.zeros((len(names), len(years)), dtype=np.int64)
+
+        for y, year in enumerate(years):
+            periods = iso_weeks(year) if is_weekly(data.periods) else data.periods
+            rows = [(r, b[year]) for r, b in enumerate(blocks) if year in b]
+            rows = [(r, v) for r, v in rows if len(v) >= periods]
+            if not rows:
+                continue
+            ms_adjustments = market_share_service.calculate_adjustments(
+                spec.get('ms_mode', 'relative'),
+                spec.get('ms_params', {}),
+                data.market_share,
+                year,
+                periods
+            )
+            batch = self.engine.simulate_batch(
+                baseline_vals=np.nan_to_num(np.array([v[:periods] for _, v in rows])),
+                weights=data.weights_for(year),
+                ms_adjustments=ms_adjustments,
+                promo_settings=spec.get('promo_settings'),
+                shortage_settings=spec.get('shortage_settings'),
+                regulation_settings=spec.get('regulation_settings'),
+                custom_settings=spec.get('custom_settings'),
+                toggle_settings=spec.get('toggle_settings'),
+                locked_events=spec.get('locked_events'),
+                damp_k=spec.get('damp_k', 0.5),
+                year=year
+            )
+            idx = [r for r, _ in rows]
+            values[idx, y, :periods] = batch['simulated']
+            lengths[idx, y] = periods
+
+        def aggregate(r):
+            has = lengths[r] > 0
+            return self._aggregate(np.array(years)[has], values[r][has], lengths[r][has])
+
+        return {
+            'product': aggregate(0),
+            'aps': {aps: aggregate(r) for r, aps in enumerate(names) if aps is not None}
+        }
+
+    def _aggregate(self, years, values, lengths):
+        """
+        Aggregates of a (years, periods) block. Blank periods count as 0 in
+        the totals; YTD growth compares the same number of periods, up to the
+        last recorded one, so partial years (open actuals) compare fairly.
+        """
+        years = [int(y) for y in years]
+        if not years:
+            return {'years': [], 'quarters': QUARTERS, 'annual': [], 'quarterly': [],
+                    'yoy_pct': [], 'quarterly_yoy_pct': [], 'ytd': [], 'quarterly_ytd': [],
+                    'recorded_periods': [], 'ytd_yoy_pct': []}
+
+        values = np.asarray(values, dtype=float)
+        n_years, periods = values.shape
+        filled = np.nan_to_num(values, nan=0.0)
+        recorded = np.isfinite(values) & (filled != 0)
+
+        quarter = np.vstack([(period_months(periods, y) - 1) // 3 for y in years])
+        onehot = quarter[:, :, None] == np.arange(4)
+        quarterly = np.einsum('yp,ypq->yq', filled, onehot)
+        annual = quarterly.sum(axis=1)
+        ytd = np.cumsum(filled, axis=1)
+        quarterly_ytd = np.cumsum(quarterly, axis=1)
+
+        last = np.where(recorded.any(axis=1), periods - 1 - np.argmax(recorded[:, ::-1], axis=1), -1)
+        prev = self._previous_rows(years)
+        has_prev = prev >= 0
+        p = np.where(has_prev, prev, 0)
+        at = np.maximum(last, 0)
+        ytd_now = ytd[np.arange(n_years), at]
+        ytd_before = ytd[p, at]
+
+        return {
+            'years': years,
+            'quarters': QUARTERS,
+            'annual': self._json(annual),
+            'quarterly': self._json(quarterly),
+            'yoy_pct': self._json(self._growth(annual, annual[p], has_prev)),
+            'quarterly_yoy_pct': self._json(self._growth(quarterly, quarterly[p], has_prev[:, None])),
+            'ytd': [self._json(ytd[i, :lengths[i]]) for i in range(n_years)],
+            'quarterly_ytd': self._json(quarterly_ytd),
+            'recorded_periods': [int(n) for n in last + 1],
+            'ytd_yoy_pct': self._json(self._growth(ytd_now, ytd_before, has_prev & (last >= 0)))
+        }
+
+    def _portfolio(self, aggregates):
+        """Sum product-level quarterly totals by year"""
+        years = sorted({y for agg in aggregates for y in agg['years']})
+        quarterly = np.zeros((len(years), 4))
+        year_idx = {y: i for i, y in enumerate(years)}
+        for agg in aggregates:
+            if agg['years']:
+                quarterly[[year_idx[y] for y in agg['years']]] += np.array(agg['quarterly'], dtype=float)
+        annual = quarterly.sum(axis=1)
+        prev = self._previous_rows(years)
+        has_prev = prev >= 0
+        p = np.where(has_prev, prev, 0)
+        return {
+            'years': years,
+            'quarters': QUARTERS,
+            'annual': self._json(annual),
+            'quarterly': self._json(quarterly),
+            'yoy_pct': self._json(self._growth(annual, annual[p], has_prev)),
+            'quarterly_yoy_pct': self._json(self._growth(quarterly, quarterly[p], has_prev[:, None])),
+            'quarterly_ytd': self._json(np.cumsum(quarterly, axis=1))
+        }
+
+    def _previous_rows(self, years):
+        """Row of the previous calendar year for each year, -1 when absent"""
+        idx = {y: i for i, y in enumerate(years)}
+        return np.array([idx.get(y - 1, -1) for y in years], dtype=np.int64)
+
+    def _growth(self, current, previous, mask):
+        """Growth in % where mask holds and the previous value is positive"""
+        ok = mask & (previous > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(ok, (current - previous) / np.where(ok, previous, 1.0) * 100, np.nan)
+
+    def _json(self, array):
+        """Nested lists of floats, NaN as None"""
+        array = np.asarray(array, dtype=float)
+        return np.where(np.isfinite(array), array, None).tolist()
+
+
+# Singleton instance
+aggregate_service = AggregateService()
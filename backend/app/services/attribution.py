@@ -0,0 +1,124 @@
+import numpy as np
+from .simulation import simulation_engine
+from ..utils.periods import period_labels
+
+
+class AttributionService:
+    """
+    Break a simulation down by factor. Every variant (all factors, none,
+    each factor left out, each factor alone, and undamped) is evaluated in
+    one stacked combine_factors call, so dampening is recomputed for each
+    variant rather than assumed additive.
+    """
+
+    MARKET_SHARE = 'MarketShare'
+    MARCH_MADNESS = 'MarchMadness'
+
+    def __init__(self, engine=None):
+        self.engine = engine or simulation_engine
+
+    def attribute(self, scenario):
+        """
+        Parameters:
+        - scenario: compute_simulation keyword arguments
+
+        Returns per-factor leave-one-out and marginal contributions per period
+        and for the year, plus the dampening effect and the interaction left
+        over after summing leave-one-out contributions.
+        """
+        result = self.engine.compute_simulation(**scenario)
+        damp_k = scenario.get('damp_k', 0.5)
+        labels = period_labels(len(scenario['baseline_vals']))
+        n_months = len(labels)
+
+        # Stack applied factors as (slot, month) with factor ids
+        factors = []
+        factor_ids = {}
+        entries = []
+        for col, m in enumerate(labels):
+            slot = 0
+            for name, value in result['applied_details'][m]:
+                if name == 'DampenedUp':
+                    continue
+                if name not in factor_ids:
+                    factor_ids[name] = len(factors)
+                    factors.append(name)
+                entries.append((slot, col, factor_ids[name], value))
+                slot += 1
+
+        n_slots = max([e[0] for e in entries], default=-1) + 1
+        values = np.ones((n_slots, n_months))
+        ids = np.full((n_slots, n_months), -1, dtype=np.int64)
+        for slot, col, fid, value in entries:
+            values[slot, col] = value
+            ids[slot, col] = fid
+
+        ms_adj = scenario.get('ms_settings', {}).get('adjustments', {})
+        ms = np.array([ms_adj.get(m, 1.0) for m in labels], dtype=float)
+        original = np.asarray(scenario['baseline_vals'], dtype=float)
+        working = np.asarray(result['working_baseline'], dtype=float)
+        # Closed months of a rolling forecast keep their actuals in every variant
+        closed = min(int(scenario.get('closed_months') or 0), n_months)
+        ms[:closed] = 1.0
+
+        event_count = len(factors)
+        if np.any(ms != 1.0):
+            factors.append(self.MARKET_SHARE)
+        if np.any(working != original):
+            factors.append(self.MARCH_MADNESS)
+        n_factors = len(factors)
+
+        # Variant rows: full, none, leave-one-out (F), only (F), undamped
+        eye = np.eye(n_factors, dtype=bool)
+        masks = np.vstack([
+            np.ones((1, n_factors), dtype=bool),
+            np.zeros((1, n_factors), dtype=bool),
+            ~eye,
+            eye,
+            np.ones((1, n_factors), dtype=bool)
+        ])
+        n_variants = len(masks)
+        damp = np.full((n_variants, 1), float(damp_k))
+        damp[-1] = 0.0
+
+        # Padding slots have id -1, which picks the always-kept extra column
+        padded = np.concatenate([masks[:, :event_count], np.ones((n_variants, 1), dtype=bool)], axis=1)
+        stacked = np.where(padded[:, ids], values, 1.0)
+        final, _ = self.engine.combine_factors(stacked, damp)
+        final[:, :closed] = 1.0
+
+        ms_on = masks[:, factors.index(self.MARKET_SHARE)] if self.MARKET_SHARE in factors \
+            else np.ones(n_variants, dtype=bool)
+        mm_on = masks[:, factors.index(self.MARCH_MADNESS)] if self.MARCH_MADNESS in factors \
+            else np.ones(n_variants, dtype=bool)
+        base = np.where(mm_on[:, None], working, original)
+        simulated = base * final * np.where(ms_on[:, None], ms, 1.0)
+
+        full, none = simulated[0], simulated[1]
+        leave_one_out = full - simulated[2:2 + n_factors]
+        marginal = simulated[2 + n_factors:2 + 2 * n_factors] - none
+        undamped = simulated[-1]
+        interaction = (full - none) - leave_one_out.sum(axis=0)
+
+        def contribution(monthly):
+            return {
+                'monthly': monthly.tolist(),
+                'annual': float(monthly.sum())
+            }
+
+        return {
+            'factors': factors,
+            'months': labels,
+            'baseline': original.tolist(),
+            'simulated': full.tolist(),
+            'total_change': contribution(full - none),
+            'leave_one_out': {f: contribution(leave_one_out[i]) for i, f in enumerate(factors)},
+            'marginal': {f: contribution(marginal[i]) for i, f in enumerate(factors)},
+            'dampening': contribution(full - undamped),
+            'interaction': contribution(interaction),
+            'variants_evaluated': n_variants
+        }
+
+
+# Singleton instance
+attribution_service = AttributionService()
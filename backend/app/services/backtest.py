@@ -0,0 +1,187 @@
+import numpy as np
+from .simulation import simulation_engine
+from .market_share import market_share_service
+from .data_store import data_store
+from ..utils.constants import MONTHS
+
+
+class BacktestService:
+    """
+    Forecast accuracy (MAPE, WAPE, bias) of the baseline, and optionally of
+    simulated scenarios, against actuals and delivered volumes.
+
+    Every product and APS series is stacked into (series, years, 12)
+    arrays once per dataset version; metrics are masked reductions over
+    those arrays. Months with no recorded volume (blank or 0) are left out,
+    which also skips months that have not closed yet. Only monthly series
+    are stacked; weekly products are left out.
+    """
+
+    REFERENCES = ('actual', 'delivered')
+
+    def __init__(self, engine=None, store=None):
+        self.engine = engine or simulation_engine
+        self.store = store or data_store
+
+    def report(self, scenarios=None):
+        """
+        Portfolio accuracy report.
+
+        Parameters:
+        - scenarios: optional {name: event specification} (as for
+          FanoutService.simulate); each is simulated for every series and
+          year and scored the same way as the baseline
+        """
+        report = dict(self.store.derived('backtest_report', self._baseline_report))
+        if scenarios:
+            stack = self.stack()
+            report['scenarios'] = {
+                name: self._score(stack, self._simulate(stack, spec), 'simulated')
+                for name, spec in scenarios.items()
+            }
+        return report
+
+    def stack(self):
+        """
+        Baseline, actual and delivered of every monthly series as aligned
+        (series, years, 12) arrays, built once per dataset version:
+        {'series': [(product, aps_class)], 'years': [...], 'baseline': ...,
+        'actual': ..., 'delivered': ...}
+        """
+        return self.store.derived('backtest_stack', self._stack)
+
+    def _baseline_report(self, portfolio):
+        stack = self.stack()
+        report = self._score(stack, stack['baseline'], 'baseline')
+        report['years'] = stack['years']
+        return report
+
+    def _stack(self, portfolio):
+        """Builder of stack()"""
+        series = []
+        for product in sorted(portfolio):
+            data = portfolio[product]
+            series.append((product, None, data.baseline, data.actual, data.delivered))
+            for aps in sorted(data.aps):
+                series.append((
+                    product, aps, data.aps[aps],
+                    data.series('actual', aps), data.series('delivered', aps)
+                ))
+
+        years = sorted({int(y) for s in series for block in s[2:] for y in block.years})
+        year_idx = {y: i for i, y in enumerate(years)}
+        shape = (len(series), len(years), 12)
+        arrays = {k: np.full(shape, np.nan) for k in ('baseline',) + self.REFERENCES}
+
+        for r, (_, _, baseline, actual, delivered) in enumerate(series):
+            for key, block in (('baseline', baseline), ('actual', actual), ('delivered', delivered)):
+                if block.periods == 12 and len(block):
+                    arrays[key][r, [year_idx[int(y)] for y in block.years]] = block.values
+
+        return {
+            'series': [(product, aps) for product, aps, *_ in series],
+            'years': years,
+            **arrays
+        }
+
+    def _simulate(self, stack, spec):
+        """
+        Simulate every (series, year) with a baseline; NaN elsewhere. One
+        batch per year, so calendar events land in the year simulated.
+        """
+        portfolio = self.store.portfolio()
+        baseline = stack['baseline']
+        has_data = ~np.isnan(baseline).all(axis=2)
+        simulated = np.full(baseline.shape, np.nan)
+
+        for y, year in enumerate(stack['years']):
+            rows = np.flatnonzero(has_data[:, y])
+            if not len(rows):
+                continue
+            tables, ms_rows = [], []
+            for r in rows:
+                data = portfolio[stack['series'][r][0]]
+                ms_adjustments = market_share_service.calculate_adjustments(
+                    spec.get('ms_mode', 'relative'), spec.get('ms_params', {}),
+                    data.market_share, year
+                )
+                tables.append(data.weights_for(year))
+                ms_rows.append([ms_adjustments.get(m, 1.0) for m in MONTHS])
+
+            batch = self.engine.simulate_batch(
+                baseline_vals=np.nan_to_num(baseline[rows, y]),
+                weights=self.engine.stack_weight_tables(tables),
+                ms_adjustments=np.array(ms_rows, dtype=float),
+                promo_settings=spec.get('promo_settings'),
+                shortage_settings=spec.get('shortage_settings'),
+                regulation_settings=spec.get('regulation_settings'),
+                custom_settings=spec.get('custom_settings'),
+                toggle_settings=spec.get('toggle_settings'),
+                locked_events=spec.get('locked_events'),
+                damp_k=spec.get('damp_k', 0.5),
+                year=year
+            )
+            simulated[rows, y] = batch['simulated']
+        return simulated
+
+    def _score(self, stack, forecast, label):
+        """Metrics per series-year, per series and for the portfolio"""
+        product_rows = np.array([aps is None for _, aps in stack['series']], dtype=bool)
+        result = {'portfolio': {}, 'series': []}
+
+        per_year, per_series = {}, {}
+        for ref in self.REFERENCES:
+            key = f"{label}_vs_{ref}"
+            per_year[key] = self.metrics(forecast, stack[ref], axis=2)
+            per_series[key] = self.metrics(forecast, stack[ref], axis=(1, 2))
+            result['portfolio'][key] = self._row(
+                self.metrics(forecast[product_rows], stack[ref][product_rows], axis=(0, 1, 2))
+            )
+
+        for r, (product, aps) in enumerate(stack['series']):
+            entry = {'product': product, 'aps_class': aps, 'overall': {}, 'years': {}}
+            for key in per_year:
+                entry['overall'][key] = self._row(per_series[key], r)
+            for y, year in enumerate(stack['years']):
+                for key in per_year:
+                    row = self._row(per_year[key], (r, y))
+                    if row['months']:
+                        entry['years'].setdefault(year, {})[key] = row
+            result['series'].append(entry)
+
+        return result
+
+    def metrics(self, forecast, reference, axis):
+        """
+        Masked MAPE, WAPE and bias (all in %) reduced over axis, plus the
+        number of months scored. Bias is positive when the forecast is high.
+        """
+        valid = np.isfinite(forecast) & np.isfinite(reference) & (reference > 0)
+        ref = np.where(valid, reference, 1.0)
+        err = np.where(valid, forecast - ref, 0.0)
+        abs_err = np.abs(err)
+        volume = np.where(valid, ref, 0.0).sum(axis=axis)
+        months = valid.sum(axis=axis)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'mape': (abs_err / ref).sum(axis=axis) / months * 100,
+                'wape': abs_err.sum(axis=axis) / volume * 100,
+                'bias': err.sum(axis=axis) / volume * 100,
+                'months': months
+            }
+
+    def _row(self, metrics, index=()):
+        """One entry of a metrics dict as JSON-friendly values"""
+        row = {}
+        for k, v in metrics.items():
+            value = np.asarray(v)[index]
+            if k == 'months':
+                row[k] = int(value)
+            else:
+                row[k] = float(value) if np.isfinite(value) else None
+        return row
+
+
+# Singleton instance
+backtest_service = BacktestService()
@@ -0,0 +1,239 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from .data_store import data_store
+from .backtest import backtest_service
+from ..utils.constants import MONTHS, WEIGHT_COLUMNS, WEIGHT_COLUMN_PATTERNS
+
+
+class CalibrationService:
+    """
+    Fit weight columns from historical actual / baseline residuals.
+
+    Each fitted column is a per-month multiplier estimated by volume-weighted
+    least squares on log(actual / baseline) over every year and every
+    product / APS series, for all products at once. Trend is fitted on the
+    raw residuals; the other columns on what is left after Trend, each over
+    its own months and side:
+
+    - Trans: Sep-Dec, all residuals
+    - UpromoUp / UPromoDwn: Jan-Jun, residuals above / below tolerance
+    - DPromoUp / DPromoDwn: Jul-Dec, residuals above / below tolerance
+    - Shortage: all months, residuals below tolerance
+
+    Regulation, PF and other columns have no identifiable signal in
+    baseline-vs-actual history and are carried over unchanged, as is any
+    month with fewer than min_obs observations. Only monthly products are
+    calibrated.
+    """
+
+    # key: (months, side)
+    FIT_SPEC = {
+        'trans': (range(8, 12), 'all'),
+        'upromoup': (range(0, 6), 'up'),
+        'upromodwn': (range(0, 6), 'down'),
+        'dpromoup': (range(6, 12), 'up'),
+        'dpromodwn': (range(6, 12), 'down'),
+        'shortage': (range(0, 12), 'down')
+    }
+
+    def __init__(self, store=None, backtest=None):
+        self.store = store or data_store
+        self.backtest = backtest or backtest_service
+
+    def run(self, products=None, min_obs=3, tolerance=0.02):
+        """
+        Fit candidate weights for every product (or the given ones), write
+        {product}_weights_candidate.csv and {product}_calibration.json, and
+        return the fit reports keyed by product.
+        """
+        portfolio = self.store.portfolio()
+        stack = self.backtest.stack()
+        codes = sorted(
+            p for p in portfolio
+            if (not products or p in products) and portfolio[p].periods == 12
+        )
+        if not codes:
+            return {}
+
+        code_idx = {p: i for i, p in enumerate(codes)}
+        keep = np.array([s[0] in code_idx for s in stack['series']], dtype=bool)
+        pid = np.array([code_idx.get(s[0], -1) for s in stack['series']], dtype=np.int64)[keep]
+        baseline = stack['baseline'][keep]
+        actual = stack['actual'][keep]
+
+        valid = np.isfinite(baseline) & np.isfinite(actual) & (baseline > 0) & (actual > 0)
+        log_ratio = np.log(np.where(valid, actual, 1.0) / np.where(valid, baseline, 1.0))
+        volume = np.where(valid, actual, 0.0)
+        n_products = len(codes)
+
+        current = {
+            key: np.vstack([portfolio[p].weight_table[key][1] for p in codes])
+            for key in WEIGHT_COLUMN_PATTERNS
+        }
+        fitted = {}
+        counts = {}
+
+        # Trend on raw residuals
+        est, cnt = self._fit(log_ratio, volume, valid, pid, n_products)
+        fitted['trend'] = np.where(cnt >= min_obs, np.exp(est), current['trend'])
+        counts['trend'] = cnt
+
+        residual = log_ratio - np.log(fitted['trend'])[pid][:, None, :]
+        month_idx = np.arange(12)
+        log_tol = np.log1p(tolerance)
+
+        for key, (months, side) in self.FIT_SPEC.items():
+            in_window = np.isin(month_idx, list(months))
+            select = valid & in_window
+            if side == 'up':
+                select &= residual > log_tol
+            elif side == 'down':
+                select &= residual < -log_tol
+            est, cnt = self._fit(residual, volume, select, pid, n_products)
+            use = (cnt >= min_obs) & in_window
+            fitted[key] = np.where(use, np.exp(est), current[key])
+            counts[key] = np.where(in_window, cnt, 0)
+
+        reports = {}
+        with self.store.handler.versions.commit():
+            for p, product in enumerate(codes):
+                rows = pid == p
+                report = self._quality(
+                    product, baseline[rows], actual[rows], valid[rows], log_ratio[rows],
+                    {k: v[p] for k, v in fitted.items()},
+                    {k: v[p] for k, v in current.items()},
+                    {k: v[p] for k, v in counts.items()},
+                    min_obs
+                )
+                self._write_candidate(product, portfolio[product], {k: v[p] for k, v in fitted.items()}, report)
+                reports[product] = report
+        return reports
+
+    def _fit(self, values, volume, select, pid, n_products):
+        """
+        Volume-weighted least squares intercept per (product, month):
+        argmin_a sum v * (values - a)^2 over selected observations.
+        Returns (estimates, observation counts), each (products, 12).
+        """
+        w = np.where(select, volume, 0.0)
+        num = np.zeros((n_products, 12))
+        den = np.zeros((n_products, 12))
+        cnt = np.zeros((n_products, 12), dtype=np.int64)
+        np.add.at(num, pid, (w * np.where(select, values, 0.0)).sum(axis=1))
+        np.add.at(den, pid, w.sum(axis=1))
+        np.add.at(cnt, pid, select.sum(axis=1))
+        est = np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+        return est, cnt
+
+    def _quality(self, product, baseline, actual, valid, log_ratio, fitted, current, counts, min_obs):
+        """Fit-quality summary for one product"""
+        volume = np.where(valid, actual, 0.0).sum()
+
+        def wape(trend):
+            forecast = np.where(valid, baseline * trend, 0.0)
+            err = np.abs(forecast - np.where(valid, actual, 0.0)).sum()
+            return float(err / volume * 100) if volume else None
+
+        def log_rmse(trend):
+            if not valid.any():
+                return None
+            resid = np.where(valid, log_ratio - np.log(trend), 0.0)
+            return float(np.sqrt((resid ** 2).sum() / valid.sum()))
+
+        columns = {}
+        for key in fitted:
+            changed = ~np.isclose(fitted[key], current[key])
+            columns[key] = {
+                'current': current[key].tolist(),
+                'candidate': fitted[key].tolist(),
+                'observations': counts[key].tolist(),
+                'months_fitted': [m for m, c in zip(MONTHS, counts[key]) if c >= min_obs],
+                'changed': bool(changed.any())
+            }
+
+        return {
+            'product': product,
+            'created': datetime.now().isoformat(),
+            'observations': int(valid.sum()),
+            'trend_fit': {
+                'wape_before': wape(np.ones(12)),
+                'wape_current_trend': wape(current['trend']),
+                'wape_candidate_trend': wape(fitted['trend']),
+                'log_rmse_current_trend': log_rmse(current['trend']),
+                'log_rmse_candidate_trend': log_rmse(fitted['trend'])
+            },
+            'columns': columns
+        }
+
+    def _paths(self, product):
+        data_dir = self.store.handler.data_dir
+        return {
+            'active': self.store.handler.get_product_filename(product, 'weights', None),
+            'candidate': self.store.handler.get_product_filename(product, 'weights_candidate', None),
+            'previous': self.store.handler.get_product_filename(product, 'weights_previous', None),
+            'report': os.path.join(data_dir, f"{product}_calibration.json")
+        }
+
+    def _write_candidate(self, product, data, fitted, report):
+        """Candidate weights keep the active file's column names and extra columns"""
+        active = dict(data.weights or {})
+        table = data.weight_table
+        columns = {}
+        for col, value in active.items():
+            if isinstance(value, list):
+                columns[col] = value[:12]
+            else:
+                columns[col] = [value] + [np.nan] * 11
+
+        for key, values in fitted.items():
+            name = table[key][0][0]
+            if name is None:
+                if np.allclose(values, table[key][1][0]):
+                    continue
+                pattern = WEIGHT_COLUMN_PATTERNS[key][0]
+                name = next((c for c in WEIGHT_COLUMNS if c.lower() == pattern), key)
+            columns[name] = [float(v) for v in values]
+
+        paths = self._paths(product)
+        pd.DataFrame(columns).to_csv(f"{paths['candidate']}.tmp", index=False)
+        os.replace(f"{paths['candidate']}.tmp", paths['candidate'])
+        with open(f"{paths['report']}.tmp", 'w') as f:
+            json.dump(report, f)
+        os.replace(f"{paths['report']}.tmp", paths['report'])
+
+    def preview(self, product):
+        """Candidate vs active weights and the stored fit report, or None"""
+        paths = self._paths(product)
+        if not os.path.exists(paths['candidate']):
+            return None
+        handler = self.store.handler
+        report = None
+        if os.path.exists(paths['report']):
+            with open(paths['report']) as f:
+                report = json.load(f)
+        return {
+            'product': product,
+            'active': handler.read_weights(paths['active']),
+            'candidate': handler.read_weights(paths['candidate']),
+            'report': report
+        }
+
+    def promote(self, product):
+        """Make the candidate the active weights, keeping the old file as _previous"""
+        with self.store.handler.versions.commit():
+            paths = self._paths(product)
+            if not os.path.exists(paths['candidate']):
+                return False
+            if os.path.exists(paths['active']):
+                shutil.copyfile(paths['active'], f"{paths['previous']}.tmp")
+                os.replace(f"{paths['previous']}.tmp", paths['previous'])
+            os.replace(paths['candidate'], paths['active'])
+        return True
+
+
+# Singleton instance
+calibration_service = CalibrationService()
@@ -0,0 +1,253 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from .excel_handler import excel_handler
+from .simulation import simulation_engine
+from .metrics import metrics
+from ..models import SeriesBlock, ProductDataset
+from ..utils.periods import period_months, is_weekly, iso_weeks
+from ..utils.constants import PRODUCT_APS_MAPPING
+from ..utils.timing import current_timer
+
+
+_MISSING = object()
+
+# APS-level file types, in ProductDataset order (baseline, actual, delivered)
+APS_FILE_TYPES = ('post_processed', 'actual', 'Delivered')
+PRODUCT_FILE_TYPES = APS_FILE_TYPES + ('market_share', 'weights')
+
+
+class DataStore:
+    """
+    In-memory view of the products in DATA_DIR. Loaded data is keyed on
+    the dataset version: the id of the published version pinned by the
+    request (see DatasetVersions), or for a flat data directory its
+    mtime, which every write through a rename or commit moves. The last
+    KEEP_VERSIONS versions loaded stay in memory, so requests pinned to
+    the previous version while a new one is published are still served
+    from memory.
+
+    Products load on first use: product() reads the one product asked
+    for, portfolio() the products discovery lists. Reads of loaded data
+    take no lock. Each product is loaded once per version, outside the
+    store lock, by the first request that needs it; other requests for
+    it wait, requests for loaded data do not. The lock only guards
+    inserting and evicting versions.
+
+    A reload reads only the files that changed; blocks and weights of
+    files carried over from a loaded version (the same hard-linked file,
+    or the same size and mtime in place) are reused, so re-ingesting one
+    data type reloads only that type.
+    """
+
+    KEEP_VERSIONS = 2
+
+    def __init__(self, handler=None):
+        self.handler = handler or excel_handler
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+        self.load_stats = {'read': 0, 'reused': 0}
+
+    def version(self):
+        """Version token for the dataset this request reads"""
+        return self._version_of(self.handler.data_dir)
+
+    def _version_of(self, data_dir):
+        version = self.handler.versions.version_of(data_dir)
+        if version:
+            return version
+        try:
+            mtime = os.stat(data_dir).st_mtime_ns
+        except OSError:
+            return 'empty'
+        return hashlib.sha1(f"{os.path.abspath(data_dir)}:{mtime}".encode()).hexdigest()[:16]
+
+    def portfolio(self):
+        """
+        All products discovery lists, as ProductDataset keyed by code.
+        Weekly products hold up to 53 periods per year (52 in most years).
+        """
+        entry = self._entry()
+
+        def build():
+            products, _ = self.handler.discover_products_and_aps()
+            return {product: self._get(entry, ('product', product), lambda p=product: self._load(entry, p))
+                    for product in products}
+
+        return self._get(entry, ('portfolio',), build)
+
+    def product(self, product, aps_class=None):
+        """
+        One ProductDataset, or None when no file of the product exists.
+        Products and APS classes missing from PRODUCT_APS_MAPPING are read
+        from their files as well; an unlisted aps_class is added to a copy
+        of the product, so portfolio-wide results do not change.
+        """
+        entry = self._entry()
+        data = self._get(entry, ('product', product), lambda: self._load(entry, product))
+        if data is None or not aps_class or aps_class in data.aps:
+            return data
+        return self._get(entry, ('aps', product, aps_class), lambda: self._load_aps(entry, data, aps_class))
+
+    def derived(self, name, builder):
+        """
+        builder(portfolio) computed once per dataset version and cached
+        under name until the data changes. The builder runs pinned to the
+        same version, so nested reads see the same data.
+        """
+        entry = self._entry()
+        portfolio = self.portfolio()
+        value = entry['derived'].get(name, _MISSING)
+        metrics.cache(f"derived.{name}", value is not _MISSING)
+        if value is not _MISSING:
+            return value
+        with self.handler.versions.pin(entry['data_dir']):
+            value = builder(portfolio)
+        entry['derived'][name] = value
+        return value
+
+    def _entry(self):
+        data_dir = self.handler.data_dir
+        version = self._version_of(data_dir)
+        entry = self._loaded.get(version)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._loaded.get(version)
+            if entry is None:
+                entry = {
+                    'data_dir': data_dir, 'items': {}, 'loading': {}, 'derived': {},
+                    'files': {}, 'stats': {'read': 0, 'reused': 0}
+                }
+                self._loaded[version] = entry
+                while len(self._loaded) > self.KEEP_VERSIONS:
+                    self._loaded.popitem(last=False)
+        return entry
+
+    def _get(self, entry, key, build):
+        """entry's item under key, built once pinned to its version; concurrent callers wait"""
+        value = entry['items'].get(key, _MISSING)
+        metrics.cache('dataset', value is not _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            guard = entry['loading'].setdefault(key, threading.Lock())
+        with guard:
+            value = entry['items'].get(key, _MISSING)
+            if value is _MISSING:
+                with self.handler.versions.pin(entry['data_dir']):
+                    value = build()
+                entry['items'][key] = value
+        with self._lock:
+            entry['loading'].pop(key, None)
+        return value
+
+    def _reader(self, entry):
+        """Cached file readers for entry, reusing unchanged files of loaded versions"""
+        h = self.handler
+        timer = current_timer()
+        stats = entry['stats']
+        self.load_stats = stats
+
+        def cached(path, reader):
+            name = os.path.basename(path)
+            try:
+                stat = os.stat(path)
+                key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                key = None
+            hit = entry['files'].get(name)
+            if hit is None:
+                for other in reversed(list(self._loaded.values())):
+                    hit = other['files'].get(name)
+                    if hit is not None:
+                        break
+            if hit is not None and hit[0] == key:
+                stats['reused'] += 1
+                value = hit[1]
+            else:
+                stats['read'] += 1
+                timer.lap('dataset')
+                value = reader(path)
+            entry['files'][name] = (key, value)
+            return value
+
+        def read_block(path):
+            yearly = h.read_yearly_data(path)
+            timer.lap('file_read')
+            block = SeriesBlock.from_yearly(yearly)
+            timer.lap('block_build')
+            return block
+
+        def read_weights(path):
+            weights = h.read_weights(path)
+            timer.lap('file_read')
+            return weights
+
+        def block(product, file_type, aps=None):
+            return cached(h.get_product_filename(product, file_type, aps), read_block)
+
+        def weights(product):
+            return cached(h.get_product_filename(product, 'weights', None), read_weights)
+
+        return block, weights
+
+    def _load(self, entry, product):
+        h = self.handler
+        aps_list = [
+            aps for aps in PRODUCT_APS_MAPPING.get(product, [])
+            if any(os.path.exists(h.get_product_filename(product, t, aps)) for t in APS_FILE_TYPES)
+        ]
+        if not aps_list and not any(
+            os.path.exists(h.get_product_filename(product, t)) for t in PRODUCT_FILE_TYPES
+        ):
+            return None
+        block, weights = self._reader(entry)
+        data = ProductDataset(
+            product,
+            baseline=block(product, 'post_processed'),
+            actual=block(product, 'actual'),
+            delivered=block(product, 'Delivered'),
+            market_share=block(product, 'market_share'),
+            aps={aps: block(product, 'post_processed', aps) for aps in aps_list},
+            aps_actual={aps: block(product, 'actual', aps) for aps in aps_list},
+            aps_delivered={aps: block(product, 'Delivered', aps) for aps in aps_list},
+            weights=weights(product)
+        )
+        self._resolve_weights(data)
+        return data
+
+    def _load_aps(self, entry, data, aps_class):
+        block, _ = self._reader(entry)
+        blocks = [block(data.product, t, aps_class) for t in APS_FILE_TYPES]
+        if not any(len(b) for b in blocks):
+            return data
+        baseline, actual, delivered = blocks
+        extended = ProductDataset(
+            data.product, data.baseline, data.actual, data.delivered, data.market_share,
+            {**data.aps, aps_class: baseline},
+            {**data.aps_actual, aps_class: actual},
+            {**data.aps_delivered, aps_class: delivered},
+            data.weights
+        )
+        self._resolve_weights(extended)
+        return extended
+
+    def _resolve_weights(self, data):
+        data.weight_table = simulation_engine.weight_table(
+            data.weights or {}, period_months(data.periods)
+        )
+        if is_weekly(data.periods):
+            # Week-to-month mapping of each year; years that share one share the table
+            tables = {}
+            for year in sorted({int(y) for b in [data.baseline, *data.aps.values()] for y in b.years}):
+                months = period_months(iso_weeks(year), year)
+                key = months.tobytes()
+                if key not in tables:
+                    tables[key] = simulation_engine.weight_table(data.weights or {}, months)
+                data.weight_tables[year] = tables[key]
+
+
+# Singleton instance
+data_store = DataStore()
@@ -1,18 +1,208 @@
 import pandas as pd
 import numpy as np
 import os
-from datetime import datetime
+import json
+import io
+import hashlib
+import threading
+from functools import lru_cache
+from datetime import datetime, date, time
+from itertools import islice
+from time import perf_counter
+from concurrent.futures import wait, FIRST_COMPLETED
+from openpyxl import Workbook, load_workbook
 from ..utils.constants import (
     PRODUCT_APS_MAPPING, MONTHS, EXCEL_SHEETS, WEIGHT_COLUMNS
 )
+from ..utils.periods import WEEKS, iso_weeks
+from ..utils.versions import DatasetVersions
+from .metrics import metrics
 from ..config import Config
 
+# Content hashes of ingested CSVs, kept in the data directory
+HASHES_FILE = 'ingest_hashes.json'
+
+# Canonical casing of yearly-sheet columns
+YEARLY_COLUMNS = {c.lower(): c for c in ['Year'] + MONTHS + WEEKS}
+
+
+# Canonical on-disk layouts of yearly CSVs
+MONTHLY_COLUMNS = ['Year'] + MONTHS
+WEEKLY_COLUMNS = ['Year'] + WEEKS
+CANONICAL_HEADERS = {
+    ','.join(MONTHLY_COLUMNS): 'monthly',
+    ','.join(WEEKLY_COLUMNS): 'weekly'
+}
+
+# Data files holding yearly series
+YEARLY_FILE_SUFFIXES = ('_post_processed.csv', '_actual.csv', '_Delivered.csv', '_market_share.csv')
+
+# Errors listed per sheet before the rest are summarized
+MAX_SCHEMA_ERRORS = 10
+
+
+class SchemaError(ValueError):
+    """Sheet content that does not fit the canonical schema"""
+
+
+def _raise_errors(errors):
+    if errors:
+        more = f" (and {len(errors) - MAX_SCHEMA_ERRORS} more)" if len(errors) > MAX_SCHEMA_ERRORS else ''
+        raise SchemaError('; '.join(errors[:MAX_SCHEMA_ERRORS]) + more)
+
+
+def _canonical_names(df):
+    """Stripped column names, Year / month / week names canonically cased"""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    present = set(df.columns)
+    renames = {}
+    for col in df.columns:
+        canonical = YEARLY_COLUMNS.get(col.lower())
+        if canonical and canonical != col and canonical not in present:
+            renames[col] = canonical
+            present.add(canonical)
+    return df.rename(columns=renames)
+
+
+def _numeric_block(df, columns, errors):
+    """Columns as one float array (blanks NaN); non-numeric cells are errors"""
+    values = df[columns]
+    text = [c for c in columns if not pd.api.types.is_numeric_dtype(values[c])]
+    if text:
+        raw = values[text]
+        converted = raw.apply(pd.to_numeric, errors='coerce')
+        blank = raw.isna() | (raw.astype(str).apply(lambda c: c.str.strip()) == '')
+        for row, col in zip(*np.nonzero((converted.isna() & ~blank).to_numpy())):
+            errors.append(f"row {df.index[row] + 2}, {text[col]}: not a number ({raw.iloc[row, col]!r})")
+        values = values.assign(**{c: converted[c] for c in text})
+    return values.to_numpy(dtype=float)
+
+
+def canonical_yearly(df):
+    """
+    Frame in the canonical yearly layout: Year then Jan..Dec (monthly) or
+    W01..W53 (weekly, W53 0.0 when absent), one row per year sorted by
+    year, float values with blanks as 0.0. Blank rows are dropped; missing
+    columns, unparseable years or values and duplicate years raise
+    SchemaError.
+    """
+    df = _canonical_names(df)
+    weekly = any(c in df.columns for c in WEEKS)
+    periods = WEEKS if weekly else MONTHS
+    required = ['Year'] + (WEEKS[:52] if weekly else MONTHS)
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise SchemaError(f"missing columns: {', '.join(missing)}")
+
+    present = [c for c in periods if c in df.columns]
+    df = df.dropna(how='all', subset=['Year'] + present)
+    errors = []
+
+    years = pd.to_numeric(df['Year'], errors='coerce')
+    invalid = years.isna() | (years != years.round())
+    for row in np.flatnonzero(invalid.to_numpy()):
+        errors.append(f"row {df.index[row] + 2}: invalid Year ({df['Year'].iloc[row]!r})")
+    values = _numeric_block(df, present, errors)
+    years = years.fillna(0).astype(int)
+    duplicated = years[years.duplicated() & ~invalid]
+    if len(duplicated):
+        errors.append(f"duplicate years: {', '.join(str(y) for y in sorted(set(duplicated)))}")
+    _raise_errors(errors)
+
+    out = np.zeros((len(df), len(periods)))
+    out[:, [periods.index(c) for c in present]] = np.nan_to_num(values, nan=0.0)
+    result = pd.DataFrame(out, columns=periods)
+    result.insert(0, 'Year', years.to_numpy())
+    return result.sort_values('Year', kind='stable').reset_index(drop=True)
+
+
+def canonical_weights(df):
+    """Weights with stripped column names, all-blank rows dropped and numeric values"""
+    df = df.copy()
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.loc[:, [not c.startswith('Unnamed:') or df[c].notna().any() for c in df.columns]]
+    df = df.dropna(how='all')
+    errors = []
+    values = _numeric_block(df, list(df.columns), errors)
+    _raise_errors(errors)
+    return pd.DataFrame(values, columns=df.columns)
+
+
+def parse_sheet(path, sheet, kind):
+    """
+    Parse one workbook sheet into its canonical layout ('yearly',
+    'weights'; 'raw' keeps it as read); runs in a parser process. Returns
+    (frame, parse seconds).
+    """
+    started = perf_counter()
+    df = pd.read_excel(path, sheet_name=sheet)
+    try:
+        if kind == 'yearly':
+            df = canonical_yearly(df)
+        elif kind == 'weights':
+            df = canonical_weights(df)
+    except SchemaError as e:
+        raise SchemaError(f"{sheet}: {e}") from None
+    return df, perf_counter() - started
+
+
+def find_sheet(sheet_names, name):
+    """The sheet called name, ignoring case and spaces, or None"""
+    wanted = name.lower().replace(' ', '')
+    for sheet in sheet_names:
+        if sheet.lower().replace(' ', '') == wanted:
+            return sheet
+    return None
+
+
+@lru_cache(maxsize=64)
+def template_workbook(product_code, include_aps=False):
+    """
+    Upload template for a product as .xlsx bytes. Built once per
+    (product, include_aps) with a write-only workbook in memory; repeat
+    downloads are served from the cache without touching disk or openpyxl.
+    """
+    aps_list = PRODUCT_APS_MAPPING[product_code] if include_aps and product_code in PRODUCT_APS_MAPPING else []
+    sheets = [
+        (EXCEL_SHEETS['baseline'], ['Year'] + MONTHS, [[2024] + [0.0] * 12, [2025] + [0.0] * 12]),
+        (EXCEL_SHEETS['actuals'], ['Year'] + MONTHS, [[2024] + [0.0] * 12]),
+        (EXCEL_SHEETS['delivered'], ['Year'] + MONTHS, [[2025] + [0.0] * 12]),
+        # Weights: one row per month
+        (EXCEL_SHEETS['weights'], list(WEIGHT_COLUMNS), [[1.0] * len(WEIGHT_COLUMNS)] * 12),
+        (EXCEL_SHEETS['market_share'], ['Year'] + MONTHS, [[2023] + [25.0] * 12, [2024] + [25.0] * 12]),
+        (EXCEL_SHEETS['metadata'], ['Property', 'Value'], [
+            ['Product', product_code],
+            ['APS Classes', ', '.join(aps_list)]
+        ])
+    ]
+
+    wb = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
 
 class ExcelHandler:
     def __init__(self):
         self.data_dir = Config.DATA_DIR
+        self._hash_lock = threading.Lock()
         print(f"[DEBUG] ExcelHandler initialized with data_dir: {self.data_dir}")
     
+    @property
+    def data_dir(self):
+        """Directory of the dataset version pinned for this request (or the live one)"""
+        return self.versions.directory()
+    
+    @data_dir.setter
+    def data_dir(self, root):
+        self.versions = DatasetVersions(root)
+    
     def get_product_filename(self, product, file_type, aps_class=None):
         """Generate product-specific or APS-specific filename"""
         if aps_class:
@@ -25,81 +215,53 @@ class ExcelHandler:
         
         return full_path
     
-    def parse_unified_excel(self, file_path, product_code, aps_class=None):
+    def parse_unified_excel(self, file_path, product_code, aps_class=None, executor=None):
         """
         Parse a unified Excel file with multiple sheets.
+        
+        With an executor (a bounded process pool) the sheets are parsed
+        concurrently; outputs are committed together once all have parsed,
+        as one new dataset version.
         """
         result = {
             'success': False,
             'files_created': [],
             'errors': [],
-            'warnings': []
+            'warnings': [],
+            'sheets': []
         }
         
         try:
             print(f"[DEBUG] Parsing Excel file: {file_path}")
             print(f"[DEBUG] Product: {product_code}, APS Class: {aps_class}")
             
-            xl = pd.ExcelFile(file_path)
-            available_sheets = xl.sheet_names
+            available_sheets = self.sheet_names(file_path)
             print(f"[DEBUG] Available sheets: {available_sheets}")
             
-            # Process Baseline (required)
-            if EXCEL_SHEETS['baseline'] in available_sheets:
-                df = pd.read_excel(xl, sheet_name=EXCEL_SHEETS['baseline'])
-                print(f"[DEBUG] Baseline sheet columns: {df.columns.tolist()}")
-                print(f"[DEBUG] Baseline sheet shape: {df.shape}")
-                print(f"[DEBUG] Baseline sheet head:\n{df.head()}")
-                
-                baseline_path = self.get_product_filename(
-                    product_code, 'post_processed', aps_class
-                )
-                self._save_yearly_data(df, baseline_path)
-                result['files_created'].append(f"Baseline: {os.path.basename(baseline_path)}")
-            else:
+            # Sheets match as for uploads: ignoring case and spaces
+            sheets = {key: find_sheet(available_sheets, name) for key, name in EXCEL_SHEETS.items()}
+            
+            if sheets['baseline'] is None:
                 result['errors'].append(f"Baseline sheet '{EXCEL_SHEETS['baseline']}' is required. Available sheets: {available_sheets}")
                 return result
             
-            # Process Actuals (optional)
-            if EXCEL_SHEETS['actuals'] in available_sheets:
-                df = pd.read_excel(xl, sheet_name=EXCEL_SHEETS['actuals'])
-                print(f"[DEBUG] Actuals sheet columns: {df.columns.tolist()}")
-                actuals_path = self.get_product_filename(
-                    product_code, 'actual', aps_class
-                )
-                self._save_yearly_data(df, actuals_path)
-                result['files_created'].append(f"Actuals: {os.path.basename(actuals_path)}")
-            else:
-                result['warnings'].append(f"Actuals sheet not found")
-            
-            # Process Delivered (optional)
-            if EXCEL_SHEETS['delivered'] in available_sheets:
-                df = pd.read_excel(xl, sheet_name=EXCEL_SHEETS['delivered'])
-                print(f"[DEBUG] Delivered sheet columns: {df.columns.tolist()}")
-                delivered_path = self.get_product_filename(
-                    product_code, 'Delivered', aps_class
-                )
-                self._save_yearly_data(df, delivered_path)
-                result['files_created'].append(f"Delivered: {os.path.basename(delivered_path)}")
-            else:
-                result['warnings'].append(f"Delivered sheet not found")
-            
-            # Process Weights (product-level only, not APS-specific)
-            if EXCEL_SHEETS['weights'] in available_sheets and aps_class is None:
-                df = pd.read_excel(xl, sheet_name=EXCEL_SHEETS['weights'])
-                print(f"[DEBUG] Weights sheet columns: {df.columns.tolist()}")
-                weights_path = self.get_product_filename(product_code, 'weights', None)
-                self._save_weights(df, weights_path)
-                result['files_created'].append(f"Weights: {os.path.basename(weights_path)}")
-            
-            # Process Market Share (product-level only)
-            if EXCEL_SHEETS['market_share'] in available_sheets and aps_class is None:
-                df = pd.read_excel(xl, sheet_name=EXCEL_SHEETS['market_share'])
-                print(f"[DEBUG] MarketShare sheet columns: {df.columns.tolist()}")
-                ms_path = self.get_product_filename(product_code, 'market_share', None)
-                self._save_yearly_data(df, ms_path)
-                result['files_created'].append(f"Market Share: {os.path.basename(ms_path)}")
-            
+            with self.versions.commit():
+                targets = [(file_path, sheets['baseline'], 'yearly', self.get_product_filename(product_code, 'post_processed', aps_class))]
+                for key, file_type in (('actuals', 'actual'), ('delivered', 'Delivered')):
+                    if sheets[key] is not None:
+                        targets.append((file_path, sheets[key], 'yearly', self.get_product_filename(product_code, file_type, aps_class)))
+                    else:
+                        result['warnings'].append(f"{EXCEL_SHEETS[key]} sheet not found")
+                
+                # Weights and Market Share are product-level only
+                if aps_class is None:
+                    if sheets['weights'] is not None:
+                        targets.append((file_path, sheets['weights'], 'weights', self.get_product_filename(product_code, 'weights', None)))
+                    if sheets['market_share'] is not None:
+                        targets.append((file_path, sheets['market_share'], 'yearly', self.get_product_filename(product_code, 'market_share', None)))
+                
+                result['sheets'] = self.import_sheets(targets, executor)
+            result['files_created'] = [f"{s['sheet']}: {s['outputs'][0]}" for s in result['sheets']]
             result['success'] = True
             print(f"[DEBUG] Parse result: {result}")
             
@@ -111,58 +273,199 @@ class ExcelHandler:
         
         return result
     
-    def _save_yearly_data(self, df, path):
-        """Save yearly data to CSV in standard format"""
-        print(f"[DEBUG] Saving yearly data to: {path}")
-        print(f"[DEBUG] Input columns: {df.columns.tolist()}")
-        
-        # Ensure proper column names
-        expected_cols = ['Year'] + MONTHS
-        
-        # Try to normalize column names - strip whitespace
-        df.columns = df.columns.str.strip()
-        
-        # Handle Year column
-        if 'Year' not in df.columns:
-            if 'year' in df.columns:
-                df = df.rename(columns={'year': 'Year'})
-            elif 'YEAR' in df.columns:
-                df = df.rename(columns={'YEAR': 'Year'})
-        
-        # Ensure all month columns exist with proper casing
-        for col in MONTHS:
-            if col not in df.columns:
-                # Try case-insensitive match
-                for existing_col in df.columns:
-                    if existing_col.lower() == col.lower():
-                        df = df.rename(columns={existing_col: col})
-                        break
-        
-        # Convert Year to integer
-        if 'Year' in df.columns:
-            df['Year'] = df['Year'].astype(int)
-        
-        # Convert month columns to float, replacing NaN with 0
-        for col in MONTHS:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+    def sheet_names(self, file_path):
+        """Sheet names without loading the sheets"""
+        if str(file_path).lower().endswith('.xls'):
+            return pd.ExcelFile(file_path).sheet_names
+        wb = load_workbook(file_path, read_only=True)
+        try:
+            return wb.sheetnames
+        finally:
+            wb.close()
+    
+    def sheet_headers(self, file_path):
+        """{sheet: [header cells as str]}, reading only each first row"""
+        if str(file_path).lower().endswith('.xls'):
+            xl = pd.ExcelFile(file_path)
+            return {
+                sheet: [str(c) for c in pd.read_excel(xl, sheet_name=sheet, nrows=0).columns]
+                for sheet in xl.sheet_names
+            }
+        wb = load_workbook(file_path, read_only=True)
+        try:
+            return {
+                ws.title: ['' if c is None else str(c) for c in next(ws.iter_rows(values_only=True), ())]
+                for ws in wb.worksheets
+            }
+        finally:
+            wb.close()
+    
+    def import_sheets(self, targets, executor=None, on_sheet=None, window=None):
+        """
+        Parse and write a set of independent sheets, from one or more
+        workbooks.
+        
+        targets: [(file path, sheet, kind, output)], kind 'yearly'
+        (normalized) or 'weights' (as is); output is a CSV path, or a
+        callable splitting the parsed frame into [(CSV path, frame)]. Sheets
+        are parsed concurrently on executor (a process pool; inline when
+        None) and written to temporary files as they finish; the outputs
+        replace the live files together only after every sheet parsed, so a
+        failed import changes nothing. on_sheet is called with each sheet's
+        report as it completes.
+        
+        At most window sheets (default: all) are in flight at once, and each
+        parsed frame is released once staged, so peak memory is bounded by
+        the window times the largest sheet rather than the whole workbook.
+        
+        Outputs whose normalized CSV content hashes the same as the live
+        file's are not rewritten (reported as 'unchanged'), so the files,
+        and the DataStore blocks read from them, stay as they are.
+        
+        Returns per-sheet reports in target order.
+        """
+        reports = {}
+        staged = []
+        pending = {}
+        hashes = self.load_hashes()
+        outputs = set()
+        
+        def stage(t, df, parse_seconds):
+            file_path, sheet, _, output = targets[t]
+            started = perf_counter()
+            parts = output(df) if callable(output) else [(output, df)]
+            written, unchanged = [], []
+            for output_path, part in parts:
+                name = os.path.basename(output_path)
+                if output_path in outputs:
+                    raise ValueError(f"{name} is written by more than one sheet")
+                outputs.add(output_path)
+                content = part.to_csv(index=False).encode()
+                digest = hashlib.sha1(content).hexdigest()
+                if self._unchanged(hashes.get(name), output_path, digest):
+                    unchanged.append(name)
+                    continue
+                tmp = f"{output_path}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(content)
+                staged.append((tmp, output_path, digest))
+                written.append(name)
+            reports[t] = {
+                'source': os.path.basename(file_path),
+                'sheet': sheet,
+                'outputs': [os.path.basename(path) for path, _ in parts],
+                'written': written,
+                'unchanged': unchanged,
+                'rows': len(df),
+                'parse_seconds': parse_seconds,
+                'write_seconds': perf_counter() - started
+            }
+            if on_sheet:
+                on_sheet(reports[t])
         
-        print(f"[DEBUG] Output columns: {df.columns.tolist()}")
-        print(f"[DEBUG] Output data:\n{df}")
+        try:
+            if executor is None:
+                for t, (file_path, sheet, kind, _) in enumerate(targets):
+                    stage(t, *parse_sheet(file_path, sheet, kind))
+            else:
+                queue = enumerate(targets)
+                window = window or len(targets)
+                
+                def fill():
+                    for t, (file_path, sheet, kind, _) in islice(queue, window - len(pending)):
+                        pending[executor.submit(parse_sheet, file_path, sheet, kind)] = t
+                
+                fill()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage(pending.pop(future), *future.result())
+                    fill()
+            
+            for tmp, output_path, _ in staged:
+                os.replace(tmp, output_path)
+            if staged:
+                self.record_hashes({output_path: digest for _, output_path, digest in staged})
+        finally:
+            for future in pending:
+                future.cancel()
+            for tmp, _, _ in staged:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        
+        return [reports[t] for t in range(len(targets))]
+    
+    def _unchanged(self, entry, path, digest):
+        """True when the live file still is the one recorded with this hash"""
+        if not entry or entry.get('sha1') != digest or not os.path.exists(path):
+            return False
+        stat = os.stat(path)
+        return entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+    
+    def load_hashes(self):
+        """{csv name: {'sha1', 'size', 'mtime_ns'}} of ingested outputs"""
+        path = os.path.join(self.data_dir, HASHES_FILE)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def record_hashes(self, digests):
+        """Store content hashes of freshly written outputs with their file stats"""
+        with self._hash_lock:
+            hashes = self.load_hashes()
+            for output_path, digest in digests.items():
+                stat = os.stat(output_path)
+                hashes[os.path.basename(output_path)] = {
+                    'sha1': digest,
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns
+                }
+            path = os.path.join(self.data_dir, HASHES_FILE)
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(hashes, f)
+            os.replace(f"{path}.tmp", path)
+    
+    def read_yearly_data(self, path, expected_months=12):
+        """
+        Read CSV with Year column and monthly data.
         
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(path), exist_ok=True) if os.path.dirname(path) else None
+        Files in the canonical layout written at ingest (Year,Jan..Dec or
+        Year,W01..W53) are read straight into arrays. Anything else goes
+        through the legacy reader below, which infers the layout (missing
+        months, fallback numeric columns, the old single-row format);
+        normalize_data_dir() rewrites such files into the canonical layout.
         
-        df.to_csv(path, index=False)
-        print(f"[DEBUG] Saved to {path}, file exists: {os.path.exists(path)}")
+        Weekly files give each year its ISO week count (52 or 53) of values
+        and expected_months does not apply.
+        """
+        try:
+            layout = self._canonical_layout(path)
+            if layout:
+                return self._read_canonical(path, layout, expected_months)
+        except Exception as e:
+            print(f"[ERROR] Error reading {path}: {str(e)}")
+            return {}
+        return self._read_legacy(path, expected_months)
     
-    def _save_weights(self, df, path):
-        """Save weights data to CSV"""
-        print(f"[DEBUG] Saving weights to: {path}")
-        df.to_csv(path, index=False)
+    def _canonical_layout(self, path):
+        """'monthly' / 'weekly' when the file has a canonical header, else None"""
+        if not path or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            header = f.readline().decode('utf-8', errors='replace').strip()
+        return CANONICAL_HEADERS.get(header)
     
-    def read_yearly_data(self, path, expected_months=12):
-        """Read CSV with Year column and monthly data"""
+    def _read_canonical(self, path, layout, expected_months=12):
+        values = np.nan_to_num(pd.read_csv(path, dtype=float, engine='c').to_numpy(), nan=0.0)
+        years = values[:, 0].astype(int)
+        if layout == 'weekly':
+            return {int(y): values[r, 1:1 + iso_weeks(y)].tolist() for r, y in enumerate(years)}
+        return {int(y): values[r, 1:1 + expected_months].tolist() for r, y in enumerate(years)}
+    
+    def _read_legacy(self, path, expected_months=12):
+        """Read a CSV written before the canonical schema, inferring its layout"""
         print(f"[DEBUG] read_yearly_data called with path: {path}")
         
         try:
@@ -193,6 +496,10 @@ class ExcelHandler:
             year_col = 'Year' if 'Year' in df.columns else 'year'
             df[year_col] = df[year_col].astype(int)
             
+            week_cols = [col for col in WEEKS if col in df.columns]
+            if week_cols:
+                return self._read_weekly(df, year_col, week_cols)
+            
             yearly_data = {}
             month_cols = MONTHS[:expected_months]
             
@@ -252,6 +559,49 @@ class ExcelHandler:
             traceback.print_exc()
             return {}
     
+    def normalize_data_dir(self, data_dir=None):
+        """
+        Rewrite yearly CSVs not in the canonical layout (files from before
+        the canonical schema) so every read takes the fast path. Files in
+        the old single-row format keep the year they are read as today.
+        Returns the names of the rewritten files.
+        
+        Without data_dir the live dataset is rewritten as a new version.
+        """
+        if data_dir is None:
+            with self.versions.commit() as staging:
+                return self.normalize_data_dir(staging)
+        rewritten = []
+        for name in sorted(os.listdir(data_dir)):
+            path = os.path.join(data_dir, name)
+            if not name.endswith(YEARLY_FILE_SUFFIXES) or self._canonical_layout(path):
+                continue
+            yearly = self._read_legacy(path)
+            if not yearly:
+                continue
+            weekly = max(len(v) for v in yearly.values()) > len(MONTHS)
+            columns = WEEKLY_COLUMNS if weekly else MONTHLY_COLUMNS
+            rows = [
+                [year] + list(values) + [0.0] * (len(columns) - 1 - len(values))
+                for year, values in sorted(yearly.items())
+            ]
+            df = pd.DataFrame(rows, columns=columns)
+            df[columns[1:]] = df[columns[1:]].astype(float)
+            df.to_csv(f"{path}.tmp", index=False)
+            os.replace(f"{path}.tmp", path)
+            rewritten.append(name)
+        return rewritten
+    
+    def _read_weekly(self, df, year_col, week_cols):
+        """{year: [52 or 53 values]} from a frame with weekly columns"""
+        values = df.reindex(columns=WEEKS).apply(pd.to_numeric, errors='coerce').fillna(0.0).to_numpy(dtype=float)
+        years = df[year_col].to_numpy()
+        print(f"[DEBUG] Weekly data, {len(week_cols)} week columns")
+        return {
+            int(year): values[r, :iso_weeks(year)].tolist()
+            for r, year in enumerate(years)
+        }
+    
     def read_weights(self, path):
         """Read weights file"""
         print(f"[DEBUG] read_weights called with path: {path}")
@@ -276,7 +626,10 @@ class ExcelHandler:
                     except Exception:
                         pass
                 
-                if len(numeric) >= 12:
+                if len(numeric) >= 52:
+                    # Weekly weights
+                    weights_dict[col] = numeric[:len(WEEKS)]
+                elif len(numeric) >= 12:
                     weights_dict[col] = numeric[:12]
                 elif len(numeric) == 1:
                     weights_dict[col] = float(numeric[0])
@@ -350,66 +703,82 @@ class ExcelHandler:
         
         return sorted(list(products)), aps_classes
     
+    def preview_workbook(self, file, rows=5):
+        """
+        First rows, columns and row count of every sheet, streamed from a
+        read-only workbook: row counts come from the sheet dimensions and
+        only the header plus `rows` rows are read, so the cost does not
+        grow with sheet length. Sheets saved without dimensions are counted
+        by iterating, and .xls files fall back to pandas.
+        """
+        name = file if isinstance(file, str) else getattr(file, 'filename', '') or ''
+        if name.lower().endswith('.xls'):
+            return self._preview_xls(file, rows)
+
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            sheets_preview = {}
+            for ws in wb.worksheets:
+                it = ws.iter_rows(values_only=True)
+                header = next(it, ())
+                columns = [
+                    f"Unnamed: {i}" if c is None else str(c)
+                    for i, c in enumerate(header)
+                ]
+                preview_data = []
+                for row in islice(it, rows):
+                    preview_data.append({
+                        col: self._preview_value(v) for col, v in zip(columns, row)
+                    })
+
+                if ws.max_row is not None:
+                    row_count = max(ws.max_row - 1, 0)
+                else:
+                    row_count = len(preview_data) + sum(1 for _ in it)
+
+                sheets_preview[ws.title] = {
+                    'columns': columns,
+                    'row_count': row_count,
+                    'dimensions': ws.calculate_dimension() if ws.max_row is not None else None,
+                    'preview': preview_data
+                }
+            return sheets_preview
+        finally:
+            wb.close()
+
+    def _preview_value(self, value):
+        """JSON-friendly cell value"""
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            value = float(value)
+            return value if np.isfinite(value) else None
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        return value
+
+    def _preview_xls(self, file, rows):
+        xl = pd.ExcelFile(file)
+        sheets_preview = {}
+        for sheet_name in xl.sheet_names:
+            df = pd.read_excel(xl, sheet_name=sheet_name)
+            sheets_preview[sheet_name] = {
+                'columns': [str(c) for c in df.columns.tolist()],
+                'row_count': len(df),
+                'dimensions': None,
+                'preview': [
+                    {str(k): self._preview_value(v) for k, v in row.items()}
+                    for row in df.head(rows).to_dict('records')
+                ]
+            }
+        return sheets_preview
+
     def generate_template_excel(self, product_code, include_aps=False):
-        """Generate a template Excel file for data upload"""
-        template_path = os.path.join(self.data_dir, f"{product_code}_template.xlsx")
-        
-        print(f"[DEBUG] Generating template at: {template_path}")
-        
-        # Ensure directory exists
-        os.makedirs(self.data_dir, exist_ok=True)
-        
-        output = pd.ExcelWriter(template_path, engine='openpyxl')
-        
-        # Baseline template
-        baseline_df = pd.DataFrame({
-            'Year': [2024, 2025],
-            **{month: [0.0, 0.0] for month in MONTHS}
-        })
-        baseline_df.to_excel(output, sheet_name=EXCEL_SHEETS['baseline'], index=False)
-        
-        # Actuals template
-        actuals_df = pd.DataFrame({
-            'Year': [2024],
-            **{month: [0.0] for month in MONTHS}
-        })
-        actuals_df.to_excel(output, sheet_name=EXCEL_SHEETS['actuals'], index=False)
-        
-        # Delivered template
-        delivered_df = pd.DataFrame({
-            'Year': [2025],
-            **{month: [0.0] for month in MONTHS}
-        })
-        delivered_df.to_excel(output, sheet_name=EXCEL_SHEETS['delivered'], index=False)
-        
-        # Weights template (12 rows for months)
-        weights_data = {col: [1.0] * 12 for col in WEIGHT_COLUMNS}
-        weights_df = pd.DataFrame(weights_data)
-        weights_df.to_excel(output, sheet_name=EXCEL_SHEETS['weights'], index=False)
-        
-        # Market Share template
-        ms_df = pd.DataFrame({
-            'Year': [2023, 2024],
-            **{month: [25.0, 25.0] for month in MONTHS}
-        })
-        ms_df.to_excel(output, sheet_name=EXCEL_SHEETS['market_share'], index=False)
-        
-        # Metadata template
-        if include_aps and product_code in PRODUCT_APS_MAPPING:
-            aps_list = PRODUCT_APS_MAPPING[product_code]
-        else:
-            aps_list = []
-        
-        metadata_df = pd.DataFrame({
-            'Property': ['Product', 'APS Classes', 'Created'],
-            'Value': [product_code, ', '.join(aps_list), datetime.now().isoformat()]
-        })
-        metadata_df.to_excel(output, sheet_name=EXCEL_SHEETS['metadata'], index=False)
-        
-        output.close()
-        
-        print(f"[DEBUG] Template created at: {template_path}")
-        return template_path
+        """Template Excel file for data upload, as .xlsx bytes"""
+        hits = template_workbook.cache_info().hits
+        data = template_workbook(product_code, bool(include_aps))
+        metrics.cache('template', template_workbook.cache_info().hits > hits)
+        return data
 
 
 # Singleton instance
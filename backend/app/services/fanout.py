@@ -0,0 +1,134 @@
+import numpy as np
+from .simulation import simulation_engine
+from .market_share import market_share_service
+from .data_store import data_store
+from .rolling import rolling_service
+from ..utils.constants import MONTHS
+
+
+class FanoutService:
+    """
+    Apply one event specification to every product and APS class at once.
+    Each row keeps its own baseline, weights and market share history; all
+    rows are simulated together as one (rows x 12) simulate_batch call.
+    Fan-out runs on the monthly calendar; series with other period counts
+    (weekly products) are reported as missing.
+    """
+
+    def __init__(self, engine=None, store=None, rolling=None):
+        self.engine = engine or simulation_engine
+        self.store = store or data_store
+        self.rolling = rolling or rolling_service
+
+    def simulate(self, spec, year, include_aps=True, products=None, rolling=False):
+        """
+        Parameters:
+        - spec: event specification, the /simulate payload without
+          baseline_vals/weights (ms_mode, ms_params, *_settings,
+          toggle_settings, locked_events, damp_k)
+        - year: baseline year to simulate
+        - include_aps: also simulate each APS class
+        - products: restrict to these product codes
+        - rolling: simulate rolling-forecast baselines (actuals for closed
+          months, which stay fixed)
+
+        Portfolio totals sum product-level rows only, since APS rows break
+        those totals down.
+        """
+        portfolio = self.store.portfolio()
+        blended = self.rolling.portfolio() if rolling else None
+        year = int(year)
+
+        rows, baselines, tables, ms_rows, closed, missing = [], [], [], [], [], []
+        for product in sorted(portfolio):
+            if products and product not in products:
+                continue
+            data = portfolio[product]
+            ms_adjustments = market_share_service.calculate_adjustments(
+                spec.get('ms_mode', 'relative'),
+                spec.get('ms_params', {}),
+                data.market_share,
+                year
+            )
+            ms = [ms_adjustments.get(m, 1.0) for m in MONTHS]
+
+            source = blended[product] if rolling else data
+            series = [(None, source.baseline)]
+            if include_aps:
+                series += [(aps, source.aps[aps]) for aps in sorted(source.aps)]
+            for aps, block in series:
+                values = block.get(year)
+                if values is None or len(values) != len(MONTHS):
+                    missing.append({'product': product, 'aps_class': aps})
+                    continue
+                rows.append((product, aps))
+                baselines.append(values)
+                tables.append(data.weights_for(year))
+                ms_rows.append(ms)
+                closed.append(block.closed_for(year))
+
+        if not rows:
+            return {
+                'year': year,
+                'rows': [],
+                'portfolio': None,
+                'missing': missing
+            }
+
+        baseline = np.array(baselines, dtype=float)
+        batch = self.engine.simulate_batch(
+            baseline_vals=baseline,
+            weights=self.engine.stack_weight_tables(tables),
+            ms_adjustments=np.array(ms_rows, dtype=float),
+            promo_settings=spec.get('promo_settings'),
+            shortage_settings=spec.get('shortage_settings'),
+            regulation_settings=spec.get('regulation_settings'),
+            custom_settings=spec.get('custom_settings'),
+            toggle_settings=spec.get('toggle_settings'),
+            locked_events=spec.get('locked_events'),
+            damp_k=spec.get('damp_k', 0.5),
+            year=year,
+            closed_months=np.array(closed, dtype=np.int64)
+        )
+        simulated = batch['simulated']
+        exceeded = self.engine.count_exceeded_batch(simulated, baseline)
+
+        baseline_totals = baseline.sum(axis=1)
+        simulated_totals = simulated.sum(axis=1)
+        result_rows = []
+        for r, (product, aps) in enumerate(rows):
+            result_rows.append({
+                'product': product,
+                'aps_class': aps,
+                'baseline': baseline[r].tolist(),
+                'simulated': simulated[r].tolist(),
+                'baseline_total': float(baseline_totals[r]),
+                'simulated_total': float(simulated_totals[r]),
+                'delta_pct': self._delta_pct(simulated_totals[r], baseline_totals[r]),
+                'exceeded_count': int(exceeded[r]),
+                'closed_months': int(closed[r])
+            })
+
+        product_rows = np.array([aps is None for _, aps in rows])
+        portfolio_baseline = baseline[product_rows].sum(axis=0)
+        portfolio_simulated = simulated[product_rows].sum(axis=0)
+
+        return {
+            'year': year,
+            'rows': result_rows,
+            'portfolio': {
+                'baseline': portfolio_baseline.tolist(),
+                'simulated': portfolio_simulated.tolist(),
+                'baseline_total': float(portfolio_baseline.sum()),
+                'simulated_total': float(portfolio_simulated.sum()),
+                'delta_pct': self._delta_pct(portfolio_simulated.sum(), portfolio_baseline.sum())
+            },
+            'missing': missing
+        }
+
+    def _delta_pct(self, simulated, baseline):
+        return float((simulated - baseline) / baseline * 100) if baseline else 0.0
+
+
+# Singleton instance
+fanout_service = FanoutService()
@@ -0,0 +1,181 @@
+import numpy as np
+from .simulation import simulation_engine
+from .market_share import market_share_service
+from ..utils.periods import period_labels
+
+
+class GoalSeekService:
+    """
+    Find the slider value that brings the simulation to a target, using a
+    vectorized bracketing search over simulate_batch.
+    """
+
+    # Default search ranges match the dashboard sliders
+    VARIABLE_BOUNDS = {
+        'promo_pct': (0.0, 50.0),
+        'ms_delta': (-50.0, 100.0)
+    }
+
+    def __init__(self, engine=None, grid_size=33, max_iter=12):
+        self.engine = engine or simulation_engine
+        self.grid_size = grid_size
+        self.max_iter = max_iter
+
+    def solve(
+        self,
+        scenario,
+        variable,
+        target,
+        target_month=None,
+        promo_month=None,
+        bounds=None,
+        tolerance=1e-3,
+        start=None
+    ):
+        """
+        Goal-seek one slider.
+
+        Parameters:
+        - scenario: compute_simulation keyword arguments for the current state
+        - variable: 'promo_pct' (promo in promo_month) or 'ms_delta'
+          (relative market share delta)
+        - target: target annual total, or period value when target_month
+          (a period label, e.g. 'May' or 'W20') is set
+        - bounds: (lo, hi) search range, defaults to the slider range
+        - tolerance: stop once the bracket is narrower than this
+        - start: preferred value when several solutions exist (defaults to
+          the current slider value)
+        """
+        labels = period_labels(len(scenario['baseline_vals']))
+        if variable not in self.VARIABLE_BOUNDS:
+            raise ValueError(f"Unknown goal-seek variable: {variable}")
+        if target_month is not None and target_month not in labels:
+            raise ValueError(f"Unknown target month: {target_month}")
+
+        scenario = dict(scenario)
+        promo = dict(scenario.get('promo_settings') or {})
+
+        if variable == 'promo_pct':
+            promo_month = promo_month or promo.get('month')
+            if not promo_month or promo_month == "None" or promo_month not in labels:
+                raise ValueError("A promo month is required to goal-seek promo pct")
+            promo['month'] = promo_month
+            scenario['promo_settings'] = promo
+            current = promo.get('pct', 0)
+        else:
+            if scenario.get('ms_settings', {}).get('mode', 'relative') != 'relative':
+                raise ValueError("ms_delta goal-seek requires relative market share mode")
+            current = scenario.get('ms_settings', {}).get('delta', 0)
+
+        lo, hi = bounds if bounds is not None else self.VARIABLE_BOUNDS[variable]
+        lo, hi = float(lo), float(hi)
+        if not lo < hi:
+            raise ValueError("Goal-seek bounds must satisfy lo < hi")
+        start = float(current if start is None else start)
+        month_idx = labels.index(target_month) if target_month else None
+
+        def objective(values):
+            sim = self._evaluate(scenario, variable, values)
+            totals = sim[:, month_idx] if month_idx is not None else sim.sum(axis=1)
+            return totals - float(target)
+
+        xs = np.linspace(lo, hi, self.grid_size)
+        f = objective(xs)
+        evaluations = len(xs)
+        iterations = 1
+
+        brackets = self._brackets(f)
+        achievable = len(brackets) > 0
+
+        if achievable:
+            # Several crossings are possible (March reduction, June cap);
+            # keep the one nearest the starting value
+            mid = (xs[brackets] + xs[brackets + 1]) / 2.0
+            k = brackets[np.argmin(np.abs(mid - start))]
+            a, b = xs[k], xs[k + 1]
+
+            while b - a > tolerance and iterations < self.max_iter:
+                xs = np.linspace(a, b, self.grid_size)
+                f = objective(xs)
+                evaluations += len(xs)
+                iterations += 1
+                k = self._brackets(f)[0]
+                a, b = xs[k], xs[k + 1]
+
+            fa, fb = f[k], f[k + 1]
+            value = a if fa == fb else a - fa * (b - a) / (fb - fa)
+            value = float(min(max(value, a), b))
+        else:
+            value = float(xs[np.argmin(np.abs(f))])
+
+        result = self._exact(scenario, variable, value)
+        simulated = result['simulated']
+        achieved = simulated[month_idx] if month_idx is not None else float(np.sum(simulated))
+
+        return {
+            'variable': variable,
+            'value': value,
+            'target': float(target),
+            'target_month': target_month,
+            'achieved': float(achieved),
+            'achievable': achievable,
+            'iterations': iterations,
+            'evaluations': evaluations,
+            'result': result
+        }
+
+    def _brackets(self, f):
+        """Indices k where f changes sign between k and k+1"""
+        sign = np.sign(f)
+        return np.flatnonzero(sign[:-1] * sign[1:] <= 0)
+
+    def _evaluate(self, scenario, variable, values):
+        """Simulated (n, periods) for candidate values of the variable"""
+        ms_adjustments = scenario.get('ms_settings', {}).get('adjustments')
+        promo = scenario.get('promo_settings')
+
+        if variable == 'promo_pct':
+            promo = dict(promo, pct=values)
+        else:
+            periods = len(scenario['baseline_vals'])
+            ms_adjustments = np.broadcast_to(1.0 + (values[:, None] / 100.0), (len(values), periods))
+
+        batch = self.engine.simulate_batch(
+            baseline_vals=scenario['baseline_vals'],
+            weights=scenario.get('weights', {}),
+            ms_adjustments=ms_adjustments,
+            promo_settings=promo,
+            shortage_settings=scenario.get('shortage_settings'),
+            regulation_settings=scenario.get('regulation_settings'),
+            custom_settings=scenario.get('custom_settings'),
+            toggle_settings=scenario.get('toggle_settings'),
+            locked_events=scenario.get('locked_events'),
+            damp_k=scenario.get('damp_k', 0.5),
+            year=scenario.get('year')
+        )
+        return batch['simulated']
+
+    def _exact(self, scenario, variable, value):
+        """Single compute_simulation run at the solved value"""
+        scenario = dict(scenario)
+        if variable == 'promo_pct':
+            scenario['promo_settings'] = dict(scenario['promo_settings'], pct=value)
+        else:
+            scenario['ms_settings'] = {
+                'mode': 'relative',
+                'delta': value,
+                'adjustments': market_share_service.calculate_relative_change(
+                    value, len(scenario['baseline_vals'])
+                )
+            }
+        result = self.engine.compute_simulation(**scenario)
+        return {
+            'simulated': [float(v) for v in result['simulated']],
+            'final_multipliers': result['final_multipliers'],
+            'applied_details': result['applied_details'],
+            'ms_adjustments': scenario.get('ms_settings', {}).get('adjustments', {})
+        }
+
+
+# Singleton instance
+goal_seek_service = GoalSeekService()
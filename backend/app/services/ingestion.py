@@ -0,0 +1,420 @@
+import os
+import re
+import copy
+import json
+import time
+import uuid
+import shutil
+import zipfile
+import threading
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+from .excel_handler import excel_handler, canonical_yearly, canonical_weights, find_sheet, SchemaError
+from .aggregates import aggregate_service
+from ..utils.uploads import spool_upload, upload_extension
+from ..config import Config
+
+# (sheet, output name, kind, product-level only); Baseline is required
+UPLOAD_SHEETS = [
+    ('Baseline', 'post_processed', 'yearly', False),
+    ('Weights', 'weights', 'weights', True),
+    ('MarketShare', 'market_share', 'yearly', True),
+    ('Actuals', 'actual', 'yearly', False),
+    ('Delivered', 'Delivered', 'yearly', False)
+]
+
+# Bulk uploads: columns naming the series of each row
+PRODUCT_COLUMNS = ('product', 'productcode')
+APS_COLUMNS = ('aps', 'apsclass')
+
+# Bulk sheet / zip member prefix: PRODUCT or PRODUCT_APS
+SERIES_PATTERN = re.compile(r'^([A-Za-z0-9]+)(?:_(\w[\w ]*))?$')
+
+
+def compact(name):
+    """Sheet / column name for matching: lower case, no spaces or underscores"""
+    return str(name).strip().lower().replace(' ', '').replace('_', '')
+
+
+SHEET_SPECS = {compact(name): (name, output, kind, product_only) for name, output, kind, product_only in UPLOAD_SHEETS}
+
+
+class IngestionService:
+    """
+    Background ingestion of admin workbook uploads.
+
+    submit() stores the upload and returns a job id at once. A small thread
+    pool runs the jobs; the sheets of a workbook are parsed concurrently
+    on a bounded pool of parser processes (ExcelHandler.import_sheets), so
+    a workbook takes about as long as its largest sheet and the openpyxl
+    parse does not hold the GIL of the web worker serving forecast
+    requests. Job state is kept as JSON under JOBS_DIR, so any gunicorn
+    worker can report it.
+
+    submit_bulk() ingests many products in one job, from a zip of
+    workbooks or one workbook. Each sheet is routed by:
+
+    - a sheet-name prefix, 'HP.Baseline' or 'HP_HP_1PH.Actuals'
+    - a Product (and optional APS Class) column, splitting rows by series
+    - for zip members, the workbook name, HP.xlsx or HP_HP_1PH.xlsx
+
+    All sheets of all workbooks go to the parser pool together and are
+    committed at once, followed by a single aggregate refresh.
+
+    Each job writes into a staged dataset version that is published only
+    when the job succeeds (DatasetVersions.commit), so forecast requests
+    never see a half-ingested upload.
+
+    The process holding a queued or running job touches its record every
+    HEARTBEAT_SECONDS. get() reports a job whose record has gone
+    STALE_SECONDS without a heartbeat as failed: the worker running it
+    exited.
+    """
+
+    KEEP_JOBS = 200
+    HEARTBEAT_SECONDS = 15
+    STALE_SECONDS = 120
+
+    def __init__(self, handler=None, aggregates=None, jobs_dir=None, workers=None, parse_processes=None):
+        self.handler = handler or excel_handler
+        self.aggregates = aggregates or aggregate_service
+        self.jobs_dir = jobs_dir or Config.JOBS_DIR
+        self.workers = workers or Config.INGEST_WORKERS
+        self.parse_processes = Config.INGEST_PARSE_PROCESSES if parse_processes is None else parse_processes
+        self.max_upload_bytes = Config.MAX_CONTENT_LENGTH
+        self._lock = threading.Lock()
+        self._executor = None
+        self._parser = None
+        self._heartbeat = None
+        self._futures = {}
+
+    def submit(self, file, product_code, aps_class=None):
+        """Queue an uploaded workbook (path or file storage); returns the job"""
+        return self._queue(file, self._ingest, {
+            'kind': 'upload',
+            'product': product_code,
+            'aps_class': aps_class
+        })
+
+    def submit_bulk(self, file):
+        """Queue a zip of workbooks or a multi-product workbook; returns the job"""
+        return self._queue(file, self._ingest_bulk, {
+            'kind': 'bulk',
+            'product': None,
+            'aps_class': None,
+            'products': {}
+        })
+
+    def _queue(self, file, ingest, fields):
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex[:12]
+        name = file if isinstance(file, str) else file.filename
+        path = spool_upload(
+            file, os.path.join(self.jobs_dir, f"{job_id}{upload_extension(name)}"), self.max_upload_bytes
+        )
+
+        job = {
+            'id': job_id,
+            **fields,
+            'source': os.path.basename(name),
+            'status': 'queued',
+            'created': datetime.now().isoformat(),
+            'started': None,
+            'finished': None,
+            'progress': {'done': 0, 'total': None},
+            'sheets': [],
+            'files_created': [],
+            'unchanged': [],
+            'warnings': [],
+            'message': None,
+            'version': None
+        }
+        self._save(job)
+        self._prune()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+                self._heartbeat = threading.Thread(target=self._beat, name='ingest-heartbeat', daemon=True)
+                self._heartbeat.start()
+            self._futures[job_id] = self._executor.submit(self._run, copy.deepcopy(job), path, ingest)
+        return job
+
+    def get(self, job_id):
+        """Job state, or None for an unknown id"""
+        path = self._job_path(job_id)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            job = json.load(f)
+        if job['status'] in ('queued', 'running') and job_id not in self._futures:
+            if time.time() - os.path.getmtime(path) > self.STALE_SECONDS:
+                job['status'] = 'failed'
+                job['message'] = 'Ingestion stopped: the worker running this job exited'
+                job['finished'] = datetime.now().isoformat()
+                self._save(job)
+        return job
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job submitted by this process finishes"""
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        return self.get(job_id)
+
+    def _run(self, job, path, ingest):
+        job['status'] = 'running'
+        job['started'] = datetime.now().isoformat()
+        self._save(job)
+        started = time.perf_counter()
+        try:
+            # Stage every output in a new dataset version, published at once
+            with self.handler.versions.commit() as staged:
+                job['message'] = ingest(job, path)
+            job['version'] = staged.version or self.handler.versions.current()
+            job['status'] = 'done'
+        except Exception as e:
+            import traceback
+            print(f"Upload error: {e}")
+            traceback.print_exc()
+            job['status'] = 'failed'
+            job['message'] = str(e)
+        else:
+            # Rebuild report aggregates for the new data; the data is live
+            # either way, so a failure here only leaves the reports stale
+            try:
+                with staged.pin():
+                    self.aggregates.refresh()
+            except Exception as e:
+                import traceback
+                print(f"Aggregate refresh error: {e}")
+                traceback.print_exc()
+                job['warnings'].append(f"Report aggregates not refreshed: {e}")
+        finally:
+            job['finished'] = datetime.now().isoformat()
+            job['seconds'] = time.perf_counter() - started
+            self._save(job)
+            self._futures.pop(job['id'], None)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _beat(self):
+        """Touch the records of this process's queued and running jobs"""
+        while True:
+            time.sleep(self.HEARTBEAT_SECONDS)
+            with self._lock:
+                job_ids = list(self._futures)
+            for job_id in job_ids:
+                try:
+                    os.utime(self._job_path(job_id))
+                except OSError:
+                    pass
+
+    def _ingest(self, job, path):
+        product_code, aps_class = job['product'], job['aps_class']
+        available_sheets = self.handler.sheet_names(path)
+
+        if find_sheet(available_sheets, 'Baseline') is None:
+            raise ValueError(f'Baseline sheet not found. Available sheets: {available_sheets}')
+        if not aps_class and find_sheet(available_sheets, 'Weights') is None:
+            job['warnings'].append('Weights sheet not found')
+
+        targets, names = [], {}
+        for name, output, kind, product_only in UPLOAD_SHEETS:
+            sheet = find_sheet(available_sheets, name)
+            if sheet is None or (product_only and aps_class):
+                continue
+            if aps_class and not product_only:
+                output_path = os.path.join(self.handler.data_dir, f"{product_code}_{aps_class}_{output}.csv")
+            else:
+                output_path = os.path.join(self.handler.data_dir, f"{product_code}_{output}.csv")
+            targets.append((path, sheet, kind, output_path))
+            names[sheet] = name
+        reports = self._import(job, targets)
+        job['files_created'] = [f"{names[r['sheet']]}: {r['outputs'][0]}" for r in reports]
+        return f"Data uploaded for {product_code}"
+
+    def _ingest_bulk(self, job, path):
+        workdir = f"{path}.d"
+        try:
+            if path.endswith('.zip'):
+                workbooks = self._extract(path, workdir)
+            else:
+                workbooks = [(job['source'], path, None)]
+
+            targets, products = [], {}
+            for name, wb_path, default in workbooks:
+                targets += self._plan_workbook(wb_path, name, default, job['warnings'], products)
+            if not targets:
+                raise ValueError('No product sheets found; name sheets like HP.Baseline, '
+                                 'add a Product column, or name zip members after products')
+
+            reports = self._import(job, targets)
+            for (product, aps), types in sorted(products.items(), key=lambda kv: (kv[0][0], kv[0][1] or '')):
+                if 'Baseline' not in types:
+                    job['warnings'].append(f"{product}{'/' + aps if aps else ''}: no Baseline sheet")
+            job['files_created'] = sorted({o for r in reports for o in r['outputs']})
+            for r in reports:
+                for output in r['outputs']:
+                    product = output.split('_', 1)[0]
+                    job['products'].setdefault(product, []).append(output)
+            return f"Bulk upload: {len(job['files_created'])} files for {len(job['products'])} products"
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _import(self, job, targets):
+        """Run targets through ExcelHandler.import_sheets, tracking progress"""
+        job['progress']['total'] = len(targets)
+        self._save(job)
+
+        def on_sheet(report):
+            job['sheets'].append(report)
+            job['progress']['done'] += 1
+            self._save(job)
+
+        job['sheets'] = self.handler.import_sheets(targets, self._pool(), on_sheet, window=self.parse_processes or None)
+        job['unchanged'] = sorted(name for r in job['sheets'] for name in r['unchanged'])
+        return job['sheets']
+
+    def _extract(self, path, workdir):
+        """Workbook members of a zip as [(name, path, (product, aps) from the name)]"""
+        os.makedirs(workdir, exist_ok=True)
+        workbooks = []
+        with zipfile.ZipFile(path) as zf:
+            members = [
+                info for info in zf.infolist()
+                if not info.is_dir()
+                and info.filename.lower().endswith(('.xlsx', '.xls'))
+                and not os.path.basename(info.filename).startswith(('.', '~$'))
+                and '__MACOSX' not in info.filename
+            ]
+            if sum(info.file_size for info in members) > Config.MAX_BULK_UNCOMPRESSED:
+                raise ValueError('Archive is too large once uncompressed')
+            for info in members:
+                name = os.path.basename(info.filename)
+                dest = os.path.join(workdir, name)
+                if os.path.exists(dest):
+                    raise ValueError(f"Duplicate workbook name in archive: {name}")
+                with zf.open(info) as src, open(dest, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                workbooks.append((name, dest, self._series(os.path.splitext(name)[0])))
+        return workbooks
+
+    def _series(self, prefix):
+        """(PRODUCT, APS or None) from 'HP' / 'HP_HP_1PH', or None"""
+        match = SERIES_PATTERN.match(prefix.strip())
+        if not match:
+            return None
+        aps = match.group(2)
+        return match.group(1).upper(), aps.strip().replace(' ', '_') if aps else None
+
+    def _plan_workbook(self, path, name, default, warnings, products):
+        """Import targets for every routable sheet of one bulk workbook"""
+        targets = []
+        for sheet, header in self.handler.sheet_headers(path).items():
+            prefix, base = sheet.rsplit('.', 1) if '.' in sheet else (None, sheet)
+            spec = SHEET_SPECS.get(compact(base))
+            if spec is None:
+                warnings.append(f"{name}: sheet '{sheet}' ignored")
+                continue
+            sheet_type, output, kind, product_only = spec
+
+            columns = {compact(c) for c in header}
+            series = self._series(prefix) if prefix else None
+            if prefix and series is None:
+                warnings.append(f"{name}: sheet '{sheet}' has no valid product prefix")
+            elif series is None and any(c in columns for c in PRODUCT_COLUMNS):
+                targets.append((path, sheet, 'raw', self._splitter(sheet, sheet_type, output, kind, product_only, warnings, products)))
+                continue
+            series = series or default
+            if series is None:
+                warnings.append(f"{name}: sheet '{sheet}' ignored, no product")
+                continue
+
+            product, aps = series
+            if aps and product_only:
+                warnings.append(f"{name}: {sheet_type} is product-level only, '{sheet}' ignored")
+                continue
+            products.setdefault(series, set()).add(sheet_type)
+            targets.append((path, sheet, kind, self.handler.get_product_filename(product, output, aps)))
+        return targets
+
+    def _splitter(self, sheet, sheet_type, output, kind, product_only, warnings, products):
+        """
+        Split a sheet parsed as is into one canonical CSV per Product / APS
+        Class (the schema, e.g. unique years, holds per series)
+        """
+        canonical = canonical_yearly if kind == 'yearly' else canonical_weights
+        def split(df):
+            cols = {compact(c): c for c in df.columns}
+            product_col = next(cols[c] for c in PRODUCT_COLUMNS if c in cols)
+            aps_col = next((cols[c] for c in APS_COLUMNS if c in cols), None)
+
+            df = df[df[product_col].notna()]
+            product = df[product_col].astype(str).str.strip().str.upper()
+            if aps_col:
+                aps = df[aps_col].fillna('').astype(str).str.strip().str.replace(' ', '_')
+            else:
+                aps = pd.Series('', index=df.index)
+            drop = [c for c in (product_col, aps_col) if c]
+
+            parts, errors = [], []
+            for (p, a), part in df.groupby([product, aps], sort=True):
+                if a and product_only:
+                    warnings.append(f"{sheet_type} is product-level only, rows for {p} {a} ignored")
+                    continue
+                products.setdefault((p, a or None), set()).add(sheet_type)
+                try:
+                    part = canonical(part.drop(columns=drop))
+                except SchemaError as e:
+                    errors.append(f"{sheet} ({p}{'/' + a if a else ''}): {e}")
+                    continue
+                parts.append((self.handler.get_product_filename(p, output, a or None), part))
+            if errors:
+                raise SchemaError('; '.join(errors))
+            return parts
+        return split
+
+    def _pool(self):
+        """Parser process pool bounded by the CPU count, or None to parse inline"""
+        if not self.parse_processes:
+            return None
+        with self._lock:
+            if self._parser is None:
+                self._parser = ProcessPoolExecutor(
+                    max_workers=min(self.parse_processes, os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+        return self._parser
+
+    def _job_path(self, job_id):
+        if not job_id or not job_id.isalnum():
+            return None
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        path = self._job_path(job['id'])
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp, path)
+
+    def _prune(self):
+        """Keep the most recent KEEP_JOBS finished job records"""
+        records = sorted(
+            (e for e in os.scandir(self.jobs_dir) if e.name.endswith('.json')),
+            key=lambda e: e.stat().st_mtime
+        )
+        for entry in records[:-self.KEEP_JOBS]:
+            try:
+                with open(entry.path) as f:
+                    if json.load(f).get('status') in ('done', 'failed'):
+                        os.remove(entry.path)
+            except (OSError, ValueError):
+                pass
+
+
+# Singleton instance
+ingestion_service = IngestionService()
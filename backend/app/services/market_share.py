@@ -1,33 +1,60 @@
 import numpy as np
-from ..utils.constants import MONTHS
+from ..utils.periods import period_labels, period_index
 
 class MarketShareService:
     
-    def calculate_relative_change(self, delta_pct):
+    def calculate_adjustments(self, ms_mode, ms_params, market_share_data=None, selected_year=2025, periods=12):
+        """Per-period adjustments (monthly by default) for the requested mode"""
+        ms_params = ms_params or {}
+        
+        if ms_mode == 'relative':
+            return self.calculate_relative_change(ms_params.get('delta', 0), periods)
+        elif ms_mode == 'historical':
+            return self.calculate_historical_trend(
+                market_share_data,
+                selected_year,
+                ms_params.get('trend_strength', 100),
+                ms_params.get('apply_seasonality', True),
+                periods
+            )
+        elif ms_mode == 'competitive':
+            return self.calculate_competitive_intelligence(ms_params, periods)
+        elif ms_mode == 'macro':
+            return self.calculate_macro_scenario(
+                ms_params.get('market_growth', 0),
+                ms_params.get('our_capacity', 0),
+                periods
+            )
+        
+        return {m: 1.0 for m in period_labels(periods)}
+    
+    def calculate_relative_change(self, delta_pct, periods=12):
         """
         Mode 1: Relative Change - uniform adjustment
         """
         adjustment = 1.0 + (delta_pct / 100.0)
-        return {m: adjustment for m in MONTHS}
+        return {m: adjustment for m in period_labels(periods)}
     
     def calculate_historical_trend(
         self,
         market_share_data,
         selected_year,
         trend_strength=100,
-        apply_seasonality=True
+        apply_seasonality=True,
+        periods=12
     ):
         """
         Mode 2: Historical Trend - data-driven projection
         """
+        labels = period_labels(periods)
         if not market_share_data:
-            return {m: 1.0 for m in MONTHS}
+            return {m: 1.0 for m in labels}
         
-        # Get complete years (all 12 months with valid data)
-        complete_years = self._get_complete_years(market_share_data, selected_year)
+        # Get complete years (every period with valid data)
+        complete_years = self._get_complete_years(market_share_data, selected_year, periods)
         
         if len(complete_years) < 2:
-            return {m: 1.0 for m in MONTHS}
+            return {m: 1.0 for m in labels}
         
         # Calculate annual averages and trend
         annual_avg = {year: np.mean(market_share_data[year]) for year in complete_years}
@@ -53,89 +80,98 @@ class MarketShareService:
         # Calculate seasonal indices
         seasonal_index = {}
         if apply_seasonality:
-            for month_idx in range(12):
+            for month_idx in range(periods):
                 month_values = [market_share_data[year][month_idx] for year in complete_years]
                 month_avg = np.mean(month_values)
                 overall_avg = np.mean(ms_array)
                 seasonal_index[month_idx] = month_avg / overall_avg if overall_avg > 0 else 1.0
         else:
-            seasonal_index = {i: 1.0 for i in range(12)}
+            seasonal_index = {i: 1.0 for i in range(periods)}
         
         # Apply adjustments
         adjustments = {}
-        for month_idx, month in enumerate(MONTHS):
+        for month_idx, month in enumerate(labels):
             month_delta = final_delta * seasonal_index[month_idx]
             adjustments[month] = 1.0 + month_delta
         
         return adjustments
     
-    def calculate_competitive_intelligence(self, event_config):
+    def calculate_competitive_intelligence(self, event_config, periods=12):
         """
         Mode 3: Competitive Intelligence - event-based
+        
+        Months and durations are in periods of the calendar (weeks for a
+        weekly forecast).
         """
         event_type = event_config.get('type', 'single')
+        labels = period_labels(periods)
         
         if event_type == 'single':
             return self._single_event(
-                event_config.get('month', 'Jan'),
+                event_config.get('month', labels[0]),
                 event_config.get('impact', 0),
-                event_config.get('duration', 1)
+                event_config.get('duration', 1),
+                periods
             )
         elif event_type == 'gradual':
             return self._gradual_shift(
-                event_config.get('start_month', 'Apr'),
-                event_config.get('end_month', 'Sep'),
-                event_config.get('cumulative_impact', -10)
+                event_config.get('start_month', 'Apr' if periods == 12 else labels[periods // 4]),
+                event_config.get('end_month', 'Sep' if periods == 12 else labels[periods * 3 // 4]),
+                event_config.get('cumulative_impact', -10),
+                periods
             )
         elif event_type == 'recovery':
             return self._recovery_scenario(
                 event_config.get('loss_duration', 3),
                 event_config.get('initial_loss', -15),
-                event_config.get('recovery_duration', 5)
+                event_config.get('recovery_duration', 5),
+                periods
             )
         
-        return {m: 1.0 for m in MONTHS}
+        return {m: 1.0 for m in labels}
     
-    def calculate_macro_scenario(self, market_growth, our_capacity):
+    def calculate_macro_scenario(self, market_growth, our_capacity, periods=12):
         """
         Mode 4: Macro Scenario - market size vs capacity
         """
         relative_growth = our_capacity - market_growth
         adjustment = 1.0 + (relative_growth / 100.0)
-        return {m: adjustment for m in MONTHS}
+        return {m: adjustment for m in period_labels(periods)}
     
-    def _get_complete_years(self, market_share_data, selected_year):
-        """Get years with complete 12-month data"""
+    def _get_complete_years(self, market_share_data, selected_year, periods=12):
+        """Get years with data for every period"""
         complete = []
         for year, values in market_share_data.items():
             if year >= selected_year:
                 continue
-            if len(values) == 12 and all(v > 0 and not np.isnan(v) for v in values):
+            if len(values) == periods and all(v > 0 and not np.isnan(v) for v in values):
                 complete.append(year)
         return sorted(complete)
     
-    def _single_event(self, event_month, impact, duration):
+    def _single_event(self, event_month, impact, duration, periods=12):
         """Single event impact for specified duration"""
-        adjustments = {m: 1.0 for m in MONTHS}
-        start_idx = MONTHS.index(event_month)
+        labels = period_labels(periods)
+        adjustments = {m: 1.0 for m in labels}
+        start_idx = period_index(event_month, periods) - 1
         
-        for i in range(start_idx, min(start_idx + duration, 12)):
-            adjustments[MONTHS[i]] = 1.0 + (impact / 100.0)
+        for i in range(start_idx, min(start_idx + duration, periods)):
+            adjustments[labels[i]] = 1.0 + (impact / 100.0)
         
         return adjustments
     
-    def _gradual_shift(self, start_month, end_month, cumulative_impact):
+    def _gradual_shift(self, start_month, end_month, cumulative_impact, periods=12):
         """Gradual shift from start to end month"""
-        adjustments = {m: 1.0 for m in MONTHS}
-        start_idx = MONTHS.index(start_month)
-        end_idx = MONTHS.index(end_month)
+        labels = period_labels(periods)
+        adjustments = {m: 1.0 for m in labels}
+        start_idx = period_index(start_month, periods) - 1
+        end_idx = period_index(end_month, periods) - 1
         
         if end_idx < start_idx:
             return adjustments
         
         transition_months = end_idx - start_idx + 1
         
-        for i, month in enumerate(MONTHS):
+        for i, month in enumerate(labels):
             if i < start_idx:
                 adjustments[month] = 1.0
             elif i <= end_idx:
@@ -147,11 +183,12 @@ class MarketShareService:
         
         return adjustments
     
-    def _recovery_scenario(self, loss_duration, initial_loss, recovery_duration):
+    def _recovery_scenario(self, loss_duration, initial_loss, recovery_duration, periods=12):
         """Temporary loss with recovery"""
-        adjustments = {m: 1.0 for m in MONTHS}
+        labels = period_labels(periods)
+        adjustments = {m: 1.0 for m in labels}
         
-        for i, month in enumerate(MONTHS):
+        for i, month in enumerate(labels):
             if i < loss_duration:
                 adjustments[month] = 1.0 + (initial_loss / 100.0)
             elif i < loss_duration + recovery_duration:
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import uuid
+import threading
+from bisect import bisect_left
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# name: (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by blueprint, route, method and status'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by blueprint and route'),
+    'http_request_size_bytes': ('histogram', 'Request body size by blueprint and route'),
+    'http_response_size_bytes': ('histogram', 'Response body size by blueprint and route'),
+    'cache_requests_total': ('counter', 'Cache lookups by cache and result (hit / miss)'),
+    'cache_hit_ratio': ('gauge', 'Share of cache lookups that hit, over all workers'),
+    'simulations_total': ('counter', 'Simulation calls by engine path'),
+    'simulated_rows_total': ('counter', 'Scenario rows simulated by engine path')
+}
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms, rendered in the Prometheus text
+    exposition format.
+
+    Recording is a dict update under a lock, with labels passed as tuples
+    of (name, value) pairs, so it can stay on in production. When a
+    directory is set, each process writes its values to its own
+    <pid>-<random>.json there (at most every FLUSH_SECONDS, and on every
+    scrape; a worker reusing a dead worker's pid gets a new file), and
+    render() sums the files of all processes, so any gunicorn worker
+    serves the totals of all of them. Files of workers that exited keep counting, as counters
+    never go down; clear the directory on deploy to start from zero.
+    """
+
+    FLUSH_SECONDS = 5.0
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._flushed = 0.0
+        self._file_pid = None
+        self._file = None
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            self._observe(name, labels, value, buckets)
+
+    def cache(self, cache, hit):
+        """Count one lookup of a named cache"""
+        self.inc('cache_requests_total', (('cache', cache), ('result', 'hit' if hit else 'miss')))
+
+    def observe_request(self, blueprint, route, method, status, seconds, request_bytes, response_bytes):
+        """Record one finished request (a single lock round trip)"""
+        labels = (('blueprint', blueprint), ('route', route))
+        key = ('http_requests_total', labels + (('method', method), ('status', str(status))))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            self._observe('http_request_duration_seconds', labels, seconds, LATENCY_BUCKETS)
+            self._observe('http_request_size_bytes', labels, request_bytes, SIZE_BUCKETS)
+            self._observe('http_response_size_bytes', labels, response_bytes, SIZE_BUCKETS)
+        if self.directory and time.monotonic() - self._flushed > self.FLUSH_SECONDS:
+            self.flush()
+
+    def _observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = [0] * (len(buckets) + 1) + [0.0, list(buckets)]
+        hist[bisect_left(buckets, value)] += 1
+        hist[-2] += value
+
+    def snapshot(self):
+        """{'counters': [[name, labels, value]], 'histograms': [[name, labels, counts, sum, buckets]]}"""
+        with self._lock:
+            return {
+                'counters': [[n, [list(l) for l in labels], v] for (n, labels), v in self._counters.items()],
+                'histograms': [
+                    [n, [list(l) for l in labels], h[:-2], h[-2], h[-1]]
+                    for (n, labels), h in self._histograms.items()
+                ]
+            }
+
+    def flush(self):
+        """Write this process's values to the shared directory"""
+        self._flushed = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, self._filename())
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def _filename(self):
+        """This process's file name, new after a fork"""
+        pid = os.getpid()
+        if self._file_pid != pid:
+            self._file_pid = pid
+            self._file = f"{pid}-{uuid.uuid4().hex[:8]}.json"
+        return self._file
+
+    def collect(self):
+        """Snapshots of every process (just this one without a directory)"""
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                pass
+        return snapshots
+
+    def render(self):
+        """Totals over all processes in the text exposition format"""
+        counters, histograms = {}, {}
+        for snap in self.collect():
+            for name, labels, value in snap['counters']:
+                key = (name, tuple(tuple(l) for l in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, counts, total, buckets in snap['histograms']:
+                key = (name, tuple(tuple(l) for l in labels))
+                if key not in histograms:
+                    histograms[key] = [[0] * len(counts), 0.0, buckets]
+                merged = histograms[key]
+                merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+
+        hits = {}
+        for (name, labels), value in counters.items():
+            if name == 'cache_requests_total':
+                cache, result = dict(labels)['cache'], dict(labels)['result']
+                hits.setdefault(cache, [0, 0])[result == 'hit'] += value
+        gauges = {
+            ('cache_hit_ratio', (('cache', cache),)): hit / (hit + miss)
+            for cache, (miss, hit) in hits.items()
+        }
+
+        lines = []
+        for metric, (kind, help_text) in METRICS.items():
+            if kind == 'histogram':
+                series = sorted((k, v) for k, v in histograms.items() if k[0] == metric)
+            else:
+                values = gauges if kind == 'gauge' else counters
+                series = sorted((k, v) for k, v in values.items() if k[0] == metric)
+            if not series:
+                continue
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (_, labels), value in series:
+                if kind != 'histogram':
+                    lines.append(f"{metric}{self._labels(labels)} {self._number(value)}")
+                    continue
+                counts, total, buckets = value
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += count
+                    le = (('le', bound if bound == '+Inf' else self._number(bound)),)
+                    lines.append(f"{metric}_bucket{self._labels(labels + le)} {cumulative}")
+                lines.append(f"{metric}_sum{self._labels(labels)} {self._number(total)}")
+                lines.append(f"{metric}_count{self._labels(labels)} {cumulative}")
+        return '\n'.join(lines) + '\n'
+
+    def _labels(self, labels):
+        if not labels:
+            return ''
+        escaped = (
+            (k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for k, v in labels
+        )
+        return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+    def _number(self, value):
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# Singleton instance
+metrics = MetricsRegistry()
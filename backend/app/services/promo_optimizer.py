@@ -0,0 +1,190 @@
+import numpy as np
+from collections import Counter
+from .simulation import simulation_engine
+from ..utils.periods import period_labels, period_index, period_months
+
+
+class PromoOptimizer:
+    """
+    Choose the months for K promotions that maximize annual simulated volume.
+
+    Calendars are built one promo at a time in month order (beam search).
+    Each level expands every kept partial calendar by every feasible next
+    month and promo level, scores all expansions with one simulate_batch
+    call per chunk, and keeps the best `beam_width`. Structural constraints
+    (spacing, per-quarter limit, room for the remaining promos) prune before
+    anything is simulated; when the frontier fits in the beam the search is
+    exhaustive.
+    """
+
+    def __init__(self, engine=None, beam_width=4096, batch_size=8192):
+        self.engine = engine or simulation_engine
+        self.beam_width = beam_width
+        self.batch_size = batch_size
+
+    def optimize(
+        self,
+        scenario,
+        pcts,
+        max_per_quarter=None,
+        no_adjacent=True,
+        max_exceeded=None,
+        months=None,
+        top_n=5,
+        sensitivity=1.5
+    ):
+        """
+        Parameters:
+        - scenario: compute_simulation keyword arguments; the current promo
+          is replaced, its spill settings are reused for every promo
+        - pcts: promo pct level for each of the K promotions
+        - max_per_quarter: at most this many promos in a calendar quarter
+        - no_adjacent: forbid promos in consecutive months
+        - max_exceeded: at most this many months over the
+          calculate_exceeded_months threshold
+        - months: allowed promo periods (defaults to all)
+        """
+        periods = len(scenario['baseline_vals'])
+        labels = period_labels(periods)
+        pcts = [float(p) for p in pcts]
+        if not pcts or len(pcts) > periods:
+            raise ValueError(f"Between 1 and {periods} promotions are required")
+
+        allowed = sorted(period_index(m, periods) for m in (months or labels))
+        quarter_of = [0] + [(int(m) - 1) // 3 for m in period_months(periods, scenario.get('year'))]
+        levels = sorted(Counter(pcts).items())
+        k_total = len(pcts)
+        gap = 2 if no_adjacent else 1
+        quarter_cap = max_per_quarter if max_per_quarter is not None else k_total
+
+        promo = dict(scenario.get('promo_settings') or {})
+        spill = {
+            'spill_enabled': promo.get('spill_enabled', True),
+            'spill_pct': promo.get('spill_pct', 10)
+        }
+        reference = self._evaluate(scenario, spill, np.zeros((1, 0), dtype=np.int64), np.zeros((1, 0)))
+        reference_total = float(reference.sum())
+
+        # Partial calendars: (months, pcts, remaining count per level)
+        beam = [((), (), tuple(c for _, c in levels))]
+        evaluated = 0
+        pruned = 0
+
+        for depth in range(k_total):
+            remaining_after = k_total - depth - 1
+            expansions = []
+            for cal_months, cal_pcts, remaining in beam:
+                last = cal_months[-1] if cal_months else -gap
+                quarters = Counter(quarter_of[m] for m in cal_months)
+                for m in allowed:
+                    if m < last + gap:
+                        continue
+                    if quarters[quarter_of[m]] >= quarter_cap:
+                        pruned += 1
+                        continue
+                    if self._room_after(allowed, m, gap) < remaining_after:
+                        pruned += 1
+                        continue
+                    for lvl, (pct, _) in enumerate(levels):
+                        if remaining[lvl] == 0:
+                            continue
+                        rest = remaining[:lvl] + (remaining[lvl] - 1,) + remaining[lvl + 1:]
+                        expansions.append((cal_months + (m,), cal_pcts + (pct,), rest))
+
+            if not expansions:
+                beam = []
+                break
+
+            month_arr = np.array([e[0] for e in expansions], dtype=np.int64)
+            pct_arr = np.array([e[1] for e in expansions], dtype=float)
+            totals = np.empty(len(expansions))
+            exceeded = np.zeros(len(expansions), dtype=np.int64)
+
+            for lo in range(0, len(expansions), self.batch_size):
+                hi = lo + self.batch_size
+                sim = self._evaluate(scenario, spill, month_arr[lo:hi], pct_arr[lo:hi])
+                totals[lo:hi] = sim.sum(axis=1)
+                exceeded[lo:hi] = self.engine.count_exceeded_batch(
+                    sim, scenario['baseline_vals'], sensitivity
+                )
+            evaluated += len(expansions)
+
+            # The exceedance limit is only final once every promo is placed:
+            # a later promo's March reduction can bring March back under
+            keep = np.arange(len(expansions))
+            if remaining_after == 0 and max_exceeded is not None:
+                keep = keep[exceeded <= max_exceeded]
+                pruned += len(expansions) - len(keep)
+
+            order = keep[np.argsort(-totals[keep], kind='stable')][:self.beam_width]
+            beam = [expansions[i] for i in order]
+            scores = [(float(totals[i]), int(exceeded[i])) for i in order]
+
+        calendars = []
+        for (cal_months, cal_pcts, _), (total, n_exceeded) in list(zip(beam, scores if beam else []))[:top_n]:
+            calendars.append({
+                'months': [labels[m - 1] for m in cal_months],
+                'pcts': list(cal_pcts),
+                'annual_total': total,
+                'uplift': total - reference_total,
+                'uplift_pct': (total - reference_total) / reference_total * 100 if reference_total else 0.0,
+                'exceeded_count': n_exceeded
+            })
+
+        best = None
+        if calendars:
+            top_months, top_pcts = beam[0][0], beam[0][1]
+            best_sim = self._evaluate(
+                scenario, spill,
+                np.array([top_months], dtype=np.int64), np.array([top_pcts], dtype=float)
+            )[0]
+            best = {
+                'simulated': best_sim.tolist(),
+                'exceeded_months': self.engine.calculate_exceeded_months(
+                    best_sim, scenario['baseline_vals'], sensitivity
+                )
+            }
+
+        return {
+            'calendars': calendars,
+            'best': best,
+            'feasible': bool(calendars),
+            'reference_total': reference_total,
+            'evaluated': evaluated,
+            'pruned': pruned
+        }
+
+    def _room_after(self, allowed, month, gap):
+        """How many more promos fit after month with the given spacing"""
+        count, last = 0, month
+        for m in allowed:
+            if m >= last + gap:
+                count += 1
+                last = m
+        return count
+
+    def _evaluate(self, scenario, spill, month_arr, pct_arr):
+        """Simulated (N, periods) for N calendars of promo months and pcts"""
+        promos = [
+            dict(spill, month=month_arr[:, j], pct=pct_arr[:, j])
+            for j in range(month_arr.shape[1])
+        ] or [{'month': None}]
+
+        batch = self.engine.simulate_batch(
+            baseline_vals=scenario['baseline_vals'],
+            weights=scenario.get('weights', {}),
+            ms_adjustments=scenario.get('ms_settings', {}).get('adjustments'),
+            promo_settings=promos,
+            shortage_settings=scenario.get('shortage_settings'),
+            regulation_settings=scenario.get('regulation_settings'),
+            custom_settings=scenario.get('custom_settings'),
+            toggle_settings=scenario.get('toggle_settings'),
+            locked_events=scenario.get('locked_events'),
+            damp_k=scenario.get('damp_k', 0.5),
+            year=scenario.get('year')
+        )
+        return np.broadcast_to(batch['simulated'], (len(month_arr), batch['simulated'].shape[-1]))
+
+
+# Singleton instance
+promo_optimizer = PromoOptimizer()
@@ -0,0 +1,69 @@
+import numpy as np
+from .data_store import data_store
+from ..models import SeriesBlock
+
+
+class RollingForecastService:
+    """
+    Rolling-forecast baselines: actuals for closed months, baseline for open
+    months. A month is closed when it is part of the leading run of months
+    with recorded actuals. Blends are built for every product, APS class and
+    year once per dataset version.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or data_store
+
+    def blend(self, baseline, actual):
+        """Return (blended values, number of closed periods)"""
+        baseline = np.asarray(baseline, dtype=float)
+        if actual is None:
+            return baseline.tolist(), 0
+        actual = np.asarray(actual, dtype=float)
+        recorded = np.isfinite(actual) & (actual > 0)
+        closed = int(np.argmin(recorded)) if not recorded.all() else len(recorded)
+        blended = np.concatenate([actual[:closed], baseline[closed:]])
+        return blended.tolist(), closed
+
+    def portfolio(self):
+        """
+        Blended view of every product, as ProductDataset copies whose
+        baseline blocks (product and APS) hold the blend and carry the
+        closed periods per year.
+        """
+        return self.store.derived('rolling_portfolio', self._build)
+
+    def product(self, product):
+        return self.portfolio().get(product)
+
+    def blend_block(self, baseline, actual):
+        """Blend every year of a baseline SeriesBlock with its actuals at once"""
+        rows = [actual._row(y) for y in baseline.years]
+        aligned = np.full(baseline.values.shape, np.nan)
+        for r, a in enumerate(rows):
+            if a is not None:
+                n = min(actual.lengths[a], baseline.periods)
+                aligned[r, :n] = actual.values[a, :n]
+
+        recorded = np.isfinite(aligned) & (aligned > 0)
+        closed = np.where(recorded.all(axis=1), baseline.periods, np.argmin(recorded, axis=1))
+        closed = np.minimum(closed, baseline.lengths)
+        frozen = np.arange(baseline.periods) < closed[:, None]
+        values = np.where(frozen, aligned, baseline.values)
+        return SeriesBlock(baseline.years, values, baseline.lengths, closed)
+
+    def _build(self, portfolio):
+        rolling = {}
+        for product, data in portfolio.items():
+            rolling[product] = data.with_baseline(
+                self.blend_block(data.baseline, data.actual),
+                {
+                    aps: self.blend_block(block, data.aps_actual.get(aps, data.EMPTY))
+                    for aps, block in data.aps.items()
+                }
+            )
+        return rolling
+
+
+# Singleton instance
+rolling_service = RollingForecastService()
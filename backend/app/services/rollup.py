@@ -0,0 +1,152 @@
+import numpy as np
+from .simulation import simulation_engine
+from .market_share import market_share_service
+from .data_store import data_store
+from .rolling import rolling_service
+from ..utils.periods import period_labels, is_weekly, iso_weeks
+
+
+class RollupService:
+    """
+    Simulate every APS class of a product together with the product total
+    and roll the APS results up bottom-up. Uses the (aps, years, periods) arrays
+    DataStore stacks when it loads a product, so a roll-up is one year slice
+    and one simulate_batch call.
+    """
+
+    def __init__(self, engine=None, store=None, rolling=None):
+        self.engine = engine or simulation_engine
+        self.store = store or data_store
+        self.rolling = rolling or rolling_service
+
+    def rollup(self, product, spec, year, rolling=False):
+        """
+        Parameters:
+        - product: product code
+        - spec: event specification, as for FanoutService.simulate
+        - year: baseline year
+        - rolling: use rolling-forecast baselines (closed months stay at
+          their actuals)
+
+        Returns None when the product is unknown.
+        """
+        data = self.store.product(product)
+        if data is None:
+            return None
+        year = int(year)
+        source = self.rolling.product(product) if rolling else data
+
+        stacked = source.stacked
+        periods = data.periods
+        if is_weekly(periods):
+            periods = iso_weeks(year)
+        aps_names = []
+        aps_rows = np.zeros((0, periods))
+        aps_closed = np.zeros(0, dtype=np.int64)
+        if year in stacked['years']:
+            y = stacked['years'].index(year)
+            block = stacked['values'][:, y, :periods]
+            present = ~np.isnan(block).all(axis=1)
+            aps_names = [a for a, p in zip(stacked['aps'], present) if p]
+            aps_rows = np.nan_to_num(block[present])
+            if 'closed' in stacked:
+                aps_closed = stacked['closed'][present, y]
+            else:
+                aps_closed = np.zeros(len(aps_names), dtype=np.int64)
+        missing_aps = [a for a in stacked['aps'] if a not in aps_names]
+
+        product_baseline = source.baseline.get(year)
+        if product_baseline is None and not aps_names:
+            raise ValueError(f"No {product} baseline or APS data for {year}")
+
+        # Product total first (when present), then each APS class
+        baseline = aps_rows
+        closed = aps_closed
+        if product_baseline is not None:
+            baseline = np.vstack([np.asarray(product_baseline, dtype=float), aps_rows])
+            closed = np.concatenate([[source.baseline.closed_for(year)], aps_closed])
+
+        ms_adjustments = market_share_service.calculate_adjustments(
+            spec.get('ms_mode', 'relative'),
+            spec.get('ms_params', {}),
+            data.market_share,
+            year,
+            periods
+        )
+        batch = self.engine.simulate_batch(
+            baseline_vals=baseline,
+            weights=data.weights_for(year),
+            ms_adjustments=ms_adjustments,
+            promo_settings=spec.get('promo_settings'),
+            shortage_settings=spec.get('shortage_settings'),
+            regulation_settings=spec.get('regulation_settings'),
+            custom_settings=spec.get('custom_settings'),
+            toggle_settings=spec.get('toggle_settings'),
+            locked_events=spec.get('locked_events'),
+            damp_k=spec.get('damp_k', 0.5),
+            year=year,
+            closed_months=closed.astype(np.int64)
+        )
+        simulated = batch['simulated']
+
+        offset = 1 if product_baseline is not None else 0
+        aps_baseline = baseline[offset:]
+        aps_simulated = simulated[offset:]
+        rolled_baseline = aps_baseline.sum(axis=0)
+        rolled_simulated = aps_simulated.sum(axis=0)
+        rolled_total = float(rolled_simulated.sum())
+
+        aps_results = []
+        for a, aps in enumerate(aps_names):
+            aps_results.append({
+                'aps_class': aps,
+                'baseline': aps_baseline[a].tolist(),
+                'simulated': aps_simulated[a].tolist(),
+                'baseline_total': float(aps_baseline[a].sum()),
+                'simulated_total': float(aps_simulated[a].sum()),
+                'share_pct': float(aps_simulated[a].sum() / rolled_total * 100) if rolled_total else 0.0
+            })
+
+        result = {
+            'product': product,
+            'year': year,
+            'months': period_labels(periods),
+            'aps': aps_results,
+            'rollup': {
+                'baseline': rolled_baseline.tolist(),
+                'simulated': rolled_simulated.tolist(),
+                'baseline_total': float(rolled_baseline.sum()),
+                'simulated_total': rolled_total
+            },
+            'product_total': None,
+            'reconciliation': None,
+            'missing_aps': missing_aps
+        }
+
+        if product_baseline is not None:
+            result['product_total'] = {
+                'baseline': baseline[0].tolist(),
+                'simulated': simulated[0].tolist(),
+                'baseline_total': float(baseline[0].sum()),
+                'simulated_total': float(simulated[0].sum())
+            }
+            result['reconciliation'] = {
+                'baseline': self._gap(baseline[0], rolled_baseline),
+                'simulated': self._gap(simulated[0], rolled_simulated)
+            }
+
+        return result
+
+    def _gap(self, product_vals, rolled_vals):
+        """Product-level minus APS roll-up, per month and for the year"""
+        gap = product_vals - rolled_vals
+        total = float(product_vals.sum())
+        return {
+            'monthly': gap.tolist(),
+            'total': float(gap.sum()),
+            'gap_pct': float(gap.sum() / total * 100) if total else 0.0
+        }
+
+
+# Singleton instance
+rollup_service = RollupService()
@@ -1,5 +1,120 @@
 import numpy as np
-from ..utils.constants import MONTHS, MONTH_TO_IDX, IDX_TO_MONTH
+from ..utils.constants import LOCKED_EVENT_CATEGORIES, WEIGHT_COLUMN_PATTERNS
+from ..utils.periods import period_labels, period_index, period_months, periods_between
+from .metrics import metrics
+from ..utils.timing import current_timer
+
+# Metric labels of the two engine paths
+SINGLE_PATH = (('path', 'single'),)
+BATCH_PATH = (('path', 'batch'),)
+
+
+def dampen(ups, n_ups, others, damp_k=0.5):
+    """
+    Combine split factor products into final multipliers. When more than
+    one up factor lands in a period their combined lift is damped by
+    1 / (1 + damp_k). Returns (final multipliers, damped up-product).
+    """
+    damped_up = np.where(
+        (ups > 1.0) & (n_ups > 1),
+        1.0 + (ups - 1.0) / (1.0 + damp_k),
+        ups
+    )
+    return damped_up * others, damped_up
+
+
+class FactorAccumulator:
+    """
+    Running per-month factor products, kept split into the pieces the
+    dampening step needs (product of ups, count of ups, product of the rest)
+    so factors can be folded in one at a time or scattered in bulk.
+    """
+    
+    def __init__(self, periods=12):
+        self.ups = np.ones(periods)
+        self.n_ups = np.zeros(periods, dtype=np.int64)
+        self.others = np.ones(periods)
+        self.applied = [[] for _ in range(periods)]
+    
+    def add(self, idx, name, value):
+        """Fold a single factor into period idx (0-based)"""
+        value = float(value)
+        if value > 1.0:
+            self.ups[idx] *= value
+            self.n_ups[idx] += 1
+        else:
+            self.others[idx] *= value
+        self.applied[idx].append((name, value))
+    
+    def scatter(self, idx, values, labels):
+        """Fold many factors at once with one scatter-multiply per split"""
+        if len(values) == 0:
+            return
+        up = values > 1.0
+        np.multiply.at(self.ups, idx[up], values[up])
+        np.add.at(self.n_ups, idx[up], 1)
+        np.multiply.at(self.others, idx[~up], values[~up])
+        for i, label, value in zip(idx.tolist(), labels, values.tolist()):
+            self.applied[i].append((label, value))
+    
+    def finalize(self, damp_k=0.5):
+        """Return (final multipliers, damped up-product) per period"""
+        return dampen(self.ups, self.n_ups, self.others, damp_k)
+
+
+class BatchFactorAccumulator(FactorAccumulator):
+    """
+    FactorAccumulator over a leading batch axis. A factor may take a
+    different value, land in a different period, or be switched off for
+    each row. Applied details are not tracked.
+    """
+    
+    def __init__(self, batch, periods=12):
+        self.ups = np.ones((batch, periods))
+        self.n_ups = np.zeros((batch, periods), dtype=np.int64)
+        self.others = np.ones((batch, periods))
+        self.applied = None
+        self._rows = np.arange(batch)
+    
+    def add(self, idx, value, active=True):
+        """Fold one factor per row into period idx (0-based, scalar or per row)"""
+        shape = self._rows.shape
+        idx = np.broadcast_to(idx, shape)
+        value = np.broadcast_to(np.asarray(value, dtype=float), shape)
+        active = np.broadcast_to(active, shape)
+        up = active & (value > 1.0)
+        low = active & ~(value > 1.0)
+        pos = (self._rows, idx)
+        self.ups[pos] *= np.where(up, value, 1.0)
+        self.n_ups[pos] += up
+        self.others[pos] *= np.where(low, value, 1.0)
+    
+    def add_all(self, values, active=True):
+        """Fold a factor into every period at once; values broadcast to (batch, periods)"""
+        values = np.broadcast_to(np.asarray(values, dtype=float), self.ups.shape)
+        active = np.broadcast_to(active, self.ups.shape)
+        up = active & (values > 1.0)
+        low = active & ~(values > 1.0)
+        self.ups *= np.where(up, values, 1.0)
+        self.n_ups += up
+        self.others *= np.where(low, values, 1.0)
+    
+    def scatter(self, idx, values, labels=None):
+        """Fold the same events into every row"""
+        if len(values) == 0:
+            return
+        up = values > 1.0
+        np.multiply.at(self.ups, (Ellipsis, idx[up]), values[up])
+        np.add.at(self.n_ups, (Ellipsis, idx[up]), 1)
+        np.multiply.at(self.others, (Ellipsis, idx[~up]), values[~up])
+
+
+class WeightTable(dict):
+    """
+    Weight columns resolved for the batch path:
+    {key: (column names, values (W, periods), present (W,))}
+    """
+
 
 class SimulationEngine:
     def __init__(self):
@@ -25,6 +140,23 @@ class SimulationEngine:
         """Apply percentage adjustment to base multiplier"""
         return base * (1.0 + pct / 100.0)
     
+    def period_weight(self, weights_dict, colname, idx, months):
+        """
+        Base multiplier for 1-based period idx. Monthly (12-value) columns
+        on a non-monthly calendar are read at the period's calendar month.
+        """
+        v = weights_dict.get(colname)
+        if len(months) != 12 and isinstance(v, (list, tuple, np.ndarray)) and len(v) == 12:
+            idx = int(months[idx - 1])
+        return self.get_base_mult(weights_dict, colname, idx)
+    
+    def weight_values(self, weights_dict, colname, months):
+        """Weight column as one value per period"""
+        return np.array(
+            [self.period_weight(weights_dict, colname, i, months) for i in range(1, len(months) + 1)],
+            dtype=float
+        )
+    
     def find_weight_column(self, weights, patterns):
         """Find a weight column matching any of the patterns"""
         for pattern in patterns:
@@ -33,6 +165,96 @@ class SimulationEngine:
                     return col
         return None
     
+    def build_locked_calendar(self, locked_events, year=None, periods=12):
+        """
+        Normalize locked events into per-category arrays of
+        (period index, multiplier, label).
+        
+        Accepts the per-type lists sent by the dashboard
+        ({'Promo': [{'month': 'Mar', 'multiplier': 1.1}], ...}) and/or a
+        compact calendar for large multi-year event sets:
+        
+            'calendar': {
+                'start_year': 2025,          # optional
+                'month': [2, 14, ...],       # 0-based period, counted from the start of start_year
+                'category': ['Promo', 1, ...],  # name or index into LOCKED_EVENT_CATEGORIES
+                'multiplier': [1.1, 0.9, ...],
+                'id': ['spring-sale', ...]   # optional, shown in applied details
+            }
+        
+        Only calendar events falling in `year` are kept (the start year when
+        year is not given). Events are placed on a calendar of `periods`
+        periods per year (12 months, or 52/53 ISO weeks).
+        """
+        locked_events = locked_events or {}
+        months, cats, mults, labels = [], [], [], []
+        
+        for code, category in enumerate(LOCKED_EVENT_CATEGORIES):
+            for locked_event in locked_events.get(category, []):
+                months.append(period_index(locked_event['month'], periods) - 1)
+                cats.append(code)
+                mults.append(float(locked_event['multiplier']))
+                labels.append(f"Locked_{category}")
+        
+        idx = np.array(months, dtype=np.int64)
+        cat = np.array(cats, dtype=np.int64)
+        mult = np.array(mults, dtype=float)
+        
+        calendar = locked_events.get('calendar')
+        if calendar:
+            cal_month = np.asarray(calendar.get('month', []), dtype=np.int64)
+            cal_mult = np.asarray(calendar.get('multiplier', []), dtype=float)
+            raw_cat = calendar.get('category', [])
+            ids = calendar.get('id')
+            lengths = {len(cal_month), len(cal_mult), len(raw_cat)}
+            if ids is not None:
+                lengths.add(len(ids))
+            if len(lengths) > 1:
+                raise ValueError("Locked calendar arrays must have the same length")
+            
+            if isinstance(raw_cat, np.ndarray) and raw_cat.dtype.kind in 'iu':
+                cal_cat = raw_cat.astype(np.int64)
+            else:
+                # Names and indexes may be mixed; resolve each on its own
+                lookup = {c.lower(): n for n, c in enumerate(LOCKED_EVENT_CATEGORIES)}
+                codes = []
+                for c in raw_cat:
+                    if isinstance(c, (int, np.integer)) and not isinstance(c, bool):
+                        codes.append(int(c))
+                    elif isinstance(c, str) and c.lower() in lookup:
+                        codes.append(lookup[c.lower()])
+                    else:
+                        raise ValueError(f"Unknown locked event category: {c}")
+                cal_cat = np.array(codes, dtype=np.int64)
+            if len(cal_cat) and (cal_cat.min() < 0 or cal_cat.max() >= len(LOCKED_EVENT_CATEGORIES)):
+                raise ValueError("Locked event category index out of range")
+            
+            # Keep only the periods of the simulated year
+            start_year = calendar.get('start_year')
+            offset = 0
+            if start_year is not None and year is not None:
+                offset = periods_between(start_year, year, periods)
+            keep = (cal_month >= offset) & (cal_month < offset + periods)
+            keep_pos = np.flatnonzero(keep)
+            
+            names = np.array(LOCKED_EVENT_CATEGORIES)[cal_cat[keep_pos]]
+            if ids is not None:
+                cal_labels = [f"Locked_{n}:{ids[p]}" for n, p in zip(names, keep_pos.tolist())]
+            else:
+                cal_labels = [f"Locked_{n}" for n in names]
+            
+            idx = np.concatenate([idx, cal_month[keep_pos] - offset])
+            cat = np.concatenate([cat, cal_cat[keep_pos]])
+            mult = np.concatenate([mult, cal_mult[keep_pos]])
+            labels = labels + cal_labels
+        
+        labels = np.array(labels, dtype=object)
+        result = {}
+        for code, category in enumerate(LOCKED_EVENT_CATEGORIES):
+            sel = np.flatnonzero(cat == code)
+            result[category] = (idx[sel], mult[sel], labels[sel].tolist())
+        return result
+    
     def compute_simulation(
         self,
         baseline_vals,
@@ -44,13 +266,17 @@ class SimulationEngine:
         custom_settings,
         toggle_settings,
         locked_events,
-        damp_k=0.5
+        damp_k=0.5,
+        year=None,
+        closed_months=0
     ):
         """
         Main simulation computation - preserves all original logic
         
         Parameters:
-        - baseline_vals: list of 12 monthly baseline values
+        - baseline_vals: list of baseline values, one per period (12
+          months, or 52/53 weeks); event months and result keys use the
+          matching period labels
         - weights: dict of weight columns
         - ms_settings: market share settings dict
         - promo_settings: promotion event settings
@@ -58,78 +284,59 @@ class SimulationEngine:
         - regulation_settings: regulation event settings
         - custom_settings: custom event settings
         - toggle_settings: effect toggle settings
-        - locked_events: dict of locked events by type
+        - locked_events: dict of locked events by type, optionally with a
+          compact multi-year 'calendar' (see build_locked_calendar)
         - damp_k: dampening factor
+        - year: simulated year, used to select calendar events and to map
+          weeks to calendar months
+        - closed_months: leading periods already closed in a rolling
+          forecast; they keep their baseline (actual) values untouched
         """
         
+        timer = current_timer()
+        periods = len(baseline_vals)
+        labels = period_labels(periods)
+        months = period_months(periods, year)
+        all_periods = np.arange(periods)
+        march = np.flatnonzero(months == 3)
+        
         # Start with baseline values
         working_baseline = baseline_vals[:]
         
         # Apply Remove Historical March Madness if enabled
         if toggle_settings.get('march_madness', False):
-            working_baseline[2] = working_baseline[2] * 0.6  # March
-            working_baseline[5] = working_baseline[5] * 1.2  # June
-        
-        # Precompute multipliers from toggles
-        base_mults = {m: 1.0 for m in MONTHS}
-        applied_details = {m: [] for m in MONTHS}
-        
-        # Trend toggle
-        if toggle_settings.get('trend', False):
-            trend_col = self.find_weight_column(weights, ['trend'])
-            if trend_col:
-                for i, m in enumerate(MONTHS, start=1):
-                    bm = self.get_base_mult(weights, trend_col, i)
-                    base_mults[m] *= bm
-                    applied_details[m].append((trend_col, float(bm)))
-        
-        # Trans Sep-Dec toggle
-        if toggle_settings.get('trans', False):
-            trans_col = self.find_weight_column(weights, ['trans'])
-            if trans_col:
-                for i in range(9, 13):  # Sep-Dec
-                    mm = IDX_TO_MONTH[i]
-                    bm = self.get_base_mult(weights, trans_col, i)
-                    base_mults[mm] *= bm
-                    applied_details[mm].append((trans_col, float(bm)))
-        
-        # PF Pos toggle
-        if toggle_settings.get('pf_pos', False):
-            pf_pos_col = self.find_weight_column(weights, ['pf_pos', 'pfpos'])
-            if pf_pos_col:
-                for i, m in enumerate(MONTHS, start=1):
-                    bm = self.get_base_mult(weights, pf_pos_col, i)
-                    base_mults[m] *= bm
-                    applied_details[m].append((pf_pos_col, float(bm)))
-        
-        # PF Neg toggle
-        if toggle_settings.get('pf_neg', False):
-            pf_neg_col = self.find_weight_column(weights, ['pf_neg', 'pfneg'])
-            if pf_neg_col:
-                for i, m in enumerate(MONTHS, start=1):
-                    bm = self.get_base_mult(weights, pf_neg_col, i)
-                    base_mults[m] *= bm
-                    applied_details[m].append((pf_neg_col, float(bm)))
-        
-        # Copy for local modifications
-        local_applied = {m: applied_details[m][:] for m in MONTHS}
-        local_mults = {m: base_mults[m] for m in MONTHS}
+            for p in march:
+                working_baseline[p] = working_baseline[p] * 0.6  # March
+            for p in np.flatnonzero(months == 6):
+                working_baseline[p] = working_baseline[p] * 1.2  # June
+        
+        # Running per-period factor products, split the way dampening needs them
+        acc = FactorAccumulator(periods)
+        calendar = self.build_locked_calendar(locked_events, year, periods)
+        timer.lap('calendar')
+        
+        # Trend, PF Pos and PF Neg toggles apply to every period, Trans to Sep-Dec
+        for key, sel in (('trend', all_periods), ('trans', np.flatnonzero(months >= 9)),
+                         ('pf_pos', all_periods), ('pf_neg', all_periods)):
+            if toggle_settings.get(key, False):
+                col = self.find_weight_column(weights, WEIGHT_COLUMN_PATTERNS[key])
+                if col:
+                    values = self.weight_values(weights, col, months)[sel]
+                    acc.scatter(sel, values, [col] * len(sel))
+        timer.lap('toggles')
         
         # Apply locked promo events
-        for locked_event in locked_events.get('Promo', []):
-            month = locked_event['month']
-            multiplier = locked_event['multiplier']
-            local_mults[month] *= multiplier
-            local_applied[month].append(("Locked_Promo", float(multiplier)))
+        acc.scatter(*calendar['Promo'])
         
         # Current promo event
         promo_month = promo_settings.get('month')
         if promo_month and promo_month != "None":
-            i = MONTH_TO_IDX[promo_month]
+            i = period_index(promo_month, periods)
+            month = months[i - 1]
             promo_pct = promo_settings.get('pct', 0)
             
             # Determine up/down columns based on month
-            if i <= 6:
+            if month <= 6:
                 up_col = self.find_weight_column(weights, ['upromoup'])
                 dwn_col = self.find_weight_column(weights, ['upromodwn'])
             else:
@@ -137,30 +344,28 @@ class SimulationEngine:
                 dwn_col = self.find_weight_column(weights, ['dpromodwn'])
             
             if up_col:
-                base_w = self.get_base_mult(weights, up_col, i)
+                base_w = self.period_weight(weights, up_col, i, months)
                 applied_w = self.apply_slider_mult(base_w, promo_pct)
                 
                 # Cap June promo
-                if promo_month == "Jun":
+                if month == 6:
                     applied_w = min(applied_w, 1.06)
                 
-                local_mults[promo_month] *= applied_w
-                local_applied[promo_month].append((up_col, float(applied_w)))
+                acc.add(i - 1, up_col, applied_w)
                 
                 # March reduction (if not locked)
                 lock_march = toggle_settings.get('lock_march', False)
-                if not lock_march and promo_month != "Mar":
+                if not lock_march and month != 3:
                     march_reduction = 1.0 / applied_w if applied_w > 0 else 1.0
-                    local_mults["Mar"] *= march_reduction
-                    local_applied["Mar"].append(("Promo_March_Reduction", float(march_reduction)))
+                    for p in march:
+                        acc.add(p, "Promo_March_Reduction", march_reduction)
             
             # Spillover to next month
             spill_enabled = promo_settings.get('spill_enabled', True)
             spill_pct = promo_settings.get('spill_pct', 10)
             
-            if i < 12 and dwn_col and promo_month != "Jun":
-                nxt = IDX_TO_MONTH[i + 1]
-                base_dn = self.get_base_mult(weights, dwn_col, i + 1)
+            if i < periods and dwn_col and month != 6:
+                base_dn = self.period_weight(weights, dwn_col, i + 1, months)
                 applied_dn = base_dn
                 
                 if spill_enabled and promo_pct > 0 and applied_dn < 1.0:
@@ -169,57 +374,42 @@ class SimulationEngine:
                     reduction_frac = reduction_frac * promo_scale
                     applied_dn = applied_dn + (1.0 - applied_dn) * reduction_frac
                 
-                local_mults[nxt] *= applied_dn
-                local_applied[nxt].append((dwn_col, float(applied_dn)))
+                acc.add(i, dwn_col, applied_dn)
         
         # Apply locked shortage events
-        for locked_event in locked_events.get('Shortage', []):
-            month = locked_event['month']
-            multiplier = locked_event['multiplier']
-            local_mults[month] *= multiplier
-            local_applied[month].append(("Locked_Shortage", float(multiplier)))
+        acc.scatter(*calendar['Shortage'])
         
         # Current shortage event
         shortage_month = shortage_settings.get('month')
         if shortage_month and shortage_month != "None":
-            i = MONTH_TO_IDX[shortage_month]
+            i = period_index(shortage_month, periods)
             shortage_pct = shortage_settings.get('pct', 0)
             
             col = self.find_weight_column(weights, ['shortage'])
             if col:
-                base_w = self.get_base_mult(weights, col, i)
+                base_w = self.period_weight(weights, col, i, months)
                 applied = self.apply_slider_mult(base_w, shortage_pct)
                 applied = min(applied, 1.0)  # Cap at 1.0
-                local_mults[shortage_month] *= applied
-                local_applied[shortage_month].append((col, float(applied)))
+                acc.add(i - 1, col, applied)
         
         # Apply locked regulation events
-        for locked_event in locked_events.get('Regulation', []):
-            month = locked_event['month']
-            multiplier = locked_event['multiplier']
-            local_mults[month] *= multiplier
-            local_applied[month].append(("Locked_Regulation", float(multiplier)))
+        acc.scatter(*calendar['Regulation'])
         
         # Current regulation event
         regulation_month = regulation_settings.get('month')
         if regulation_month and regulation_month != "None":
-            i = MONTH_TO_IDX[regulation_month]
+            i = period_index(regulation_month, periods)
             regulation_pct = regulation_settings.get('pct', 0)
             
             col = self.find_weight_column(weights, ['regulation', 'epa'])
             if col:
-                base_w = self.get_base_mult(weights, col, i)
+                base_w = self.period_weight(weights, col, i, months)
                 applied = self.apply_slider_mult(base_w, regulation_pct)
                 applied = min(applied, 1.0)
-                local_mults[regulation_month] *= applied
-                local_applied[regulation_month].append((col, float(applied)))
+                acc.add(i - 1, col, applied)
         
         # Apply locked custom events
-        for locked_event in locked_events.get('Custom', []):
-            month = locked_event['month']
-            multiplier = locked_event['multiplier']
-            local_mults[month] *= multiplier
-            local_applied[month].append(("Locked_Custom", float(multiplier)))
+        acc.scatter(*calendar['Custom'])
         
         # Current custom event
         custom_month = custom_settings.get('month')
@@ -227,43 +417,43 @@ class SimulationEngine:
             custom_weight = custom_settings.get('weight', 1.0)
             custom_pct = custom_settings.get('pct', 0)
             applied = self.apply_slider_mult(custom_weight, custom_pct)
-            local_mults[custom_month] *= applied
-            local_applied[custom_month].append(("Custom", float(applied)))
+            acc.add(period_index(custom_month, periods) - 1, "Custom", applied)
+        timer.lap('events')
         
         # Apply dampening
+        final_arr, damped_arr = acc.finalize(damp_k)
         final_mults = {}
         final_applied = {}
         
-        for m in MONTHS:
-            factors = [v for (_, v) in local_applied[m]]
-            ups = [v for v in factors if v > 1.0]
-            others = [v for v in factors if v <= 1.0]
+        for idx, m in enumerate(labels):
+            final_mults[m] = float(final_arr[idx])
             
-            prod_ups = np.prod(ups) if ups else 1.0
-            prod_others = np.prod(others) if others else 1.0
-            
-            if prod_ups > 1.0 and len(ups) > 1:
-                damped_up = 1.0 + (prod_ups - 1.0) / (1.0 + damp_k)
-            else:
-                damped_up = prod_ups
-            
-            final_mult = float(damped_up * prod_others)
-            final_mults[m] = final_mult
-            
-            readable = [(name, float(val)) for (name, val) in local_applied[m]]
-            if damped_up != prod_ups:
-                readable.append(("DampenedUp", float(damped_up)))
+            readable = acc.applied[idx]
+            if damped_arr[idx] != acc.ups[idx]:
+                readable.append(("DampenedUp", float(damped_arr[idx])))
             final_applied[m] = readable
+        timer.lap('dampening')
         
         # Compute final simulated values
         simulated = []
-        for i, m in enumerate(MONTHS):
+        for i, m in enumerate(labels):
             base_val = working_baseline[i]
             event_mult = final_mults[m]
             ms_adj = ms_settings.get('adjustments', {}).get(m, 1.0)
             sim_val = base_val * event_mult * ms_adj
             simulated.append(sim_val)
         
+        # Closed months of a rolling forecast keep their actuals
+        for i in range(min(int(closed_months or 0), periods)):
+            m = labels[i]
+            simulated[i] = baseline_vals[i]
+            working_baseline[i] = baseline_vals[i]
+            final_mults[m] = 1.0
+            final_applied[m] = []
+        
+        timer.lap('apply')
+        metrics.inc('simulations_total', SINGLE_PATH)
+        metrics.inc('simulated_rows_total', SINGLE_PATH)
         return {
             'simulated': simulated,
             'final_multipliers': final_mults,
@@ -271,20 +461,256 @@ class SimulationEngine:
             'working_baseline': working_baseline
         }
     
-    def calculate_exceeded_months(self, simulated, baseline_vals, sensitivity=1.5):
+    def combine_factors(self, values, damp_k=0.5):
         """
-        Calculate which months exceed threshold for warnings
+        Final multipliers for stacked factor values of shape
+        (..., factors, periods); pad absent factors with 1.0. damp_k may be
+        an array broadcasting against (..., periods).
+        Returns (final multipliers, damped up-product), each (..., periods).
+        """
+        values = np.asarray(values, dtype=float)
+        up = values > 1.0
+        ups = np.where(up, values, 1.0).prod(axis=-2)
+        others = np.where(up, 1.0, values).prod(axis=-2)
+        return dampen(ups, up.sum(axis=-2), others, damp_k)
+    
+    def weight_table(self, weights, months=None):
+        """
+        Resolve the weight columns the simulation uses into arrays.
+        
+        `weights` is one weights dict or a list of them (one per batch row);
+        `months` is the calendar month of each period (period_months),
+        monthly when not given.
+        Returns {key: (column names, values (W, periods), present (W,))}
+        keyed by WEIGHT_COLUMN_PATTERNS.
+        """
+        months = np.arange(1, 13) if months is None else months
+        weights_list = weights if isinstance(weights, (list, tuple)) else [weights]
+        table = WeightTable()
+        for key, patterns in WEIGHT_COLUMN_PATTERNS.items():
+            names, values = [], []
+            for w in weights_list:
+                w = w or {}
+                col = self.find_weight_column(w, patterns)
+                names.append(col)
+                if col:
+                    values.append(self.weight_values(w, col, months))
+                else:
+                    values.append(np.ones(len(months)))
+            present = np.array([n is not None for n in names])
+            table[key] = (names, np.array(values, dtype=float), present)
+        return table
+    
+    def stack_weight_tables(self, tables):
+        """Concatenate single-product weight tables into one table, one row each"""
+        stacked = WeightTable()
+        for key in WEIGHT_COLUMN_PATTERNS:
+            stacked[key] = (
+                [name for t in tables for name in t[key][0]],
+                np.concatenate([t[key][1] for t in tables]),
+                np.concatenate([t[key][2] for t in tables])
+            )
+        return stacked
+    
+    def _month_array(self, month, batch, periods=12):
+        """Event period(s) as 1-based int array of length batch, 0 for none"""
+        if month is None or (isinstance(month, str) and month == "None"):
+            return np.zeros(batch, dtype=np.int64)
+        if isinstance(month, str):
+            return np.full(batch, period_index(month, periods), dtype=np.int64)
+        return np.broadcast_to(np.asarray(month, dtype=np.int64), (batch,))
+    
+    def _pick(self, values, idx):
+        """values[row, idx[row]] for (W|B, periods) values and (B,) 0-based idx"""
+        values = np.broadcast_to(values, (len(idx), values.shape[-1]))
+        return np.take_along_axis(values, idx[:, None], axis=1)[:, 0]
+    
+    def _batch_size(self, *candidates):
+        batch = 1
+        for c in candidates:
+            if c is None or isinstance(c, str):
+                continue
+            arr = np.asarray(c)
+            if arr.ndim and len(arr) > batch:
+                batch = len(arr)
+        return batch
+    
+    def simulate_batch(
+        self,
+        baseline_vals,
+        weights,
+        ms_adjustments=None,
+        promo_settings=None,
+        shortage_settings=None,
+        regulation_settings=None,
+        custom_settings=None,
+        toggle_settings=None,
+        locked_events=None,
+        damp_k=0.5,
+        year=None,
+        closed_months=0
+    ):
+        """
+        Vectorized compute_simulation over a batch of candidate scenarios.
+        
+        Follows compute_simulation step for step (same factor order, June
+        cap, March reduction, spillover and dampening), so every row equals
+        what compute_simulation returns for that row's inputs.
+        
+        Parameters:
+        - baseline_vals: (P,) or (B, P) baseline values for P periods
+        - weights: weights dict, list of dicts (one per row), or weight_table()
+          built for the same periods
+        - ms_adjustments: period dict, (P,) or (B, P) market share multipliers
+        - promo_settings: promo dict, or a list of them applied in order; each
+          'month' may be a period label or an int array of 1-based periods
+          (0 = none)
+        - shortage/regulation/custom_settings: as compute_simulation
+        - 'pct', 'spill_pct' and custom 'weight' may be length-B arrays
+        - closed_months: scalar or length-B leading closed months per row
+        
+        Returns dict with 'simulated', 'final_multipliers' and
+        'working_baseline' as (B, P) arrays.
+        """
+        toggle_settings = toggle_settings or {}
+        baseline = np.asarray(baseline_vals, dtype=float)
+        periods = baseline.shape[-1]
+        months = period_months(periods, year)
+        
+        wt = weights if isinstance(weights, WeightTable) else self.weight_table(weights, months)
+        width = wt['trend'][1].shape[-1]
+        if width < periods:
+            raise ValueError(f"Weight table has {width} periods, baseline has {periods}")
+        if width > periods:
+            # 53-week table for a 52-week year
+            wt = WeightTable({k: (n, v[..., :periods], p) for k, (n, v, p) in wt.items()})
+        promos = promo_settings if isinstance(promo_settings, (list, tuple)) else [promo_settings or {}]
+        events = [shortage_settings or {}, regulation_settings or {}, custom_settings or {}]
+        
+        if isinstance(ms_adjustments, dict):
+            ms_adjustments = [ms_adjustments.get(m, 1.0) for m in period_labels(periods)]
+        ms = np.ones(periods) if ms_adjustments is None else np.asarray(ms_adjustments, dtype=float)
+        
+        candidates = [baseline if baseline.ndim == 2 else None, ms if ms.ndim == 2 else None,
+                      wt['trend'][1], closed_months]
+        for settings in promos + events:
+            candidates += [settings.get('month'), settings.get('pct'),
+                           settings.get('spill_pct'), settings.get('weight')]
+        batch = self._batch_size(*candidates)
+        
+        working = np.array(np.broadcast_to(baseline, (batch, periods)), dtype=float)
+        march = np.flatnonzero(months == 3)
+        if toggle_settings.get('march_madness', False):
+            working[:, march] = working[:, march] * 0.6  # March
+            working[:, months == 6] = working[:, months == 6] * 1.2  # June
+        
+        acc = BatchFactorAccumulator(batch, periods)
+        calendar = self.build_locked_calendar(locked_events, year, periods)
+        
+        # Toggles
+        for key in ('trend', 'trans', 'pf_pos', 'pf_neg'):
+            if toggle_settings.get(key, False):
+                _, values, present = wt[key]
+                active = present[:, None]
+                if key == 'trans':
+                    active = active & (months >= 9)  # Sep-Dec
+                acc.add_all(values, active)
+        
+        acc.scatter(*calendar['Promo'])
+        
+        # Current promo event(s)
+        lock_march = toggle_settings.get('lock_march', False)
+        for settings in promos:
+            i = self._month_array(settings.get('month'), batch, periods)
+            active = i > 0
+            col = np.clip(i - 1, 0, periods - 1)
+            month = months[col]
+            promo_pct = np.broadcast_to(np.asarray(settings.get('pct', 0), dtype=float), (batch,))
+            first_half = month <= 6
+            
+            up_present = np.where(first_half, wt['upromoup'][2], wt['dpromoup'][2])
+            dwn_present = np.where(first_half, wt['upromodwn'][2], wt['dpromodwn'][2])
+            up_w = np.where(first_half, self._pick(wt['upromoup'][1], col), self._pick(wt['dpromoup'][1], col))
+            
+            applied_w = self.apply_slider_mult(up_w, promo_pct)
+            applied_w = np.where(month == 6, np.minimum(applied_w, 1.06), applied_w)  # Cap June promo
+            up_active = active & up_present
+            acc.add(col, applied_w, up_active)
+            
+            # March reduction (if not locked)
+            if not lock_march:
+                march_reduction = np.divide(1.0, applied_w, out=np.ones(batch), where=applied_w > 0)
+                for p in march:
+                    acc.add(p, march_reduction, up_active & (month != 3))
+            
+            # Spillover to next month
+            spill_enabled = bool(settings.get('spill_enabled', True))
+            spill_pct = np.asarray(settings.get('spill_pct', 10), dtype=float)
+            nxt = np.clip(i, 0, periods - 1)
+            base_dn = np.where(first_half, self._pick(wt['upromodwn'][1], nxt), self._pick(wt['dpromodwn'][1], nxt))
+            reduction_frac = (spill_pct / 100.0) * np.minimum(promo_pct / 25.0, 1.0)
+            spill = spill_enabled & (promo_pct > 0) & (base_dn < 1.0)
+            applied_dn = np.where(spill, base_dn + (1.0 - base_dn) * reduction_frac, base_dn)
+            acc.add(nxt, applied_dn, active & (i < periods) & dwn_present & (month != 6))
+        
+        # Shortage and regulation, capped at 1.0
+        for category, key, settings in (('Shortage', 'shortage', events[0]), ('Regulation', 'regulation', events[1])):
+            acc.scatter(*calendar[category])
+            i = self._month_array(settings.get('month'), batch, periods)
+            col = np.clip(i - 1, 0, periods - 1)
+            pct = np.asarray(settings.get('pct', 0), dtype=float)
+            applied = np.minimum(self.apply_slider_mult(self._pick(wt[key][1], col), pct), 1.0)
+            acc.add(col, applied, (i > 0) & wt[key][2])
+        
+        # Custom event
+        acc.scatter(*calendar['Custom'])
+        custom = events[2]
+        i = self._month_array(custom.get('month'), batch, periods)
+        applied = self.apply_slider_mult(
+            np.asarray(custom.get('weight', 1.0), dtype=float),
+            np.asarray(custom.get('pct', 0), dtype=float)
+        )
+        acc.add(np.clip(i - 1, 0, periods - 1), applied, i > 0)
+        
+        final_mults, _ = acc.finalize(damp_k)
+        simulated = working * final_mults * ms
+        
+        # Closed months of a rolling forecast keep their actuals
+        closed = np.broadcast_to(np.asarray(0 if closed_months is None else closed_months), (batch,))
+        if closed.any():
+            frozen = np.arange(periods) < closed[:, None]
+            original = np.broadcast_to(baseline, (batch, periods))
+            simulated = np.where(frozen, original, simulated)
+            working = np.where(frozen, original, working)
+            final_mults = np.where(frozen, 1.0, final_mults)
+        
+        metrics.inc('simulations_total', BATCH_PATH)
+        metrics.inc('simulated_rows_total', BATCH_PATH, batch)
+        return {
+            'simulated': simulated,
+            'final_multipliers': final_mults,
+            'working_baseline': working
+        }
+    
+    def exceedance_thresholds(self, baseline_vals, sensitivity=1.5):
+        """
+        Per-period warning thresholds for calculate_exceeded_months
         Uses Coefficient of Variation approach
         """
-        exceeded = []
+        thresholds = []
         
-        for i, m in enumerate(MONTHS):
+        # Product-level volatility
+        year_mean = np.mean(baseline_vals)
+        year_std = np.std(baseline_vals)
+        year_cv = year_std / year_mean if year_mean > 0 else 0.15
+        
+        periods = len(baseline_vals)
+        for i in range(periods):
             baseline_val = float(baseline_vals[i])
-            sim_val = float(simulated[i])
             
-            # Local context: 3-month rolling window
+            # Local context: 3-period rolling window
             window_start = max(0, i - 1)
-            window_end = min(12, i + 2)
+            window_end = min(periods, i + 2)
             local_window = baseline_vals[window_start:window_end]
             
             # Local volatility
@@ -292,26 +718,47 @@ class SimulationEngine:
             local_std = np.std(local_window)
             local_cv = local_std / local_mean if local_mean > 0 else 0.15
             
-            # Product-level volatility
-            year_mean = np.mean(baseline_vals)
-            year_std = np.std(baseline_vals)
-            year_cv = year_std / year_mean if year_mean > 0 else 0.15
-            
             # Combined threshold
             combined_cv = max(local_cv, year_cv * 0.5)
             threshold_pct = max(0.08, combined_cv * sensitivity)
-            month_threshold = baseline_val * (1 + threshold_pct)
+            thresholds.append(baseline_val * (1 + threshold_pct))
+        
+        return thresholds
+    
+    def calculate_exceeded_months(self, simulated, baseline_vals, sensitivity=1.5):
+        """
+        Calculate which months exceed threshold for warnings
+        Uses Coefficient of Variation approach
+        """
+        exceeded = []
+        thresholds = self.exceedance_thresholds(baseline_vals, sensitivity)
+        
+        for i, m in enumerate(period_labels(len(baseline_vals))):
+            sim_val = float(simulated[i])
+            month_threshold = thresholds[i]
             
             if sim_val > month_threshold:
                 exceeded.append({
                     'month': m,
                     'index': i,
                     'simulated': sim_val,
-                    'baseline': baseline_val,
+                    'baseline': float(baseline_vals[i]),
                     'threshold': month_threshold
                 })
         
         return exceeded
+    
+    def count_exceeded_batch(self, simulated, baseline_vals, sensitivity=1.5):
+        """
+        Number of periods over the warning threshold for each (B, P) row.
+        baseline_vals is one shared baseline or one per row.
+        """
+        baseline = np.asarray(baseline_vals, dtype=float)
+        if baseline.ndim == 2:
+            thresholds = np.array([self.exceedance_thresholds(row, sensitivity) for row in baseline])
+        else:
+            thresholds = np.asarray(self.exceedance_thresholds(baseline_vals, sensitivity))
+        return (np.asarray(simulated) > thresholds).sum(axis=-1)
 
 
 # Singleton instance
@@ -18,6 +18,23 @@ MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct',
 MONTH_TO_IDX = {m: i + 1 for i, m in enumerate(MONTHS)}
 IDX_TO_MONTH = {i + 1: m for i, m in enumerate(MONTHS)}
 
+# Substring patterns the simulation uses to locate each weight column
+WEIGHT_COLUMN_PATTERNS = {
+    'trend': ['trend'],
+    'trans': ['trans'],
+    'pf_pos': ['pf_pos', 'pfpos'],
+    'pf_neg': ['pf_neg', 'pfneg'],
+    'upromoup': ['upromoup'],
+    'upromodwn': ['upromodwn'],
+    'dpromoup': ['dpromoup'],
+    'dpromodwn': ['dpromodwn'],
+    'shortage': ['shortage'],
+    'regulation': ['regulation', 'epa']
+}
+
+# Locked event categories, in the order the simulation applies them
+LOCKED_EVENT_CATEGORIES = ['Promo', 'Shortage', 'Regulation', 'Custom']
+
 # Excel sheet names for unified upload
 EXCEL_SHEETS = {
     'baseline': 'Baseline',
@@ -28,6 +45,9 @@ EXCEL_SHEETS = {
     'metadata': 'Metadata'
 }
 
+# Content type of .xlsx downloads
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
 # Default weights columns
 WEIGHT_COLUMNS = [
     'UpromoUp', 'UPromoDwn', 'DPromoUp', 'DPromoDwn',
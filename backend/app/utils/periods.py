@@ -0,0 +1,60 @@
+from datetime import date
+import numpy as np
+from .constants import MONTHS, MONTH_TO_IDX
+
+# Weekly columns/labels, ISO weeks W01..W53
+WEEKS = [f"W{w:02d}" for w in range(1, 54)]
+WEEK_TO_IDX = {w: i + 1 for i, w in enumerate(WEEKS)}
+
+
+def iso_weeks(year):
+    """Number of ISO weeks (52 or 53) in year"""
+    return date(int(year), 12, 28).isocalendar()[1]
+
+
+def is_weekly(periods):
+    return periods in (52, 53)
+
+
+def period_labels(periods):
+    """Labels for one year of periods: MONTHS for 12, W01.. for weekly"""
+    if periods == 12:
+        return MONTHS
+    return WEEKS[:periods] if periods <= len(WEEKS) else [f"P{i}" for i in range(1, periods + 1)]
+
+
+def period_index(label, periods):
+    """1-based period index of a label ('Mar', 'W07') or int"""
+    if isinstance(label, (int, np.integer)):
+        return int(label)
+    if periods == 12:
+        return MONTH_TO_IDX[label]
+    if label in WEEK_TO_IDX:
+        return WEEK_TO_IDX[label]
+    return period_labels(periods).index(label) + 1
+
+
+def period_months(periods, year=None):
+    """
+    Calendar month (1-12) of each period, used by the month-specific
+    simulation rules (March reduction, June cap, Sep-Dec trans, H1/H2 promo
+    weights). Weeks take the month of their Thursday when the year is known,
+    otherwise periods are spread evenly over the year.
+    """
+    if periods == 12:
+        return np.arange(1, 13)
+    if is_weekly(periods) and year is not None and periods <= iso_weeks(year):
+        return np.array([
+            date.fromisocalendar(int(year), w, 4).month for w in range(1, periods + 1)
+        ])
+    return np.arange(periods) * 12 // periods + 1
+
+
+def periods_between(start_year, year, periods):
+    """Periods from the start of start_year to the start of year"""
+    start_year, year = int(start_year), int(year)
+    if not is_weekly(periods):
+        return (year - start_year) * periods
+    step = 1 if year >= start_year else -1
+    years = range(start_year, year) if step > 0 else range(year, start_year)
+    return step * sum(iso_weeks(y) for y in years)
@@ -0,0 +1,66 @@
+import contextvars
+from functools import wraps
+from time import perf_counter
+from flask import make_response
+
+# StageTimer of the running request, if its view is timed
+_timer = contextvars.ContextVar('stage_timer', default=None)
+
+
+class StageTimer:
+    """
+    Splits a request into consecutive stages. Each lap(name) books the
+    time since the previous lap (or the start) to name, so the stages add
+    up to the total and code at any depth (route, engine, DataStore) can
+    book its own part without knowing what surrounds it. Repeated names
+    accumulate, e.g. one 'file_read' over every file of a dataset load.
+    """
+
+    def __init__(self):
+        self.started = self._last = perf_counter()
+        self.stages = {}
+
+    def lap(self, name):
+        now = perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def as_dict(self):
+        """{stage: milliseconds} plus the total so far"""
+        timings = {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        timings['total'] = round((perf_counter() - self.started) * 1000, 3)
+        return timings
+
+    def header(self):
+        """Server-Timing header value"""
+        return ', '.join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+
+class _NullTimer:
+    """Stand-in outside timed requests; laps cost a method call"""
+
+    def lap(self, name):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def current_timer():
+    """The request's StageTimer, or a no-op timer"""
+    return _timer.get() or NULL_TIMER
+
+
+def server_timing(view):
+    """Time a view's stages and send them as a Server-Timing header"""
+    @wraps(view)
+    def timed(*args, **kwargs):
+        timer = StageTimer()
+        token = _timer.set(timer)
+        try:
+            response = make_response(view(*args, **kwargs))
+        finally:
+            _timer.reset(token)
+        response.headers['Server-Timing'] = timer.header()
+        return response
+    return timed
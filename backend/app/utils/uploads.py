@@ -0,0 +1,44 @@
+import os
+
+# Bytes copied per read when spooling an upload to disk
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """An upload over the size cap (served as 413)"""
+
+
+def upload_extension(name, allowed=('.zip', '.xls', '.xlsx'), default='.xlsx'):
+    """Extension of an uploaded file name among allowed ones"""
+    return next((e for e in allowed if name.lower().endswith(e)), default)
+
+
+def spool_upload(file, path, max_bytes=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream an upload (Werkzeug FileStorage or a file path) to path one
+    chunk at a time, so memory use does not depend on the upload size.
+    Raises UploadTooLarge, leaving nothing behind, when it exceeds
+    max_bytes. This also covers bodies sent without a Content-Length,
+    which MAX_CONTENT_LENGTH cannot reject up front.
+    """
+    written = 0
+    try:
+        src = open(file, 'rb') if isinstance(file, str) else file.stream
+        try:
+            with open(path, 'wb') as dst:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if max_bytes is not None and written > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {max_bytes // (1024 * 1024)} MB")
+                    dst.write(chunk)
+        finally:
+            if isinstance(file, str):
+                src.close()
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return path
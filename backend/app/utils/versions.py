@@ -0,0 +1,233 @@
+import os
+import uuid
+import shutil
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from ..config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: commits are serialized within a process only
+    fcntl = None
+
+# Name of the published version, and the directory holding the versions
+POINTER_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+LOCK_FILE = '.commit.lock'
+
+# Pin-count key of readers of a flat (pre-versioning) root
+FLAT = ''
+
+# {data root: pinned directory} of the running request or thread
+_pins = contextvars.ContextVar('dataset_pins', default=None)
+
+
+class DatasetVersions:
+    """
+    Versioned snapshots of a data directory.
+
+    Every published version is a directory under root/versions and
+    root/CURRENT names the live one. commit() stages a new version as a
+    copy of the live one (hard links, so unchanged files cost nothing and
+    keep their identity), lets the caller change it, then publishes it by
+    replacing the pointer file, a single atomic rename. Readers resolve
+    the directory once and pin it for a whole request, so they see the old
+    or the new files, never a mix, and never wait on a writer.
+
+    Staged files share their inode with the live ones: writers replace
+    files (temporary file, then os.replace) instead of writing into them.
+
+    A root without a pointer is a flat data directory from before
+    versioning. It is read in place and copied into the first version by
+    the first commit; the flat files are removed once they would have
+    been pruned as a version, so readers still pinned to the root keep
+    their files.
+    """
+
+    def __init__(self, root, keep=None):
+        self.root = root
+        self.keep = max(2, keep or Config.DATASET_VERSIONS_KEEP)
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._pinned = Counter()
+
+    def current(self):
+        """Id of the published version, or None for a flat directory"""
+        try:
+            with open(os.path.join(self.root, POINTER_FILE)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def directory(self):
+        """Directory to read and write: the pinned one, else the live version"""
+        pins = _pins.get()
+        if pins and self.root in pins:
+            return pins[self.root]
+        return self._path(self.current())
+
+    def version_of(self, directory):
+        """Version id of a published directory, None for flat or staging"""
+        parent, name = os.path.split(os.path.normpath(directory))
+        if parent != os.path.normpath(os.path.join(self.root, VERSIONS_DIR)) or name.startswith('.'):
+            return None
+        return name
+
+    @contextmanager
+    def pin(self, directory=None):
+        """Resolve directory() to directory (default: the live one) in this context"""
+        token = self.acquire(directory)
+        try:
+            yield token[1]
+        finally:
+            self.release(token)
+
+    def acquire(self, directory=None):
+        """pin() for request hooks; pass the returned token to release()"""
+        directory = directory or self.directory()
+        pins = dict(_pins.get() or {})
+        pins[self.root] = directory
+        version = self.version_of(directory)
+        if version is None and os.path.normpath(directory) == os.path.normpath(self.root):
+            version = FLAT
+        if version is not None:
+            with self._lock:
+                self._pinned[version] += 1
+        return _pins.set(pins), directory, version
+
+    def release(self, token):
+        reset, _, version = token
+        _pins.reset(reset)
+        if version is not None:
+            with self._lock:
+                self._pinned[version] -= 1
+                if self._pinned[version] <= 0:
+                    del self._pinned[version]
+
+    @contextmanager
+    def commit(self):
+        """
+        Stage a new version for the duration of the block, inside which
+        directory() resolves to the staging copy (so get_product_filename
+        and friends write there). On success the version is published if
+        anything changed; on error it is discarded and nothing changes.
+        Commits are serialized. Yields a StagedVersion, usable as the
+        staging directory path; after the block its pin() reads the
+        published version (a request stays pinned to the version it
+        started on).
+        """
+        with self._exclusive():
+            source = self._path(self.current())
+            versions = os.path.join(self.root, VERSIONS_DIR)
+            staged = StagedVersion(self, os.path.join(versions, f".staging-{uuid.uuid4().hex[:8]}"))
+            os.makedirs(staged.staging)
+            try:
+                for name in self._dataset_files(source):
+                    self._link(os.path.join(source, name), os.path.join(staged.staging, name))
+                before = self._signature(staged.staging)
+
+                with self.pin(staged.staging):
+                    yield staged
+
+                if self._signature(staged.staging) != before:
+                    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+                    os.rename(staged.staging, os.path.join(versions, version))
+                    self._publish(version)
+                    staged.version = version
+                    self._prune()
+            finally:
+                shutil.rmtree(staged.staging, ignore_errors=True)
+
+    def _path(self, version):
+        return os.path.join(self.root, VERSIONS_DIR, version) if version else self.root
+
+    @contextmanager
+    def _exclusive(self):
+        """Commit lock: per process, and across processes where flock exists"""
+        with self._commit_lock:
+            os.makedirs(self.root, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.root, LOCK_FILE), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _dataset_files(self, directory):
+        """Regular files that make up the dataset in directory"""
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            e.name for e in os.scandir(directory)
+            if e.is_file()
+            and not e.name.startswith('.')
+            and not e.name.endswith('.tmp')
+            and e.name != POINTER_FILE
+        )
+
+    def _link(self, src, dst):
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+
+    def _signature(self, directory):
+        return sorted(
+            (e.name, e.inode(), e.stat().st_size, e.stat().st_mtime_ns)
+            for e in os.scandir(directory) if e.is_file()
+        )
+
+    def _publish(self, version):
+        path = os.path.join(self.root, POINTER_FILE)
+        with open(f"{path}.tmp", 'w') as f:
+            f.write(version)
+        os.replace(f"{path}.tmp", path)
+
+    def _remove_flat(self):
+        """Drop the flat files copied into the first version"""
+        for name in self._dataset_files(self.root):
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+
+    def _prune(self):
+        """
+        Keep the newest keep versions, the live one and any pinned here.
+        The flat files of a migrated root count as the oldest version.
+        """
+        versions = os.path.join(self.root, VERSIONS_DIR)
+        published = sorted(n for n in os.listdir(versions) if not n.startswith('.'))
+        live = self.current()
+        with self._lock:
+            pinned = set(self._pinned)
+        for name in published[:-self.keep]:
+            if name != live and name not in pinned:
+                shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+        if len(published) >= self.keep and FLAT not in pinned:
+            self._remove_flat()
+
+
+class StagedVersion(os.PathLike):
+    """
+    A commit() in progress: a path-like for its staging directory, then,
+    once published, the version it became (None when nothing changed).
+    """
+
+    def __init__(self, versions, staging):
+        self.versions = versions
+        self.staging = staging
+        self.version = None
+
+    def __fspath__(self):
+        return self.staging
+
+    def pin(self):
+        """pin() to the published version (the reader's own when nothing was published)"""
+        return self.versions.pin(self.versions._path(self.version) if self.version else None)
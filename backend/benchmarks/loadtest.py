@@ -0,0 +1,303 @@
+"""
+End-to-end load test of the API with simulated planner sessions.
+
+    cd backend
+    python -m benchmarks.loadtest                         # start gunicorn (2 workers) on synthetic data
+    python -m benchmarks.loadtest --users 20 --duration 60 --scale medium
+    python -m benchmarks.loadtest --url http://127.0.0.1:5000   # an app that is already running
+    python -m benchmarks.loadtest --output load.json
+
+Each virtual user replays planner sessions back to back: log in, list
+products, load one product's data, move the event sliders (one /simulate
+per debounced change, --think seconds apart), then export. The report
+gives throughput and p50/p95/p99 latency per endpoint. Without --url the
+app is started locally on a synthetic DATA_DIR (benchmarks/synthetic.py)
+with gunicorn, or the threaded Flask server with --server flask; nothing
+leaves the machine.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import socket
+import shutil
+import tempfile
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+
+from . import synthetic
+from .run import SCALES
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROMO_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov']
+MS_MODES = ['relative', 'relative', 'historical']
+
+
+def server_app():
+    """
+    App factory for the locally started server: registers the synthetic
+    products passed in LOADTEST_MAPPING so discovery lists them, for the
+    lifetime of the server process.
+    """
+    synthetic.register(json.loads(os.environ.get('LOADTEST_MAPPING', '{}')))
+    from app import create_app
+    return create_app()
+
+
+class Recorder:
+    """Latency samples per endpoint, shared by the virtual users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.sessions = 0
+
+    def add(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            samples = sorted(samples)
+            endpoints[endpoint] = {
+                'requests': len(samples),
+                'errors': self.errors.get(endpoint, 0),
+                'rps': round(len(samples) / elapsed, 2),
+                'p50_ms': percentile(samples, 50),
+                'p95_ms': percentile(samples, 95),
+                'p99_ms': percentile(samples, 99)
+            }
+        total = sum(e['requests'] for e in endpoints.values())
+        return {
+            'seconds': round(elapsed, 2),
+            'sessions': self.sessions,
+            'requests': total,
+            'errors': sum(e['errors'] for e in endpoints.values()),
+            'rps': round(total / elapsed, 2),
+            'endpoints': endpoints
+        }
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile in ms"""
+    if not sorted_samples:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return round(sorted_samples[rank - 1] * 1000, 2)
+
+
+class Planner:
+    """One virtual user with its own keep-alive connection"""
+
+    def __init__(self, url, recorder, args, seed):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.args = args
+        self.rng = random.Random(seed)
+        self.conn = None
+        self.token = None
+
+    def request(self, method, path, endpoint, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = json.dumps(body).encode() if body is not None else None
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            ok = response.status < 400
+        except (OSError, http.client.HTTPException):
+            self.conn = None
+            data, ok = b'', False
+        self.recorder.add(endpoint, time.perf_counter() - started, ok)
+        if not ok:
+            return None
+        return json.loads(data) if data else {}
+
+    def session(self):
+        login = self.request('POST', '/api/auth/login', 'POST /api/auth/login', {
+            'username': self.args.username, 'password': self.args.password
+        })
+        if not login:
+            return False
+        self.token = login['access_token']
+
+        listing = self.request('GET', '/api/forecast/products', 'GET /api/forecast/products')
+        if not listing or not listing['products']:
+            return False
+        product = self.rng.choice(listing['products'])
+        aps = listing['aps_classes'].get(product) or []
+        aps_class = self.rng.choice(aps) if aps and self.rng.random() < 0.3 else None
+        query = f"?aps_class={aps_class}" if aps_class else ''
+        data = self.request('GET', f'/api/forecast/data/{product}{query}', 'GET /api/forecast/data/<product>')
+        if not data:
+            return False
+
+        year = str(max(int(y) for y in data['baseline']))
+        base = {
+            'baseline_vals': data['baseline'][year],
+            'weights': data['weights'] or {},
+            'market_share_data': data['market_share'],
+            'selected_year': int(year),
+            'locked_events': {}
+        }
+        result = None
+        for _ in range(self.args.simulations):
+            time.sleep(self.args.think)
+            result = self.request('POST', '/api/forecast/simulate', 'POST /api/forecast/simulate', {
+                **base,
+                'ms_mode': self.rng.choice(MS_MODES),
+                'ms_params': {'delta': self.rng.randint(-5, 5)},
+                'promo_settings': {'month': self.rng.choice(PROMO_MONTHS), 'pct': self.rng.randint(0, 30)},
+                'shortage_settings': {'month': self.rng.choice([None, 'Jun', 'Aug']), 'pct': self.rng.randint(0, 20)},
+                'toggle_settings': {'trend': True, 'trans': self.rng.random() < 0.5}
+            })
+        if result:
+            self.request('POST', '/api/forecast/export', 'POST /api/forecast/export', {
+                'product': product,
+                'aps_class': aps_class,
+                'year': int(year),
+                'baseline': base['baseline_vals'],
+                'simulated': result['simulated'],
+                'multipliers': result['final_multipliers'],
+                'ms_adjustments': result['ms_adjustments'],
+                'applied_details': result['applied_details']
+            })
+        return True
+
+    def run(self, deadline):
+        while time.monotonic() < deadline:
+            if self.session():
+                with self.recorder._lock:
+                    self.recorder.sessions += 1
+            else:
+                time.sleep(0.5)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, data_dir, mapping):
+    """Start the app on synthetic data; returns (process, url)"""
+    port = free_port()
+    env = dict(os.environ, DATA_DIR=data_dir, LOADTEST_MAPPING=json.dumps(mapping), RAILWAY_ENVIRONMENT='loadtest')
+    if args.server == 'gunicorn':
+        command = [
+            sys.executable, '-m', 'gunicorn', 'benchmarks.loadtest:server_app()',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers), '--log-level', 'warning'
+        ]
+    else:
+        command = [sys.executable, '-m', 'benchmarks.loadtest', '--serve', str(port)]
+    # The app prints every read and logs every request; keep that out of the report
+    log = open(args.server_log, 'w') if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    if args.server_log:
+        log.close()
+    url = f'http://127.0.0.1:{port}'
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with status {process.returncode} (see --server-log)')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('server did not start within 30 s')
+
+
+def run_load(url, args):
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + args.duration
+    users = [
+        threading.Thread(target=Planner(url, recorder, args, seed=i).run, args=(deadline,), daemon=True)
+        for i in range(args.users)
+    ]
+    for user in users:
+        user.start()
+        time.sleep(args.ramp / max(1, args.users))
+    for user in users:
+        user.join()
+    return recorder.report(time.monotonic() - started)
+
+
+def print_report(report):
+    print(f"{report['sessions']} sessions, {report['requests']} requests ({report['errors']} errors) "
+          f"in {report['seconds']} s, {report['rps']} req/s")
+    print(f"{'endpoint':38s} {'requests':>8s} {'errors':>6s} {'req/s':>7s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+    for endpoint, row in report['endpoints'].items():
+        print(f"{endpoint:38s} {row['requests']:8d} {row['errors']:6d} {row['rps']:7.2f} "
+              f"{row['p50_ms']:8.2f} {row['p95_ms']:8.2f} {row['p99_ms']:8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the API with simulated planner sessions')
+    parser.add_argument('--url', help='target an app already running at this URL')
+    parser.add_argument('--users', type=int, default=10, help='concurrent planners')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--ramp', type=float, default=2, help='seconds to start all users')
+    parser.add_argument('--simulations', type=int, default=15, help='/simulate calls per session')
+    parser.add_argument('--think', type=float, default=0.3, help='seconds between slider changes (debounce)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='synthetic DATA_DIR size')
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--server-log', help='write the local server output to this path')
+    parser.add_argument('--output', help='write the report as JSON to this path')
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        server_app().run(host='127.0.0.1', port=args.serve, threaded=True)
+        return 0
+
+    process, workdir = None, None
+    try:
+        url = args.url
+        if not url:
+            workdir = tempfile.mkdtemp(prefix='dkn-load-')
+            data_dir = os.path.join(workdir, 'data')
+            mapping = synthetic.generate_portfolio(data_dir, **SCALES[args.scale])
+            process, url = start_server(args, data_dir, mapping)
+        report = run_load(url, args)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report['config'] = {k: getattr(args, k) for k in ('users', 'duration', 'simulations', 'think', 'scale', 'server', 'workers')}
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Microbenchmarks of the simulation and data hot paths.
+
+    cd backend
+    python -m benchmarks.run                      # small and medium, compare to baselines
+    python -m benchmarks.run --scale large --only read_yearly_data
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --update-baseline    # record this machine's timings
+
+Each case is timed over several repeats on synthetic data (see
+benchmarks/synthetic.py) and reported as median and best per call, in
+milliseconds, and as 'relative': the median over that of a calibration
+loop timed in the same run. Baselines store the relative times, so they
+carry over between machines of different speed; cases whose relative
+time exceeds the baseline's by more than the tolerance are regressions
+and make the run exit with status 1.
+"""
+import os
+import io
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+import platform
+import statistics
+import contextlib
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from app.services.excel_handler import ExcelHandler
+from app.services.data_store import DataStore
+from app.services.simulation import SimulationEngine
+from app.services.market_share import MarketShareService
+from app.services.ingestion import IngestionService
+from app.services.aggregates import AggregateService
+from app.utils.periods import period_labels
+from . import synthetic
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# products, APS classes per product, years per series
+SCALES = {
+    'small': {'products': 5, 'aps': 3, 'years': 5},
+    'medium': {'products': 20, 'aps': 5, 'years': 10},
+    'large': {'products': 50, 'aps': 8, 'years': 25}
+}
+
+DEFAULT_SCALES = ('small', 'medium')
+TOLERANCE = 0.5
+
+
+class Case:
+    """A named benchmark: fn() timed loops times per repeat, after setup()"""
+
+    def __init__(self, name, fn, setup=None, loops=1, repeat=5):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+        self.loops = loops
+        self.repeat = repeat
+
+    def run(self):
+        samples = []
+        for _ in range(self.repeat):
+            if self.setup:
+                self.setup()
+            started = perf_counter()
+            for _ in range(self.loops):
+                self.fn()
+            samples.append((perf_counter() - started) / self.loops * 1000)
+        return {
+            'median_ms': round(statistics.median(samples), 4),
+            'min_ms': round(min(samples), 4),
+            'loops': self.loops,
+            'repeat': self.repeat
+        }
+
+
+def scenario(periods, events=True):
+    """compute_simulation arguments for one dashboard scenario"""
+    rng = np.random.default_rng(periods)
+    labels = period_labels(periods)
+    baseline = (1000 * rng.uniform(0.8, 1.2, size=periods)).tolist()
+    weights = synthetic.weights_frame(rng, weekly=periods > 12).to_dict('list')
+    promo_month = labels[2] if events else None
+    return {
+        'baseline_vals': baseline,
+        'weights': weights,
+        'ms_settings': {'mode': 'relative', 'delta': 2, 'adjustments': {m: 1.02 for m in labels}},
+        'promo_settings': {'month': promo_month, 'pct': 10, 'spill_enabled': True, 'spill_pct': 10},
+        'shortage_settings': {'month': labels[5] if events else None, 'pct': 5},
+        'regulation_settings': {'month': labels[7] if events else None, 'pct': 5},
+        'custom_settings': {'month': labels[9] if events else None, 'weight': 1.05, 'pct': 0},
+        'toggle_settings': {'trend': True, 'trans': True, 'pf_pos': True, 'pf_neg': False},
+        'locked_events': {'Promo': [{'month': labels[1], 'multiplier': 1.1}]},
+        'damp_k': 0.5,
+        'year': 2025
+    }
+
+
+def calibration():
+    """Fixed workload of Python loops and small NumPy ops, the unit of relative times"""
+    values = np.random.default_rng(0).uniform(0.8, 1.2, size=(200, 53))
+    labels = [f"W{i:02d}" for i in range(1, 54)]
+
+    def work():
+        table = {}
+        for row in values:
+            table.update(zip(labels, np.cumprod(row).tolist()))
+        return sorted(table.items())
+
+    return Case('calibration', work, loops=20, repeat=7)
+
+
+def engine_cases():
+    """Scale-free cases: one scenario, monthly and weekly"""
+    engine = SimulationEngine()
+    cases = []
+    for label, periods in (('monthly', 12), ('weekly', 53)):
+        args = scenario(periods)
+        simulated = engine.compute_simulation(**args)['simulated']
+        cases.append(Case(f"compute_simulation[{label}]", lambda a=args: engine.compute_simulation(**a), loops=200))
+        cases.append(Case(
+            f"calculate_exceeded_months[{label}]",
+            lambda s=simulated, b=args['baseline_vals']: engine.calculate_exceeded_months(s, b),
+            loops=200
+        ))
+    return cases
+
+
+def data_cases(scale, workdir, stack):
+    """Cases over a synthetic portfolio of the given scale, registered until stack closes"""
+    size = SCALES[scale]
+    data_dir = os.path.join(workdir, scale, 'data')
+    mapping = stack.enter_context(synthetic.registered(synthetic.generate_portfolio(data_dir, **size)))
+    handler = ExcelHandler()
+    handler.data_dir = data_dir
+    product = sorted(mapping)[0]
+    baseline = handler.get_product_filename(product, 'post_processed')
+    weights = handler.get_product_filename(product, 'weights')
+    market_share = handler.read_yearly_data(handler.get_product_filename(product, 'market_share'))
+    selected_year = max(market_share) + 1
+
+    # The same file in the layout written before the canonical schema
+    legacy = os.path.join(workdir, scale, 'legacy.csv')
+    pd.read_csv(baseline).rename(columns={'Year': 'year'}).to_csv(legacy, index=False)
+
+    stores = []
+    market = MarketShareService()
+    workbook = synthetic.generate_workbook(os.path.join(workdir, scale, 'upload.xlsx'), years=size['years'])
+    ingest_dir = os.path.join(workdir, scale, 'ingest')
+
+    def fresh_ingest_dir():
+        shutil.rmtree(ingest_dir, ignore_errors=True)
+        os.makedirs(ingest_dir)
+
+    ingest_handler = ExcelHandler()
+    ingest_handler.data_dir = ingest_dir
+    service = IngestionService(
+        handler=ingest_handler,
+        aggregates=AggregateService(store=DataStore(ingest_handler)),
+        jobs_dir=os.path.join(workdir, scale, 'jobs'),
+        parse_processes=0
+    )
+
+    def ingest():
+        job = service.wait(service.submit(workbook, product)['id'])
+        if job['status'] != 'done':
+            raise RuntimeError(job['message'])
+
+    return [
+        Case(f"read_yearly_data[{scale}]", lambda: handler.read_yearly_data(baseline), loops=20),
+        Case(f"read_yearly_data_legacy[{scale}]", lambda: handler.read_yearly_data(legacy), loops=5),
+        Case(f"read_weights[{scale}]", lambda: handler.read_weights(weights), loops=20),
+        Case(f"calculate_historical_trend[{scale}]", lambda: market.calculate_historical_trend(market_share, selected_year), loops=50),
+        Case(f"discover_products_and_aps[{scale}]", handler.discover_products_and_aps, loops=5),
+        Case(f"portfolio_load[{scale}]", lambda: stores[-1].portfolio(), setup=lambda: stores.append(DataStore(handler)), repeat=3),
+        Case(f"ingest_workbook[{scale}]", ingest, setup=fresh_ingest_dir, repeat=3)
+    ]
+
+
+def run_cases(scales, only=None):
+    """{case name: timings} for the engine cases and every scale"""
+    workdir = tempfile.mkdtemp(prefix='dkn-bench-')
+    unit = calibration().run()
+    results = {'calibration': unit}
+    try:
+        # The app logs every read with print(); keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()) as sink, contextlib.ExitStack() as stack:
+            cases = engine_cases()
+            for scale in scales:
+                cases += data_cases(scale, workdir, stack)
+            for case in cases:
+                if only and not any(case.name.startswith(o) for o in only):
+                    continue
+                results[case.name] = case.run()
+                sink.seek(0)
+                sink.truncate()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for result in results.values():
+        result['relative'] = round(result['median_ms'] / unit['median_ms'], 4)
+    return results
+
+
+def compare(results, baselines, tolerance=TOLERANCE):
+    """Cases whose relative time is over the baseline's * (1 + tolerance)"""
+    regressions = {}
+    for name, result in results.items():
+        base = baselines.get(name)
+        if base and result['relative'] > base['relative'] * (1 + tolerance):
+            regressions[name] = {
+                'relative': result['relative'],
+                'baseline_relative': base['relative'],
+                'ratio': round(result['relative'] / base['relative'], 2)
+            }
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+def load_baselines(path=BASELINES):
+    """Stored results with relative times, or {} when missing"""
+    try:
+        with open(path) as f:
+            results = json.load(f).get('results', {})
+    except (OSError, ValueError):
+        return {}
+    if any('relative' not in r for r in results.values()):
+        print(f"baselines in {path} hold absolute times only; not comparing, "
+              f"use --update-baseline to record relative ones", file=sys.stderr)
+        return {}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the simulation and data hot paths')
+    parser.add_argument('--scale', nargs='+', choices=sorted(SCALES), default=list(DEFAULT_SCALES))
+    parser.add_argument('--only', nargs='+', help='case name prefixes to run')
+    parser.add_argument('--output', help='write the results as JSON to this path')
+    parser.add_argument('--baseline', default=BASELINES, help='baselines JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help='allowed slowdown, 0.5 = 50%%')
+    parser.add_argument('--update-baseline', action='store_true', help='store these results as the baselines')
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.scale, args.only)
+    baselines = load_baselines(args.baseline)
+    regressions = compare(results, baselines, args.tolerance)
+    report = {'environment': environment(), 'results': results, 'regressions': regressions}
+
+    for name, result in results.items():
+        base = baselines.get(name)
+        versus = f"  (baseline {base['relative']:.3f})" if base else ''
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f"{name:45s} {result['median_ms']:10.3f} ms {result['relative']:10.3f} x{versus}{flag}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        stored = dict(baselines)
+        stored.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'environment': environment(), 'results': dict(sorted(stored.items()))}, f, indent=2)
+            f.write('\n')
+        return 0
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%} tolerance", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Synthetic portfolios and upload workbooks of any size, in the layouts the
+app reads and ingests, for benchmarks and tests.
+"""
+import os
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from app.utils.constants import MONTHS, WEIGHT_COLUMNS, PRODUCT_APS_MAPPING
+from app.utils.periods import WEEKS, iso_weeks
+
+
+def product_codes(n):
+    """The real product codes first, then P001, P002, ..."""
+    codes = sorted(PRODUCT_APS_MAPPING)[:n]
+    return codes + [f"P{i:03d}" for i in range(1, n - len(codes) + 1)]
+
+
+def aps_names(product, n):
+    """APS classes of a product: its real ones first, then {product}_A01, ..."""
+    names = list(PRODUCT_APS_MAPPING.get(product, []))[:n]
+    return names + [f"{product}_A{i:02d}" for i in range(1, n - len(names) + 1)]
+
+
+def register(mapping):
+    """
+    Make synthetic products discoverable: discovery only lists products
+    and APS classes in PRODUCT_APS_MAPPING. This changes the process-wide
+    mapping; returns a function restoring it. Use registered() unless the
+    process exists to serve the synthetic data.
+    """
+    saved = {product: list(PRODUCT_APS_MAPPING[product]) for product in mapping if product in PRODUCT_APS_MAPPING}
+    for product, names in mapping.items():
+        known = PRODUCT_APS_MAPPING.setdefault(product, [])
+        known.extend(a for a in names if a not in known)
+
+    def restore():
+        for product in mapping:
+            if product in saved:
+                PRODUCT_APS_MAPPING[product][:] = saved[product]
+            else:
+                PRODUCT_APS_MAPPING.pop(product, None)
+
+    return restore
+
+
+@contextmanager
+def registered(mapping):
+    """register() for the duration of a block"""
+    restore = register(mapping)
+    try:
+        yield mapping
+    finally:
+        restore()
+
+
+def yearly_frame(rng, years, start_year=2020, weekly=False, level=1000.0):
+    """Canonical yearly frame (Year + months or weeks) with seasonal noise"""
+    columns = WEEKS if weekly else MONTHS
+    periods = len(columns)
+    season = 1 + 0.3 * np.sin(np.arange(periods) / periods * 2 * np.pi)
+    values = level * season * rng.uniform(0.8, 1.2, size=(years, periods))
+    df = pd.DataFrame(values.round(3), columns=columns)
+    df.insert(0, 'Year', np.arange(start_year, start_year + years))
+    if weekly:
+        # Years with 52 ISO weeks leave W53 blank
+        for r, year in enumerate(df['Year']):
+            if iso_weeks(year) == 52:
+                df.loc[r, 'W53'] = np.nan
+    return df
+
+
+def weights_frame(rng, weekly=False):
+    periods = len(WEEKS) if weekly else len(MONTHS)
+    return pd.DataFrame({
+        col: rng.uniform(0.8, 1.3, size=periods).round(4) for col in WEIGHT_COLUMNS
+    })
+
+
+def generate_portfolio(data_dir, products=5, aps=3, years=5, weekly=False, seed=0, start_year=2020):
+    """
+    Write products x (1 + aps) series of `years` years into data_dir:
+    baseline, actual and delivered for every product and APS class, plus
+    market share and weights per product. Returns {product: [APS classes]}.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    mapping = {}
+
+    def write(df, name):
+        df.to_csv(os.path.join(data_dir, name), index=False)
+
+    for product in product_codes(products):
+        mapping[product] = aps_names(product, aps)
+        prefixes = [product] + [f"{product}_{a.replace(' ', '_')}" for a in mapping[product]]
+        for prefix in prefixes:
+            for file_type in ('post_processed', 'actual', 'Delivered'):
+                write(yearly_frame(rng, years, start_year, weekly), f"{prefix}_{file_type}.csv")
+        write(yearly_frame(rng, years, start_year, weekly, level=25.0), f"{product}_market_share.csv")
+        write(weights_frame(rng, weekly), f"{product}_weights.csv")
+    return mapping
+
+
+def generate_workbook(path, years=5, weekly=False, seed=0, start_year=2020):
+    """Single-product upload workbook with every sheet ingestion reads"""
+    rng = np.random.default_rng(seed)
+    with pd.ExcelWriter(path) as writer:
+        for sheet in ('Baseline', 'Actuals', 'Delivered'):
+            yearly_frame(rng, years, start_year, weekly).to_excel(writer, sheet_name=sheet, index=False)
+        yearly_frame(rng, years, start_year, weekly, level=25.0).to_excel(writer, sheet_name='MarketShare', index=False)
+        weights_frame(rng, weekly).to_excel(writer, sheet_name='Weights', index=False)
+    return path
@@ -9,12 +9,16 @@ sys.path.insert(0, backend_dir)
 
 from app import create_app
 from app.config import Config
+from app.services.excel_handler import ExcelHandler
+from app.services.data_store import DataStore
+from app.utils.constants import MONTHS
 
 class TestConfig(Config):
     TESTING = True
     JWT_SECRET_KEY = 'test-jwt-secret'
     SECRET_KEY = 'test-secret'
     DATA_DIR = tempfile.mkdtemp()
+    RUNTIME_DIR = tempfile.mkdtemp()
 
 @pytest.fixture
 def app():
@@ -25,6 +29,7 @@ def app():
     import shutil
     if os.path.exists(TestConfig.DATA_DIR):
         shutil.rmtree(TestConfig.DATA_DIR)
+    shutil.rmtree(TestConfig.RUNTIME_DIR, ignore_errors=True)
 
 @pytest.fixture
 def client(app):
@@ -40,4 +45,22 @@ def auth_headers(client):
     })
     data = response.get_json()
     token = data['access_token']
-    return {'Authorization': f'Bearer {token}'}
\ No newline at end of file
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def write_yearly():
+    """Write a canonical yearly CSV from {year: values} (None leaves a blank)"""
+    def write(path, rows):
+        with open(f"{path}.tmp", 'w') as f:
+            f.write(','.join(['Year'] + MONTHS) + '\n')
+            for year, values in rows.items():
+                f.write(','.join([str(year)] + ['' if v is None else str(v) for v in values]) + '\n')
+        os.replace(f"{path}.tmp", path)
+    return write
+
+@pytest.fixture
+def store(tmp_path):
+    """DataStore over its own ExcelHandler rooted at tmp_path (loaded on first read)"""
+    handler = ExcelHandler()
+    handler.data_dir = str(tmp_path)
+    return DataStore(handler)
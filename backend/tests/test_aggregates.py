@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.aggregates import AggregateService
+
+class TestAggregateService:
+    @pytest.fixture
+    def service(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'HP_post_processed.csv', {2024: [10.0] * 12, 2025: [float(m) for m in range(1, 13)]})
+        write_yearly(tmp_path / 'HP_actual.csv', {2024: [10.0] * 12, 2025: [12.0] * 3 + [None] * 9})
+        write_yearly(tmp_path / 'HP_HP_1PH_post_processed.csv', {2025: [4.0] * 12})
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2025: [5.0] * 12})
+        (tmp_path / 'HP_weights.csv').write_text('Trend\n' + '\n'.join(['1.1'] * 12) + '\n')
+        return AggregateService(store=store)
+
+    def test_quarterly_annual_and_yoy(self, service):
+        baseline = service.summary()['products']['HP']['series']['baseline']['product']
+        assert baseline['years'] == [2024, 2025]
+        assert baseline['quarterly'][1] == [6.0, 15.0, 24.0, 33.0]
+        assert baseline['annual'] == [120.0, 78.0]
+        assert baseline['yoy_pct'][0] is None
+        assert baseline['yoy_pct'][1] == pytest.approx(-35.0)
+        assert baseline['ytd'][1][-1] == 78.0
+        assert baseline['quarterly_ytd'][1] == [6.0, 21.0, 45.0, 78.0]
+
+    def test_partial_actuals_compare_ytd(self, service):
+        actual = service.summary()['products']['HP']['series']['actual']['product']
+        assert actual['recorded_periods'] == [12, 3]
+        assert actual['ytd_yoy_pct'][1] == pytest.approx(20.0)
+
+    def test_portfolio_and_simulated(self, service):
+        summary = service.summary()
+        assert summary['portfolio']['baseline']['annual'] == [120.0, 138.0]
+        assert 'simulated' not in summary['products']['HP']['series']
+        assert service.scenario({}, ['HP'])['products']['HP']['aps']['HP_1PH']['annual'] == [48.0]
+        scenario = service.scenario({'toggle_settings': {'trend': True}}, ['HP'])
+        assert scenario['products']['HP']['product']['annual'][0] == pytest.approx(132.0)
+        assert scenario['portfolio']['years'] == [2024, 2025]
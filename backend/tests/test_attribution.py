@@ -0,0 +1,55 @@
+import pytest
+import sys
+import os
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.attribution import AttributionService
+from app.utils.constants import MONTHS
+
+class TestAttributionService:
+    @pytest.fixture
+    def service(self):
+        return AttributionService()
+
+    @pytest.fixture
+    def scenario(self):
+        return {
+            'baseline_vals': [1000, 1100, 1200, 1150, 1300, 1400, 1350, 1250, 1200, 1100, 1050, 1000],
+            'weights': {'UpromoUp': [1.15] * 12, 'UPromoDwn': [0.92] * 12, 'Trend': [1.02] * 12},
+            'ms_settings': {'adjustments': {m: 1.05 for m in MONTHS}},
+            'promo_settings': {'month': 'May', 'pct': 10},
+            'shortage_settings': {'month': None},
+            'regulation_settings': {'month': None},
+            'custom_settings': {'month': None},
+            'toggle_settings': {'trend': True},
+            'locked_events': {},
+        }
+
+    def test_factors_listed(self, service, scenario):
+        result = service.attribute(scenario)
+        assert result['factors'] == ['Trend', 'Promo_March_Reduction', 'UpromoUp', 'UPromoDwn', 'MarketShare']
+
+    def test_contributions_reconcile(self, service, scenario):
+        result = service.attribute(scenario)
+        loo_total = sum(c['annual'] for c in result['leave_one_out'].values())
+        assert loo_total + result['interaction']['annual'] == pytest.approx(result['total_change']['annual'])
+
+    def test_dampening_in_promo_month(self, service, scenario):
+        result = service.attribute(scenario)
+        may = MONTHS.index('May')
+        # Trend and promo are both ups in May, so dampening pulls May down
+        assert result['dampening']['monthly'][may] < 0
+        assert result['dampening']['monthly'][MONTHS.index('Jan')] == 0
+        # Alone, the trend toggle lifts May by 2% of baseline
+        assert result['marginal']['Trend']['monthly'][may] == pytest.approx(1300 * 0.02)
+
+    def test_closed_months_match_simulate(self, service, scenario):
+        scenario['closed_months'] = 3
+        result = service.attribute(scenario)
+        expected = service.engine.compute_simulation(**scenario)['simulated']
+        assert result['simulated'] == pytest.approx(expected)
+        assert result['simulated'][:3] == scenario['baseline_vals'][:3]
+        for contributions in (result['leave_one_out'], result['marginal']):
+            assert all(c['monthly'][:3] == [0.0] * 3 for c in contributions.values())
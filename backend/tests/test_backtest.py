@@ -0,0 +1,45 @@
+import pytest
+
+from app.services.backtest import BacktestService
+
+class TestBacktestService:
+    @pytest.fixture
+    def service(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2024: [110.0] * 12, 2025: [100.0] * 12})
+        # Nov/Dec not closed yet
+        write_yearly(tmp_path / 'CN_actual.csv', {2025: [80.0] * 10 + [0, 0]})
+        write_yearly(tmp_path / 'CN_Delivered.csv', {2024: [100.0] * 12})
+        (tmp_path / 'CN_weights.csv').write_text('Trend\n' + '\n'.join(['1.25'] * 12) + '\n')
+        return BacktestService(store=store)
+
+    def test_baseline_metrics(self, service):
+        report = service.report()
+        vs_actual = report['portfolio']['baseline_vs_actual']
+        assert vs_actual['months'] == 10
+        assert vs_actual['mape'] == pytest.approx(25.0)
+        assert vs_actual['wape'] == pytest.approx(25.0)
+        assert vs_actual['bias'] == pytest.approx(25.0)
+        assert report['portfolio']['baseline_vs_delivered']['bias'] == pytest.approx(10.0)
+
+    def test_per_year_breakdown(self, service):
+        series = service.report()['series'][0]
+        assert series['product'] == 'CN'
+        assert set(series['years']) == {2024, 2025}
+        assert 'baseline_vs_actual' not in series['years'][2024]
+
+    def test_cached_per_version_and_scenarios(self, service):
+        assert service.report()['series'] is service.report()['series']
+        report = service.report({'trend': {'toggle_settings': {'trend': True}}})
+        assert report['scenarios']['trend']['portfolio']['simulated_vs_actual']['bias'] == pytest.approx(56.25)
+
+    def test_calendar_events_land_in_their_year(self, service):
+        calendar = {'start_year': 2024, 'month': [0, 12], 'category': ['Promo', 'Promo'], 'multiplier': [0.5, 2.0]}
+        scenario = service.report({'cal': {'locked_events': {'calendar': calendar}}})['scenarios']['cal']
+        years = scenario['series'][0]['years']
+        assert years[2024]['simulated_vs_delivered']['bias'] == pytest.approx((55.0 + 11 * 110.0 - 1200.0) / 12.0)
+        assert years[2025]['simulated_vs_actual']['bias'] == pytest.approx((200.0 + 9 * 100.0 - 800.0) / 8.0)
+
+    def test_accuracy_endpoint(self, client, auth_headers):
+        response = client.get('/api/reports/accuracy', headers=auth_headers)
+        assert response.status_code == 200
+        assert 'baseline_vs_actual' in response.get_json()['portfolio']
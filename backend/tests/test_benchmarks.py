@@ -0,0 +1,65 @@
+import pytest
+import sys
+import os
+import json
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.excel_handler import ExcelHandler
+from app.services.data_store import DataStore
+from benchmarks import synthetic
+from benchmarks.run import Case, compare, environment, load_baselines
+
+class TestSyntheticPortfolio:
+    def test_portfolio_is_discovered_and_loaded(self, tmp_path):
+        mapping = synthetic.generate_portfolio(str(tmp_path), products=2, aps=1, years=3)
+        assert sorted(mapping) == ['AH', 'CL'] and all(len(a) == 1 for a in mapping.values())
+        handler = ExcelHandler()
+        handler.data_dir = str(tmp_path)
+        products, aps_classes = handler.discover_products_and_aps()
+        assert products == ['AH', 'CL']
+        assert all(len(aps_classes[p]) == 1 for p in products)
+
+        data = DataStore(handler).product('AH')
+        assert data.baseline.years.tolist() == [2020, 2021, 2022]
+        assert data.periods == 12 and len(data.aps) == 1
+        assert data.weights and len(data.market_share) == 3
+
+    def test_registered_restores_the_mapping(self):
+        from app.utils.constants import PRODUCT_APS_MAPPING
+        before = {p: list(a) for p, a in PRODUCT_APS_MAPPING.items()}
+        product = sorted(PRODUCT_APS_MAPPING)[0]
+        with synthetic.registered({'P001': ['P001_A01'], product: [f"{product}_A01"]}):
+            assert PRODUCT_APS_MAPPING['P001'] == ['P001_A01']
+            assert PRODUCT_APS_MAPPING[product][-1] == f"{product}_A01"
+        assert PRODUCT_APS_MAPPING == before
+
+    def test_names_beyond_the_real_products(self):
+        assert synthetic.product_codes(7)[-2:] == ['P001', 'P002']
+        assert synthetic.aps_names('P001', 2) == ['P001_A01', 'P001_A02']
+
+    def test_weekly_years_keep_their_week_count(self, tmp_path):
+        synthetic.generate_portfolio(str(tmp_path), products=1, aps=0, years=2, weekly=True, start_year=2020)
+        handler = ExcelHandler()
+        yearly = handler.read_yearly_data(str(tmp_path / 'AH_post_processed.csv'))
+        assert [len(yearly[y]) for y in (2020, 2021)] == [53, 52]
+
+class TestBenchmarkRunner:
+    def test_case_and_compare(self):
+        result = Case('noop', lambda: None, loops=3, repeat=2).run()
+        assert set(result) == {'median_ms', 'min_ms', 'loops', 'repeat'}
+        baselines = {'a': {'relative': 1.0}, 'b': {'relative': 1.0}}
+        # A machine twice as slow has twice the median but the same relative time
+        results = {'a': {'median_ms': 2.8, 'relative': 1.4}, 'b': {'median_ms': 3.2, 'relative': 1.6}, 'c': {'relative': 9.0}}
+        assert list(compare(results, baselines, tolerance=0.5)) == ['b']
+
+    def test_absolute_baselines_are_not_compared(self, tmp_path, capsys):
+        path = tmp_path / 'baselines.json'
+        results = {'a': {'median_ms': 2.0, 'relative': 1.0}}
+        path.write_text(json.dumps({'environment': environment(), 'results': results}))
+        assert load_baselines(str(path)) == results
+
+        path.write_text(json.dumps({'results': {'a': {'median_ms': 2.0}}}))
+        assert load_baselines(str(path)) == {}
+        assert 'absolute times only' in capsys.readouterr().err
@@ -0,0 +1,48 @@
+import pytest
+import os
+
+from app.services.backtest import BacktestService
+from app.services.calibration import CalibrationService
+
+class TestCalibration:
+    @pytest.fixture
+    def service(self, store, tmp_path, write_yearly):
+        # Actuals run 10% over baseline, with a 30% lift in Mar of 2024
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2023: [100.0] * 12, 2024: [100.0] * 12, 2025: [100.0] * 12})
+        lifted = [110.0] * 12
+        lifted[2] = 143.0
+        write_yearly(tmp_path / 'CN_actual.csv', {2023: [110.0] * 12, 2024: lifted, 2025: [110.0] * 12})
+        (tmp_path / 'CN_weights.csv').write_text('Trend,UpromoUp,Dampening\n1.0,1.2,0.5\n' + '1.0,1.2,\n' * 11)
+        return CalibrationService(store=store, backtest=BacktestService(store=store))
+
+    def test_fit_and_report(self, service):
+        report = service.run(min_obs=1)['CN']
+        trend = report['columns']['trend']['candidate']
+        assert trend[0] == pytest.approx(1.1)
+        assert trend[2] > 1.1
+        promo = report['columns']['upromoup']
+        assert promo['candidate'][2] == pytest.approx(1.3 * 110.0 / (110.0 * (1.3 ** (143.0 / 363.0))), rel=1e-6)
+        assert promo['candidate'][8] == pytest.approx(1.2)
+        fit = report['trend_fit']
+        assert fit['wape_candidate_trend'] < fit['wape_current_trend']
+
+    def test_min_obs_keeps_current(self, service):
+        report = service.run(min_obs=2)['CN']
+        assert report['columns']['upromoup']['candidate'][2] == pytest.approx(1.2)
+        assert report['columns']['trend']['candidate'][0] == pytest.approx(1.1)
+
+    def test_preview_then_promote(self, service):
+        assert service.preview('CN') is None
+        service.run(min_obs=1)
+        preview = service.preview('CN')
+        assert preview['active']['Trend'] == [1.0] * 12
+        assert preview['candidate']['Trend'][0] == pytest.approx(1.1)
+        assert preview['candidate']['Dampening'] == 0.5
+        assert 'Regulation' not in preview['candidate']
+        assert preview['report']['product'] == 'CN'
+
+        assert service.promote('CN')
+        data = service.store.product('CN')
+        assert data.weights['Trend'][0] == pytest.approx(1.1)
+        assert os.path.exists(service._paths('CN')['previous'])
+        assert not service.promote('CN')
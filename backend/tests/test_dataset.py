@@ -0,0 +1,85 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.models import SeriesBlock, ProductDataset
+from app.services.excel_handler import excel_handler
+from app.utils.versions import DatasetVersions
+
+class TestSeriesBlock:
+    def test_from_yearly_sorts_and_looks_up(self):
+        block = SeriesBlock.from_yearly({'2026': [2.0] * 12, 2025: [1.0] * 12})
+        assert block.keys() == [2025, 2026]
+        assert block.values.flags['C_CONTIGUOUS'] and block.values.shape == (2, 12)
+        assert 2026 in block and '2026' in block and 'x' not in block
+        assert block['2025'].tolist() == [1.0] * 12
+        assert block.get(1999) is None
+
+    def test_weekly_lengths_and_dict(self):
+        block = SeriesBlock.from_yearly({2025: [1.0] * 52, 2026: [float('nan')] + [2.0] * 52})
+        assert block.periods == 53
+        assert len(block[2025]) == 52 and len(block[2026]) == 53
+        assert block.to_dict()[2026][0] == 0.0
+
+    def test_product_dataset_stack_and_series(self):
+        dataset = ProductDataset(
+            'HP',
+            baseline=SeriesBlock.from_yearly({2025: [10.0] * 12}),
+            aps={
+                'HP_3PH': SeriesBlock.from_yearly({2026: [3.0] * 12}),
+                'HP_1PH': SeriesBlock.from_yearly({2025: [1.0] * 12})
+            }
+        )
+        assert dataset.periods == 12
+        assert dataset.stacked['aps'] == ['HP_1PH', 'HP_3PH']
+        assert dataset.stacked['years'] == [2025, 2026]
+        assert np.isnan(dataset.stacked['values'][0, 1]).all()
+        assert dataset.series('actual', 'HP_1PH') is ProductDataset.EMPTY
+        with pytest.raises(AttributeError):
+            dataset.extra = 1
+
+class TestDataStore:
+    @pytest.fixture
+    def store(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2025: [100.0] * 12})
+        write_yearly(tmp_path / 'HP_post_processed.csv', {2025: [200.0] * 12})
+        return store
+
+    def test_product_loads_only_that_product(self, store):
+        assert store.product('CN').baseline[2025][0] == 100.0
+        assert store.product('XX') is None
+        files = store._entry()['files']
+        assert 'CN_post_processed.csv' in files and 'HP_post_processed.csv' not in files
+        assert sorted(store.portfolio()) == ['CN', 'HP']
+        assert store.portfolio()['CN'] is store.product('CN')
+
+    def test_flat_version_follows_the_directory(self, store, tmp_path, write_yearly):
+        version = store.version()
+        assert store.version() == version
+        assert store.product('CN').baseline[2025][0] == 100.0
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2025: [150.0] * 12})
+        assert store.version() != version
+        assert store.product('CN').baseline[2025][0] == 150.0
+
+    def test_unmapped_products_and_aps_classes_are_read_from_disk(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'ZZ_post_processed.csv', {2025: [5.0] * 12})
+        write_yearly(tmp_path / 'CN_Spare_post_processed.csv', {2025: [7.0] * 12})
+        assert store.product('ZZ').baseline[2025][0] == 5.0
+        assert store.product('CN', 'Spare').series('baseline', 'Spare')[2025][0] == 7.0
+        # Discovery and portfolio-wide results still follow the mapping
+        assert 'ZZ' not in store.portfolio()
+        assert 'Spare' not in store.portfolio()['CN'].aps
+        assert store.product('CN', 'Missing') is store.product('CN')
+
+    def test_routes_serve_unmapped_series(self, tmp_path, write_yearly, client, auth_headers, monkeypatch):
+        monkeypatch.setattr(excel_handler, 'versions', DatasetVersions(str(tmp_path)))
+        write_yearly(tmp_path / 'ZZ_post_processed.csv', {2025: [5.0] * 12})
+        write_yearly(tmp_path / 'ZZ_Spare_post_processed.csv', {2024: [7.0] * 12})
+        assert client.get('/api/data/years/ZZ', headers=auth_headers).get_json()['years'] == [2025]
+        response = client.get('/api/forecast/data/ZZ?aps_class=Spare', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.get_json()['baseline'] == {'2024': [7.0] * 12}
@@ -0,0 +1,141 @@
+import pytest
+import sys
+import os
+import pandas as pd
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.excel_handler import ExcelHandler
+from app.utils.constants import MONTHS
+
+class TestPreviewWorkbook:
+    @pytest.fixture
+    def workbook(self, tmp_path):
+        path = str(tmp_path / 'upload.xlsx')
+        baseline = pd.DataFrame(
+            [[2000 + i] + [float(i)] * 12 for i in range(2000)],
+            columns=['Year'] + MONTHS
+        )
+        baseline.loc[1, 'Feb'] = None
+        with pd.ExcelWriter(path) as writer:
+            baseline.to_excel(writer, sheet_name='Baseline', index=False)
+            pd.DataFrame({'Trend': [1.1] * 12}).to_excel(writer, sheet_name='Weights', index=False)
+        return path
+
+    def test_streams_head_and_dimension_count(self, workbook):
+        sheets = ExcelHandler().preview_workbook(workbook, rows=3)
+        assert list(sheets) == ['Baseline', 'Weights']
+        baseline = sheets['Baseline']
+        assert baseline['columns'] == ['Year'] + MONTHS
+        assert baseline['row_count'] == 2000
+        assert baseline['dimensions'] == 'A1:M2001'
+        assert len(baseline['preview']) == 3
+        assert baseline['preview'][1]['Year'] == 2001.0
+        assert baseline['preview'][1]['Feb'] is None
+        assert sheets['Weights']['row_count'] == 12
+
+class TestImportSheets:
+    @pytest.fixture
+    def workbook(self, tmp_path):
+        path = str(tmp_path / 'upload.xlsx')
+        baseline = pd.DataFrame(
+            [[2026] + ['5', None] + [1.0] * 10, [None] * 13, [2025.0] + [2.0] * 12],
+            columns=[' year ', 'jan'] + MONTHS[1:]
+        )
+        with pd.ExcelWriter(path) as writer:
+            baseline.to_excel(writer, sheet_name='Baseline', index=False)
+            baseline.to_excel(writer, sheet_name='Actuals', index=False)
+            pd.DataFrame({'Trend': [1.1] * 12}).to_excel(writer, sheet_name='Weights', index=False)
+        return path
+
+    @pytest.fixture
+    def handler(self, tmp_path):
+        handler = ExcelHandler()
+        handler.data_dir = str(tmp_path / 'data')
+        os.makedirs(handler.data_dir)
+        return handler
+
+    def test_normalizes_and_writes_all(self, handler, workbook):
+        result = handler.parse_unified_excel(workbook, 'HP')
+        assert result['success']
+        assert [s['outputs'][0] for s in result['sheets']] == ['HP_post_processed.csv', 'HP_actual.csv', 'HP_weights.csv']
+        df = pd.read_csv(os.path.join(handler.data_dir, 'HP_post_processed.csv'))
+        assert df.columns.tolist() == ['Year'] + MONTHS
+        assert df['Year'].tolist() == [2025, 2026]
+        assert df.iloc[1, 1:3].tolist() == [5.0, 0.0]
+
+    def test_sheets_match_like_uploads(self, handler, tmp_path):
+        path = str(tmp_path / 'lower.xlsx')
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame([[2025] + [1.0] * 12], columns=['Year'] + MONTHS).to_excel(writer, sheet_name='baseline', index=False)
+            pd.DataFrame({'Trend': [1.1] * 12}).to_excel(writer, sheet_name='WEIGHTS', index=False)
+        result = handler.parse_unified_excel(path, 'HP')
+        assert result['success'], result['errors']
+        assert [s['outputs'][0] for s in result['sheets']] == ['HP_post_processed.csv', 'HP_weights.csv']
+
+    def test_parallel_commit_is_all_or_nothing(self, handler, workbook):
+        from concurrent.futures import ProcessPoolExecutor
+        out = lambda name: os.path.join(handler.data_dir, name)
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            reports = handler.import_sheets([(workbook, 'Baseline', 'yearly', out('a.csv')), (workbook, 'Weights', 'weights', out('b.csv'))], pool)
+            assert [r['rows'] for r in reports] == [2, 12]
+            with pytest.raises(ValueError):
+                handler.import_sheets([(workbook, 'Baseline', 'yearly', out('c.csv')), (workbook, 'Missing', 'yearly', out('d.csv'))], pool)
+        assert sorted(f for f in os.listdir(handler.data_dir) if f.endswith('.csv')) == ['a.csv', 'b.csv']
+
+
+class TestCanonicalSchema:
+    def test_schema_errors(self):
+        from app.services.excel_handler import canonical_yearly, SchemaError
+        with pytest.raises(SchemaError, match='missing columns: Mar'):
+            canonical_yearly(pd.DataFrame(columns=['Year', 'Jan', 'Feb']))
+        df = pd.DataFrame([[2025] + [1.0] * 12, ['x'] + [1.0] * 12, [2025] + ['n/a'] + [1.0] * 11], columns=['Year'] + MONTHS)
+        with pytest.raises(SchemaError) as err:
+            canonical_yearly(df)
+        assert "row 3: invalid Year ('x')" in str(err.value)
+        assert "row 4, Jan: not a number ('n/a')" in str(err.value)
+        assert 'duplicate years: 2025' in str(err.value)
+
+    def test_canonical_read_matches_legacy(self, tmp_path):
+        handler = ExcelHandler()
+        weekly = pd.DataFrame([[2026] + [1.0] * 52 + [9.0]], columns=['Year'] + [f"W{w:02d}" for w in range(1, 54)])
+        weekly.to_csv(tmp_path / 'weekly.csv', index=False)
+        assert len(handler.read_yearly_data(str(tmp_path / 'weekly.csv'))[2026]) == 53
+        legacy = tmp_path / 'FN_market_share.csv'
+        legacy.write_text('\ufeffYear,Jan,Feb,Mar,Apr,May,Jun,Jul,Aug,Sep,Oct,Nov,Dec,,\n2025,1,2,3,4,5,6,7,8,9,10,11,,,\n')
+        expected = handler.read_yearly_data(str(legacy))
+        assert handler.normalize_data_dir(str(tmp_path)) == ['FN_market_share.csv']
+        assert legacy.read_text().splitlines()[0] == 'Year,' + ','.join(MONTHS)
+        assert handler.read_yearly_data(str(legacy)) == expected
+
+class TestTemplateWorkbook:
+    def test_built_in_memory_and_cached(self, tmp_path):
+        handler = ExcelHandler()
+        handler.data_dir = str(tmp_path)
+        data = handler.generate_template_excel('HP', True)
+        assert handler.generate_template_excel('HP', True) is data
+        assert os.listdir(tmp_path) == []
+
+        path = tmp_path / 'HP.xlsx'
+        path.write_bytes(data)
+        assert handler.sheet_names(str(path)) == ['Baseline', 'Actuals', 'Delivered', 'Weights', 'MarketShare', 'Metadata']
+        assert pd.read_excel(path, sheet_name='Weights').shape == (12, 10)
+        metadata = pd.read_excel(path, sheet_name='Metadata').set_index('Property')['Value']
+        assert metadata['Product'] == 'HP' and metadata['APS Classes']
+        # Cached bytes carry no per-download values such as a creation time
+        assert list(metadata.index) == ['Product', 'APS Classes']
+
+    def test_template_download(self, client, auth_headers):
+        response = client.get('/api/admin/template?product=hp', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.mimetype.endswith('spreadsheetml.sheet')
+        assert response.data[:2] == b'PK'
+
+    def test_data_template_keeps_its_json_response(self, app, client, auth_headers):
+        response = client.get('/api/data/template/HP', headers=auth_headers)
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['success'] and body['message'] == 'Template generated for HP'
+        assert body['template_path'].startswith(app.config['RUNTIME_DIR'])
+        assert ExcelHandler().sheet_names(body['template_path'])[0] == 'Baseline'
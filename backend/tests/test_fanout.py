@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.fanout import FanoutService
+from app.services.simulation import SimulationEngine
+
+class TestFanoutService:
+    @pytest.fixture
+    def store(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'AH_post_processed.csv', {2025: [100.0] * 12})
+        write_yearly(tmp_path / 'AH_ACNF_post_processed.csv', {2025: [40.0] * 12})
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2025: [200.0] * 12, 2026: [210.0] * 12})
+        (tmp_path / 'AH_weights.csv').write_text('Shortage\n' + '\n'.join(['0.8'] * 12) + '\n')
+        (tmp_path / 'CN_weights.csv').write_text('Shortage\n' + '\n'.join(['0.9'] * 12) + '\n')
+        return store
+
+    def test_rows_use_own_weights(self, store):
+        service = FanoutService(store=store)
+        result = service.simulate({'shortage_settings': {'month': 'Mar', 'pct': 0}}, 2025)
+        rows = {(r['product'], r['aps_class']): r for r in result['rows']}
+        assert set(rows) == {('AH', None), ('AH', 'ACNF'), ('CN', None)}
+        assert rows[('AH', None)]['simulated'][2] == pytest.approx(80.0)
+        assert rows[('AH', 'ACNF')]['simulated'][2] == pytest.approx(32.0)
+        assert rows[('CN', None)]['simulated'][2] == pytest.approx(180.0)
+
+    def test_portfolio_sums_product_rows(self, store):
+        service = FanoutService(store=store)
+        result = service.simulate({'shortage_settings': {'month': 'Mar', 'pct': 0}}, 2025)
+        assert result['portfolio']['baseline_total'] == pytest.approx(12 * 300.0)
+        assert result['portfolio']['simulated'][2] == pytest.approx(260.0)
+
+    def test_matches_single_simulation(self, store):
+        spec = {'promo_settings': {'month': 'Apr', 'pct': 15}, 'toggle_settings': {'trend': True}}
+        result = FanoutService(store=store).simulate(spec, 2026)
+        single = SimulationEngine().compute_simulation(
+            baseline_vals=[210.0] * 12,
+            weights=store.product('CN').weights,
+            ms_settings={},
+            promo_settings=spec['promo_settings'],
+            shortage_settings={},
+            regulation_settings={},
+            custom_settings={},
+            toggle_settings=spec['toggle_settings'],
+            locked_events={}
+        )
+        assert result['rows'][0]['simulated'] == single['simulated']
+        assert {'product': 'AH', 'aps_class': None} in result['missing']
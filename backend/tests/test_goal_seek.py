@@ -0,0 +1,55 @@
+import pytest
+import sys
+import os
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.goal_seek import GoalSeekService
+
+class TestGoalSeekService:
+    @pytest.fixture
+    def service(self):
+        return GoalSeekService()
+
+    @pytest.fixture
+    def scenario(self):
+        return {
+            'baseline_vals': [1000, 1100, 1200, 1150, 1300, 1400, 1350, 1250, 1200, 1100, 1050, 1000],
+            'weights': {'UpromoUp': [1.15] * 12, 'UPromoDwn': [0.92] * 12},
+            'ms_settings': {'mode': 'relative', 'adjustments': {}},
+            'promo_settings': {'month': 'May', 'pct': 0},
+            'shortage_settings': {'month': None},
+            'regulation_settings': {'month': None},
+            'custom_settings': {'month': None},
+            'toggle_settings': {},
+            'locked_events': {},
+        }
+
+    def test_promo_pct_hits_month_target(self, service, scenario):
+        result = service.solve(scenario, 'promo_pct', target=1600, target_month='May')
+        assert result['achievable'] is True
+        assert result['achieved'] == pytest.approx(1600, abs=0.5)
+        assert result['value'] == pytest.approx((1600 / 1300 / 1.15 - 1) * 100, abs=0.01)
+
+    def test_ms_delta_hits_annual_target(self, service, scenario):
+        scenario['promo_settings'] = {'month': None}
+        total = sum(scenario['baseline_vals'])
+        result = service.solve(scenario, 'ms_delta', target=total * 1.05)
+        assert result['value'] == pytest.approx(5.0, abs=1e-3)
+
+    def test_unreachable_target_reports_closest(self, service, scenario):
+        scenario['promo_settings'] = {'month': 'Jun', 'pct': 0}
+        result = service.solve(scenario, 'promo_pct', target=5000, target_month='Jun')
+        assert result['achievable'] is False
+        assert result['achieved'] == pytest.approx(1400 * 1.06)
+
+    def test_goal_seek_endpoint(self, client, auth_headers, scenario):
+        response = client.post('/api/forecast/goal-seek', headers=auth_headers, json={
+            'baseline_vals': scenario['baseline_vals'],
+            'weights': scenario['weights'],
+            'promo_settings': {'month': 'May', 'pct': 0},
+            'goal': {'variable': 'promo_pct', 'target': 1600, 'target_month': 'May'}
+        })
+        assert response.status_code == 200
+        assert response.get_json()['achieved'] == pytest.approx(1600, abs=0.5)
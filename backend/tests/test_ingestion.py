@@ -0,0 +1,163 @@
+import pytest
+import sys
+import os
+import zipfile
+import pandas as pd
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.excel_handler import ExcelHandler
+from app.services.data_store import DataStore
+from app.services.aggregates import AggregateService
+from app.services.ingestion import IngestionService
+from app.utils.constants import MONTHS
+
+def write_workbook(path, sheets):
+    with pd.ExcelWriter(path) as writer:
+        for name, df in sheets.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+
+class TestIngestionService:
+    @pytest.fixture
+    def workbook(self, tmp_path):
+        path = str(tmp_path / 'upload.xlsx')
+        baseline = pd.DataFrame([[2025] + [100.0] * 12], columns=['Year'] + MONTHS)
+        write_workbook(path, {
+            'Baseline': baseline,
+            'Actuals': baseline,
+            'Weights': pd.DataFrame({'Trend': [1.0] * 12})
+        })
+        return path
+
+    def make_service(self, tmp_path, parse_processes):
+        data_dir = tmp_path / 'data'
+        data_dir.mkdir()
+        handler = ExcelHandler()
+        handler.data_dir = str(data_dir)
+        return IngestionService(
+            handler=handler,
+            aggregates=AggregateService(store=DataStore(handler)),
+            jobs_dir=str(tmp_path / 'jobs'),
+            parse_processes=parse_processes
+        )
+
+    def test_job_writes_outputs_and_timings(self, tmp_path, workbook):
+        service = self.make_service(tmp_path, 0)
+        job = service.submit(workbook, 'HP')
+        assert job['status'] == 'queued'
+        job = service.wait(job['id'], timeout=30)
+        assert job['status'] == 'done'
+        assert job['progress'] == {'done': 3, 'total': 3}
+        assert [s['outputs'][0] for s in job['sheets']] == ['HP_post_processed.csv', 'HP_weights.csv', 'HP_actual.csv']
+        assert all(s['parse_seconds'] >= 0 and s['rows'] for s in job['sheets'])
+        assert os.path.exists(os.path.join(service.handler.data_dir, 'HP_actual.csv'))
+        assert not os.path.exists(tmp_path / 'jobs' / f"{job['id']}.xlsx")
+
+    def test_missing_baseline_fails_job(self, tmp_path):
+        path = str(tmp_path / 'bad.xlsx')
+        write_workbook(path, {'Other': pd.DataFrame({'a': [1]})})
+        service = self.make_service(tmp_path, 0)
+        job = service.wait(service.submit(path, 'HP')['id'], timeout=30)
+        assert job['status'] == 'failed'
+        assert 'Baseline sheet not found' in job['message']
+        assert service.get('../etc') is None
+
+    def test_failed_refresh_keeps_published_job_done(self, tmp_path, workbook):
+        service = self.make_service(tmp_path, 0)
+        def refresh():
+            raise RuntimeError('aggregates unavailable')
+        service.aggregates.refresh = refresh
+        job = service.wait(service.submit(workbook, 'HP')['id'], timeout=30)
+        assert job['status'] == 'done'
+        assert job['version'] == service.handler.versions.current()
+        assert job['warnings'] == ['Report aggregates not refreshed: aggregates unavailable']
+
+    def test_job_of_exited_worker_reported_failed(self, tmp_path, workbook):
+        service = self.make_service(tmp_path, 0)
+        job = service.wait(service.submit(workbook, 'HP')['id'], timeout=30)
+        job['status'] = 'running'
+        service._save(job)
+        assert service.get(job['id'])['status'] == 'running'
+        path = service._job_path(job['id'])
+        stale = os.path.getmtime(path) - service.STALE_SECONDS - 1
+        os.utime(path, (stale, stale))
+        job = service.get(job['id'])
+        assert job['status'] == 'failed' and 'exited' in job['message']
+        assert service.get(job['id'])['status'] == 'failed'
+
+    def test_parse_in_parser_process(self, tmp_path, workbook):
+        service = self.make_service(tmp_path, 1)
+        job = service.wait(service.submit(workbook, 'HP', 'HP_1PH')['id'], timeout=60)
+        assert job['status'] == 'done'
+        assert [s['outputs'][0] for s in job['sheets']] == ['HP_HP_1PH_post_processed.csv', 'HP_HP_1PH_actual.csv']
+
+    def test_bulk_workbook_routes_by_column_and_prefix(self, tmp_path):
+        path = str(tmp_path / 'portfolio.xlsx')
+        rows = [['HP', None, 2025] + [10.0] * 12, ['HP', 'HP 1PH', 2025] + [4.0] * 12, ['cn', None, 2025] + [7.0] * 12]
+        write_workbook(path, {
+            'Baseline': pd.DataFrame(rows, columns=['Product', 'APS Class', 'Year'] + MONTHS),
+            'Weights': pd.DataFrame({'Product': ['HP'] * 12 + ['CN'] * 12, 'Trend': [1.1] * 24}),
+            'FN.Baseline': pd.DataFrame([[2025] + [3.0] * 12], columns=['Year'] + MONTHS),
+            'Notes': pd.DataFrame({'a': [1]})
+        })
+        service = self.make_service(tmp_path, 0)
+        job = service.wait(service.submit_bulk(path)['id'], timeout=30)
+        assert job['status'] == 'done', job['message']
+        assert job['files_created'] == [
+            'CN_post_processed.csv', 'CN_weights.csv', 'FN_post_processed.csv',
+            'HP_HP_1PH_post_processed.csv', 'HP_post_processed.csv', 'HP_weights.csv'
+        ]
+        assert sorted(job['products']) == ['CN', 'FN', 'HP']
+        assert "portfolio.xlsx: sheet 'Notes' ignored" in job['warnings']
+        df = pd.read_csv(os.path.join(service.handler.data_dir, 'HP_HP_1PH_post_processed.csv'))
+        assert df.columns.tolist() == ['Year'] + MONTHS and df['Jan'].tolist() == [4.0]
+
+    def test_bulk_zip_uses_member_names(self, tmp_path, workbook):
+        archive = str(tmp_path / 'refresh.zip')
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.write(workbook, 'march/HP.xlsx')
+            zf.write(workbook, 'march/CN_CN_1PH.xlsx')
+        service = self.make_service(tmp_path, 1)
+        job = service.wait(service.submit_bulk(archive)['id'], timeout=60)
+        assert job['status'] == 'done', job['message']
+        assert job['files_created'] == [
+            'CN_CN_1PH_actual.csv', 'CN_CN_1PH_post_processed.csv',
+            'HP_actual.csv', 'HP_post_processed.csv', 'HP_weights.csv'
+        ]
+        assert any('Weights is product-level only' in w for w in job['warnings'])
+        assert job['progress'] == {'done': 5, 'total': 5}
+
+    def test_bulk_conflicting_sheets_commit_nothing(self, tmp_path):
+        path = str(tmp_path / 'bad.xlsx')
+        baseline = pd.DataFrame([[2025] + [1.0] * 12], columns=['Year'] + MONTHS)
+        write_workbook(path, {'HP.Baseline': baseline, 'HP.baseline ': baseline})
+        service = self.make_service(tmp_path, 0)
+        job = service.wait(service.submit_bulk(path)['id'], timeout=30)
+        assert job['status'] == 'failed'
+        assert service.handler.versions.current() is None
+        assert os.listdir(os.path.join(service.handler.data_dir, 'versions')) == []
+
+    def test_reupload_writes_only_changed_sheets(self, tmp_path, workbook):
+        service = self.make_service(tmp_path, 0)
+        store = service.aggregates.store
+        service.wait(service.submit(workbook, 'HP')['id'], timeout=30)
+        store.portfolio()
+        baseline_mtime = os.stat(os.path.join(service.handler.data_dir, 'HP_post_processed.csv')).st_mtime_ns
+
+        changed = str(tmp_path / 'changed.xlsx')
+        baseline = pd.read_excel(workbook, sheet_name='Baseline')
+        actuals = baseline.assign(Jan=250.0)
+        write_workbook(changed, {
+            'Baseline': baseline,
+            'Actuals': actuals,
+            'Weights': pd.read_excel(workbook, sheet_name='Weights')
+        })
+        job = service.wait(service.submit(changed, 'HP')['id'], timeout=30)
+        assert job['status'] == 'done'
+        assert job['unchanged'] == ['HP_post_processed.csv', 'HP_weights.csv']
+        assert [s['written'] for s in job['sheets']] == [[], [], ['HP_actual.csv']]
+        assert os.stat(os.path.join(service.handler.data_dir, 'HP_post_processed.csv')).st_mtime_ns == baseline_mtime
+
+        assert store.product('HP').actual[2025][0] == 250.0
+        assert store.load_stats['read'] == 1
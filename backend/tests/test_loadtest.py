@@ -0,0 +1,55 @@
+import pytest
+import sys
+import os
+import threading
+from types import SimpleNamespace
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from werkzeug.serving import make_server
+from app.services.excel_handler import excel_handler
+from app.utils.versions import DatasetVersions
+from benchmarks import synthetic
+from benchmarks.loadtest import Planner, Recorder, percentile
+
+class TestRecorder:
+    def test_percentiles_are_nearest_rank(self):
+        samples = [i / 1000 for i in range(1, 101)]
+        assert percentile(samples, 50) == 50.0
+        assert percentile(samples, 95) == 95.0
+        assert percentile(samples, 99) == 99.0
+        assert percentile([0.004], 99) == 4.0
+        assert percentile([], 50) is None
+
+    def test_report_per_endpoint(self):
+        recorder = Recorder()
+        recorder.add('GET /a', 0.010, True)
+        recorder.add('GET /a', 0.030, False)
+        recorder.add('POST /b', 0.020, True)
+        report = recorder.report(elapsed=2.0)
+        assert report['requests'] == 3 and report['errors'] == 1 and report['rps'] == 1.5
+        assert report['endpoints']['GET /a'] == {
+            'requests': 2, 'errors': 1, 'rps': 1.0, 'p50_ms': 10.0, 'p95_ms': 30.0, 'p99_ms': 30.0
+        }
+
+class TestPlannerSession:
+    def test_sessions_against_the_app(self, app, tmp_path, monkeypatch):
+        # The services are rooted at their own data dir, not app.config's
+        monkeypatch.setattr(excel_handler, 'versions', DatasetVersions(str(tmp_path)))
+        mapping = synthetic.generate_portfolio(str(tmp_path), products=2, aps=1, years=3)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            args = SimpleNamespace(username='admin', password='admin123', simulations=6, think=0)
+            recorder = Recorder()
+            planner = Planner(f'http://127.0.0.1:{server.server_port}', recorder, args, seed=1)
+            with synthetic.registered(mapping):
+                assert planner.session() and planner.session()
+        finally:
+            server.shutdown()
+        report = recorder.report(elapsed=1.0)
+        assert report['errors'] == 0
+        assert report['endpoints']['POST /api/forecast/simulate']['requests'] == 12
+        assert report['endpoints']['POST /api/forecast/export']['requests'] == 2
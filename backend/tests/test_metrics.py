@@ -0,0 +1,66 @@
+import pytest
+import sys
+import os
+import json
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.metrics import MetricsRegistry, LATENCY_BUCKETS
+
+class TestMetricsRegistry:
+    def test_text_exposition(self):
+        registry = MetricsRegistry()
+        registry.observe_request('forecast', '/api/forecast/simulate', 'POST', 200, 0.03, 512, 2048)
+        registry.observe_request('forecast', '/api/forecast/simulate', 'POST', 200, 0.2, 512, 2048)
+        registry.cache('dataset', True)
+        registry.cache('dataset', False)
+        registry.cache('dataset', True)
+        text = registry.render()
+
+        assert '# TYPE http_requests_total counter' in text
+        assert 'http_requests_total{blueprint="forecast",route="/api/forecast/simulate",method="POST",status="200"} 2' in text
+        labels = 'blueprint="forecast",route="/api/forecast/simulate"'
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.025"}} 0' in text
+        assert f'http_request_duration_seconds_bucket{{{labels},le="0.05"}} 1' in text
+        assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f'http_request_duration_seconds_count{{{labels}}} 2' in text
+        assert 'cache_hit_ratio{cache="dataset"} 0.666' in text
+
+    def test_sums_worker_files(self, tmp_path):
+        registry = MetricsRegistry(str(tmp_path))
+        registry.inc('simulations_total', (('path', 'batch'),), 3)
+        other = MetricsRegistry()
+        other.inc('simulations_total', (('path', 'batch'),), 4)
+        other.observe('http_request_duration_seconds', (('blueprint', ''), ('route', '/api')), 0.001, LATENCY_BUCKETS)
+        (tmp_path / '99999.json').write_text(json.dumps(other.snapshot()))
+
+        text = registry.render()
+        assert 'simulations_total{path="batch"} 7' in text
+        assert 'http_request_duration_seconds_count{blueprint="",route="/api"} 1' in text
+        assert len(list(tmp_path.glob(f"{os.getpid()}-*.json"))) == 1
+
+    def test_new_file_per_process(self, tmp_path):
+        registry = MetricsRegistry(str(tmp_path))
+        registry.inc('simulations_total', (('path', 'batch'),), 2)
+        registry.flush()
+        # A later worker that reuses the pid must not overwrite the old file
+        fresh = MetricsRegistry(str(tmp_path))
+        fresh.inc('simulations_total', (('path', 'batch'),), 1)
+        fresh.flush()
+        assert len(list(tmp_path.glob(f"{os.getpid()}-*.json"))) == 2
+        assert 'simulations_total{path="batch"} 3' in fresh.render()
+
+class TestMetricsEndpoint:
+    def test_scrape(self, client, auth_headers):
+        client.get('/api/health')
+        response = client.get('/api/metrics', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert 'http_requests_total{blueprint="",route="/api/health",method="GET",status="200"}' in response.get_data(as_text=True)
+
+    def test_scrape_needs_admin_or_token(self, app, client, auth_headers):
+        assert client.get('/api/metrics').status_code == 401
+        app.config['METRICS_TOKEN'] = 'scrape-secret'
+        assert client.get('/api/metrics', headers=auth_headers).status_code == 401
+        assert client.get('/api/metrics', headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
@@ -0,0 +1,117 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.simulation import SimulationEngine
+from app.services.market_share import MarketShareService
+from app.services.excel_handler import ExcelHandler
+from app.utils.constants import MONTHS
+from app.utils.periods import WEEKS, iso_weeks, period_labels, period_months, periods_between
+
+class TestWeeklyPeriods:
+    @pytest.fixture
+    def engine(self):
+        return SimulationEngine()
+
+    @pytest.fixture
+    def weekly_baseline(self):
+        return [100.0 + w for w in range(52)]
+
+    def _scenario(self, baseline, weights, **overrides):
+        scenario = dict(
+            baseline_vals=baseline,
+            weights=weights,
+            ms_settings={},
+            promo_settings={'month': None},
+            shortage_settings={'month': None},
+            regulation_settings={'month': None},
+            custom_settings={'month': None},
+            toggle_settings={'trend': True, 'trans': True},
+            locked_events={},
+            year=2025
+        )
+        scenario.update(overrides)
+        return scenario
+
+    def test_labels_and_months(self):
+        assert period_labels(12) == MONTHS
+        assert period_labels(53)[-1] == 'W53'
+        assert iso_weeks(2026) == 53 and iso_weeks(2025) == 52
+        months = period_months(52, 2025)
+        assert months[0] == 1 and months[-1] == 12
+        assert list(period_months(12)) == list(range(1, 13))
+
+    def test_monthly_weights_map_to_weeks(self, engine, weekly_baseline):
+        weights = {'Trend': [1.0] * 8 + [1.2] * 4, 'Trans': [0.9] * 12}
+        result = engine.compute_simulation(**self._scenario(weekly_baseline, weights))
+        assert len(result['simulated']) == 52
+        assert set(result['final_multipliers']) == set(WEEKS[:52])
+        # Sep-Dec weeks get Trend 1.2 and Trans 0.9, earlier weeks neither
+        months = period_months(52, 2025)
+        expected = np.where(months >= 9, 1.2 * 0.9, 1.0)
+        assert np.allclose([result['final_multipliers'][w] for w in WEEKS[:52]], expected)
+
+    def test_weekly_promo_and_batch_match(self, engine, weekly_baseline):
+        weights = {'UpromoUp': [1.1] * 52, 'UPromoDwn': [0.95] * 52, 'Trend': [1.01] * 52}
+        scenario = self._scenario(
+            weekly_baseline, weights,
+            promo_settings={'month': 'W20', 'pct': 10, 'spill_enabled': True, 'spill_pct': 10},
+            locked_events={'Promo': [{'month': 'W30', 'multiplier': 1.05}]}
+        )
+        single = engine.compute_simulation(**scenario)
+        details = single['applied_details']
+        assert any(name == 'UpromoUp' for name, _ in details['W20'])
+        assert any(name == 'UPromoDwn' for name, _ in details['W21'])
+        # March reduction lands on every March week
+        march_weeks = [WEEKS[p] for p in np.flatnonzero(period_months(52, 2025) == 3)]
+        assert all(any(n == 'Promo_March_Reduction' for n, _ in details[w]) for w in march_weeks)
+
+        batch = engine.simulate_batch(
+            scenario['baseline_vals'], weights, None, scenario['promo_settings'],
+            toggle_settings=scenario['toggle_settings'], locked_events=scenario['locked_events'],
+            year=2025
+        )
+        assert batch['simulated'][0].tolist() == [float(v) for v in single['simulated']]
+
+    def test_market_share_weekly(self):
+        service = MarketShareService()
+        adjustments = service.calculate_adjustments('relative', {'delta': 5}, periods=52)
+        assert len(adjustments) == 52 and adjustments['W52'] == pytest.approx(1.05)
+        single = service.calculate_competitive_intelligence(
+            {'type': 'single', 'month': 'W10', 'impact': -10, 'duration': 3}, periods=52
+        )
+        assert [single[w] for w in ('W09', 'W10', 'W12', 'W13')] == [1.0, 0.9, 0.9, 1.0]
+
+    def test_read_weekly_csv(self, tmp_path):
+        path = tmp_path / 'XX_post_processed.csv'
+        rows = ['Year,' + ','.join(WEEKS)]
+        rows.append('2025,' + ','.join(['10'] * 52 + ['']))
+        rows.append('2026,' + ','.join(['20'] * 53))
+        path.write_text('\n'.join(rows) + '\n')
+        data = ExcelHandler().read_yearly_data(str(path))
+        assert len(data[2025]) == 52 and len(data[2026]) == 53
+        assert data[2026][-1] == 20.0
+
+    def test_periods_between_casts_years(self):
+        assert periods_between(2024, '2026', 53) == periods_between('2024', 2026, 52) == 52 + 52
+        assert periods_between('2027', 2026, 52) == -53
+        assert periods_between('2025', '2026', 12) == 12
+
+    def test_weekly_weight_tables_per_year(self, engine, store, tmp_path):
+        rows = ['Year,' + ','.join(WEEKS), '2025,' + ','.join(['100'] * 52 + ['']), '2026,' + ','.join(['100'] * 53)]
+        (tmp_path / 'CN_post_processed.csv').write_text('\n'.join(rows) + '\n')
+        # Monthly columns on a weekly product: the month of a week depends on the year
+        (tmp_path / 'CN_weights.csv').write_text('Trend,Trans\n' + ''.join(f"1.0{m:02d},1.2\n" for m in range(1, 13)))
+        data = store.product('CN')
+        for year in (2025, 2026):
+            baseline = data.baseline[year].tolist()
+            single = engine.compute_simulation(**self._scenario(baseline, data.weights, year=year))
+            batch = engine.simulate_batch(
+                baseline, data.weights_for(year), toggle_settings={'trend': True, 'trans': True}, year=year
+            )
+            assert batch['simulated'][0].tolist() == pytest.approx(single['simulated'])
+        assert data.weights_for(2025)['trend'][1].shape[-1] == 52
@@ -0,0 +1,57 @@
+import pytest
+import sys
+import os
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.services.promo_optimizer import PromoOptimizer
+from app.services.simulation import SimulationEngine
+from app.utils.constants import MONTHS
+
+class TestPromoOptimizer:
+    @pytest.fixture
+    def optimizer(self):
+        return PromoOptimizer()
+
+    @pytest.fixture
+    def scenario(self):
+        return {
+            'baseline_vals': [1000, 1100, 1200, 1150, 1300, 1400, 1350, 1250, 1200, 1100, 1050, 1000],
+            'weights': {
+                'UpromoUp': [1.15] * 12, 'UPromoDwn': [0.92] * 12,
+                'DPromoUp': [1.10] * 12, 'DPromoDwn': [0.95] * 12,
+            },
+            'ms_settings': {'adjustments': {}},
+            'promo_settings': {'month': None, 'spill_pct': 20},
+            'shortage_settings': {'month': None},
+            'regulation_settings': {'month': None},
+            'custom_settings': {'month': None},
+            'toggle_settings': {},
+            'locked_events': {},
+        }
+
+    def test_single_promo_matches_exhaustive_search(self, optimizer, scenario):
+        engine = SimulationEngine()
+
+        def total(month):
+            run = dict(scenario, promo_settings={'month': month, 'pct': 20, 'spill_pct': 20})
+            return sum(engine.compute_simulation(**run)['simulated'])
+
+        best = max(MONTHS, key=total)
+        result = optimizer.optimize(scenario, [20], no_adjacent=False)
+        assert result['calendars'][0]['months'] == [best]
+        assert result['calendars'][0]['annual_total'] == pytest.approx(total(best))
+
+    def test_constraints_respected(self, optimizer, scenario):
+        result = optimizer.optimize(scenario, [20, 10, 10], max_per_quarter=1, no_adjacent=True)
+        assert result['feasible'] is True
+        for calendar in result['calendars']:
+            idx = [MONTHS.index(m) for m in calendar['months']]
+            assert all(b - a >= 2 for a, b in zip(idx, idx[1:]))
+            assert len({i // 3 for i in idx}) == len(idx)
+
+    def test_infeasible_calendar(self, optimizer, scenario):
+        result = optimizer.optimize(scenario, [10] * 7, no_adjacent=True)
+        assert result['feasible'] is False
+        assert result['calendars'] == []
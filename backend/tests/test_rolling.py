@@ -0,0 +1,60 @@
+import pytest
+
+from app.services.rolling import RollingForecastService
+from app.services.fanout import FanoutService
+from app.services.simulation import SimulationEngine
+
+class TestRollingForecast:
+    @pytest.fixture
+    def store(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2025: [100.0] * 12})
+        write_yearly(tmp_path / 'CN_actual.csv', {2025: [90.0] * 10 + [0, 0]})
+        (tmp_path / 'CN_weights.csv').write_text('Trend\n' + '\n'.join(['1.1'] * 12) + '\n')
+        return store
+
+    def test_blend(self):
+        service = RollingForecastService()
+        blended, closed = service.blend([100.0] * 12, [90.0, 95.0, 0.0] + [80.0] * 9)
+        assert closed == 2
+        assert blended == [90.0, 95.0] + [100.0] * 10
+        assert service.blend([100.0] * 12, None) == ([100.0] * 12, 0)
+
+    def test_precomputed_per_version(self, store):
+        service = RollingForecastService(store=store)
+        product = service.product('CN')
+        assert product.baseline.closed_for(2025) == 10
+        assert product.baseline[2025][9:].tolist() == [90.0, 100.0, 100.0]
+        assert service.portfolio() is service.portfolio()
+
+    def test_closed_months_keep_actuals(self):
+        engine = SimulationEngine()
+        kwargs = dict(
+            baseline_vals=[90.0] * 10 + [100.0, 100.0],
+            weights={'Trend': [1.1] * 12},
+            ms_settings={},
+            promo_settings={'month': None},
+            shortage_settings={'month': None},
+            regulation_settings={'month': None},
+            custom_settings={'month': None},
+            toggle_settings={'trend': True},
+            locked_events={},
+            closed_months=10
+        )
+        single = engine.compute_simulation(**kwargs)
+        assert single['simulated'][:10] == [90.0] * 10
+        assert single['simulated'][10] == pytest.approx(110.0)
+        assert single['applied_details']['Jan'] == []
+        batch = engine.simulate_batch(
+            kwargs['baseline_vals'], kwargs['weights'],
+            toggle_settings=kwargs['toggle_settings'], closed_months=[10, 0]
+        )
+        assert batch['simulated'][0].tolist() == single['simulated']
+        assert batch['simulated'][1][0] == pytest.approx(99.0)
+
+    def test_fanout_rolling(self, store):
+        service = FanoutService(store=store, rolling=RollingForecastService(store=store))
+        result = service.simulate({'toggle_settings': {'trend': True}}, 2025, rolling=True)
+        row = result['rows'][0]
+        assert row['closed_months'] == 10
+        assert row['simulated'][0] == 90.0
+        assert row['simulated'][11] == pytest.approx(110.0)
@@ -0,0 +1,40 @@
+import pytest
+
+from app.services.rollup import RollupService
+
+class TestRollupService:
+    @pytest.fixture
+    def service(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'HP_post_processed.csv', {2025: [100.0] * 12})
+        write_yearly(tmp_path / 'HP_HP_1PH_post_processed.csv', {2025: [60.0] * 12})
+        write_yearly(tmp_path / 'HP_HP_3PH_post_processed.csv', {2025: [30.0] * 12, 2026: [35.0] * 12})
+        (tmp_path / 'HP_weights.csv').write_text('Trend\n' + '\n'.join(['1.1'] * 12) + '\n')
+        return RollupService(store=store)
+
+    def test_stacked_at_load(self, service):
+        stacked = service.store.product('HP').stacked
+        assert stacked['aps'] == ['HP_1PH', 'HP_3PH']
+        assert stacked['values'].shape == (2, 2, 12)
+
+    def test_rollup_and_reconciliation(self, service):
+        result = service.rollup('HP', {'toggle_settings': {'trend': True}}, 2025)
+        assert [a['aps_class'] for a in result['aps']] == ['HP_1PH', 'HP_3PH']
+        assert result['rollup']['simulated'][0] == pytest.approx(99.0)
+        assert result['product_total']['simulated'][0] == pytest.approx(110.0)
+        assert result['reconciliation']['baseline']['total'] == pytest.approx(120.0)
+        assert result['reconciliation']['baseline']['gap_pct'] == pytest.approx(10.0)
+
+    def test_missing_aps_and_unknown_product(self, service):
+        result = service.rollup('HP', {}, 2026)
+        assert result['missing_aps'] == ['HP_1PH']
+        assert result['reconciliation'] is None
+        with pytest.raises(ValueError):
+            service.rollup('HP', {}, 2030)
+        assert service.rollup('AH', {}, 2025) is None
+
+class TestRollupRoute:
+    def test_bad_year_is_400_unknown_product_404(self, client, auth_headers):
+        response = client.post('/api/forecast/rollup/ZZ', headers=auth_headers, json={'selected_year': 'next'})
+        assert response.status_code == 400
+        assert response.get_json()['message'] == "selected_year must be a year, got 'next'"
+        assert client.post('/api/forecast/rollup/ZZ', headers=auth_headers, json={}).status_code == 404
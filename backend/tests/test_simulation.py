@@ -33,4 +33,127 @@ class TestSimulationEngine:
 
     def test_apply_slider_mult(self, engine):
         assert engine.apply_slider_mult(1.0, 10) == 1.1
-        assert engine.apply_slider_mult(1.0, -10) == 0.9
\ No newline at end of file
+        assert engine.apply_slider_mult(1.0, -10) == 0.9
+
+    def _run(self, engine, baseline, weights, locked_events, year=None):
+        return engine.compute_simulation(
+            baseline_vals=baseline,
+            weights=weights,
+            ms_settings={},
+            promo_settings={'month': None},
+            shortage_settings={'month': None},
+            regulation_settings={'month': None},
+            custom_settings={'month': None},
+            toggle_settings={},
+            locked_events=locked_events,
+            year=year
+        )
+
+    def test_locked_calendar_matches_event_lists(self, engine, sample_baseline, sample_weights):
+        legacy = self._run(engine, sample_baseline, sample_weights, {
+            'Promo': [{'month': 'Mar', 'multiplier': 1.1}, {'month': 'Mar', 'multiplier': 1.05}],
+            'Shortage': [{'month': 'Jul', 'multiplier': 0.9}],
+        })
+        compact = self._run(engine, sample_baseline, sample_weights, {
+            'calendar': {
+                'month': [2, 2, 6],
+                'category': ['Promo', 'Promo', 'Shortage'],
+                'multiplier': [1.1, 1.05, 0.9],
+            }
+        })
+        assert compact['simulated'] == legacy['simulated']
+        assert compact['applied_details'] == legacy['applied_details']
+        assert ('DampenedUp', compact['final_multipliers']['Mar']) in compact['applied_details']['Mar']
+
+    def test_locked_calendar_selects_year_and_keeps_ids(self, engine, sample_baseline, sample_weights):
+        result = self._run(engine, sample_baseline, sample_weights, {
+            'calendar': {
+                'start_year': 2025,
+                'month': [0, 12, 25],
+                'category': [0, 1, 3],
+                'multiplier': [1.2, 0.8, 1.1],
+                'id': ['jan-25', 'jan-26', 'feb-27'],
+            }
+        }, year=2026)
+        assert result['applied_details']['Jan'] == [('Locked_Shortage:jan-26', 0.8)]
+        assert result['applied_details']['Feb'] == []
+        assert result['simulated'][0] == pytest.approx(sample_baseline[0] * 0.8)
+
+    def test_locked_calendar_rejects_unknown_category(self, engine, sample_baseline, sample_weights):
+        with pytest.raises(ValueError):
+            self._run(engine, sample_baseline, sample_weights, {
+                'calendar': {'month': [0], 'category': ['Holiday'], 'multiplier': [1.1]}
+            })
+
+    def test_locked_calendar_mixes_names_and_indexes(self, engine, sample_baseline, sample_weights):
+        named = self._run(engine, sample_baseline, sample_weights, {
+            'calendar': {'month': [2, 6], 'category': ['Promo', 'Shortage'], 'multiplier': [1.1, 0.9]}
+        })
+        mixed = self._run(engine, sample_baseline, sample_weights, {
+            'calendar': {'month': [2, 6], 'category': ['Promo', 1], 'multiplier': [1.1, 0.9]}
+        })
+        assert mixed['applied_details'] == named['applied_details']
+
+    def test_locked_calendar_rejects_short_ids(self, engine, sample_baseline, sample_weights):
+        with pytest.raises(ValueError):
+            self._run(engine, sample_baseline, sample_weights, {
+                'calendar': {'month': [0, 1], 'category': [0, 0], 'multiplier': [1.1, 1.2], 'id': ['a']}
+            })
+
+    def test_simulate_batch_matches_compute_simulation(self, engine, sample_baseline, sample_weights):
+        pcts = [0, 5, 12.5, 25, 40]
+        toggles = {'trend': True, 'march_madness': True}
+        batch = engine.simulate_batch(
+            sample_baseline,
+            sample_weights,
+            promo_settings={'month': 'Feb', 'pct': pcts, 'spill_pct': 20},
+            toggle_settings=toggles,
+            locked_events={'Promo': [{'month': 'Apr', 'multiplier': 1.1}]}
+        )
+        for row, pct in enumerate(pcts):
+            single = engine.compute_simulation(
+                baseline_vals=sample_baseline,
+                weights=sample_weights,
+                ms_settings={},
+                promo_settings={'month': 'Feb', 'pct': pct, 'spill_pct': 20},
+                shortage_settings={'month': None},
+                regulation_settings={'month': None},
+                custom_settings={'month': None},
+                toggle_settings=toggles,
+                locked_events={'Promo': [{'month': 'Apr', 'multiplier': 1.1}]}
+            )
+            assert batch['simulated'][row].tolist() == single['simulated']
+
+class TestSimulateRoute:
+    def _post(self, client, auth_headers, **payload):
+        return client.post('/api/forecast/simulate', headers=auth_headers, json={
+            'baseline_vals': [100.0] * 12,
+            'weights': {},
+            'ms_mode': 'historical',
+            'selected_year': 2025,
+            **payload
+        })
+
+    def test_market_share_years_arrive_as_json_keys(self, client, auth_headers):
+        response = self._post(client, auth_headers, market_share_data={'2023': [20.0] * 12, '2024': [22.0] * 12})
+        assert response.status_code == 200
+        assert len(response.get_json()['ms_adjustments']) == 12
+
+    def test_non_numeric_years_are_rejected(self, client, auth_headers):
+        response = self._post(client, auth_headers, market_share_data={'FY24': [20.0] * 12})
+        assert response.status_code == 400
+        assert response.get_json() == {'success': False, 'message': "market_share_data key must be a year, got 'FY24'"}
+        assert self._post(client, auth_headers, selected_year=None).status_code == 400
+
+class TestExportRoute:
+    def _labels(self, client, auth_headers, **payload):
+        response = client.post('/api/forecast/export', headers=auth_headers, json={'product': 'ZZ', 'year': 2026, **payload})
+        assert response.status_code == 200
+        return [line.split(',')[3] for line in response.get_json()['csv_content'].splitlines()[1:]]
+
+    def test_labels_follow_the_declared_periods(self, client, auth_headers):
+        # A partial weekly series still gets the weeks of its year
+        assert self._labels(client, auth_headers, year=2025, periods=53, baseline=[1.0] * 20) == [f"W{w:02d}" for w in range(1, 53)]
+        # A padded monthly series keeps month labels
+        assert self._labels(client, auth_headers, periods=12, baseline=[1.0] * 13) == MONTHS
+        assert self._labels(client, auth_headers, simulated=[1.0] * 30) == MONTHS
@@ -0,0 +1,48 @@
+import pytest
+import sys
+import os
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.utils.timing import StageTimer, current_timer, NULL_TIMER
+
+class TestStageTimer:
+    def test_laps_partition_the_total(self):
+        timer = StageTimer()
+        time.sleep(0.002)
+        timer.lap('read')
+        timer.lap('parse')
+        time.sleep(0.002)
+        timer.lap('read')
+        timings = timer.as_dict()
+        assert list(timings) == ['read', 'parse', 'total']
+        assert timings['read'] >= 4
+        assert timings['read'] + timings['parse'] <= timings['total']
+        assert timer.header().startswith('read;dur=')
+        assert current_timer() is NULL_TIMER
+
+class TestServerTiming:
+    def stages(self, response):
+        return [part.split(';')[0] for part in response.headers['Server-Timing'].split(', ')]
+
+    def test_simulate_stages(self, client, auth_headers):
+        response = client.post('/api/forecast/simulate?timing=1', headers=auth_headers, json={
+            'baseline_vals': [100.0] * 12,
+            'weights': {'UpromoUp': [1.1] * 12},
+            'promo_settings': {'month': 'Mar', 'pct': 10},
+            'selected_year': 2025
+        })
+        assert response.status_code == 200
+        assert self.stages(response) == [
+            'json', 'market_share', 'calendar', 'toggles', 'events', 'dampening',
+            'apply', 'exceeded', 'serialize', 'total'
+        ]
+        assert set(response.get_json()['timing']) >= {'json', 'events', 'exceeded', 'total'}
+
+    def test_data_stages(self, client, auth_headers):
+        response = client.get('/api/forecast/data/NONE', headers=auth_headers)
+        assert response.status_code == 404
+        assert self.stages(response)[0] == 'dataset'
+        assert 'timing' not in response.get_json()
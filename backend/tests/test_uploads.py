@@ -0,0 +1,59 @@
+import pytest
+import sys
+import os
+import io
+import pandas as pd
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from app.utils.uploads import spool_upload, upload_extension, UploadTooLarge
+from app.services.ingestion import IngestionService
+from app.utils.constants import MONTHS
+
+class TestSpoolUpload:
+    def test_spools_in_chunks(self, tmp_path):
+        src = tmp_path / 'src.bin'
+        src.write_bytes(b'x' * 2500)
+        path = spool_upload(str(src), str(tmp_path / 'out.bin'), chunk_size=1000)
+        assert open(path, 'rb').read() == b'x' * 2500
+        assert upload_extension('Data.XLS') == '.xls'
+
+    def test_size_cap_leaves_nothing(self, tmp_path):
+        src = tmp_path / 'src.bin'
+        src.write_bytes(b'x' * (2 * 1024 * 1024))
+        with pytest.raises(UploadTooLarge):
+            spool_upload(str(src), str(tmp_path / 'out.bin'), max_bytes=1024 * 1024)
+        assert not os.path.exists(tmp_path / 'out.bin')
+
+    def test_ingestion_spools_within_upload_cap(self, tmp_path):
+        src = tmp_path / 'big.xlsx'
+        src.write_bytes(b'x' * 4096)
+        service = IngestionService(jobs_dir=str(tmp_path / 'jobs'), parse_processes=0)
+        service.max_upload_bytes = 1024
+        with pytest.raises(UploadTooLarge):
+            service.submit(str(src), 'HP')
+        assert [n for n in os.listdir(tmp_path / 'jobs') if not n.endswith('.json')] == []
+
+class TestUploadRoutes:
+    def workbook(self):
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer) as writer:
+            pd.DataFrame([[2025] + [1.0] * 12], columns=['Year'] + MONTHS).to_excel(writer, sheet_name='Baseline', index=False)
+        buffer.seek(0)
+        return buffer
+
+    def test_preview_from_spooled_file(self, client, auth_headers):
+        response = client.post('/api/admin/preview', headers=auth_headers, data={
+            'file': (self.workbook(), 'upload.xlsx')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.get_json()['sheets']['Baseline']['row_count'] == 1
+
+    def test_upload_cap_returns_json(self, app, client, auth_headers):
+        app.config['MAX_CONTENT_LENGTH'] = 1024
+        response = client.post('/api/admin/preview', headers=auth_headers, data={
+            'file': (io.BytesIO(b'x' * 4096), 'upload.xlsx')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 413
+        assert response.get_json()['success'] is False
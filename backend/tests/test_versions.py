@@ -0,0 +1,113 @@
+import pytest
+import os
+import time
+import threading
+
+from app.services.excel_handler import excel_handler
+from app.services.data_store import data_store
+from app.utils.versions import DatasetVersions
+
+class TestDatasetVersions:
+    @pytest.fixture
+    def store(self, store, tmp_path, write_yearly):
+        write_yearly(tmp_path / 'CN_post_processed.csv', {2025: [100.0] * 12})
+        write_yearly(tmp_path / 'CN_actual.csv', {2025: [90.0] * 12})
+        return store
+
+    def test_first_commit_migrates_flat_directory(self, tmp_path, store, write_yearly):
+        versions = store.handler.versions
+        assert versions.current() is None
+        with versions.pin():
+            assert store.product('CN').baseline[2025][0] == 100.0
+            with versions.commit() as staged:
+                write_yearly(os.path.join(staged, 'CN_post_processed.csv'), {2025: [120.0] * 12})
+            # A reader pinned to the flat root keeps its files and its data
+            assert os.path.exists(tmp_path / 'CN_actual.csv')
+            assert store.product('CN').baseline[2025][0] == 100.0
+            with staged.pin():
+                assert store.version() == staged.version == versions.current()
+                assert store.product('CN').baseline[2025][0] == 120.0
+        assert store.handler.data_dir == str(tmp_path / 'versions' / staged.version)
+        assert sorted(os.listdir(store.handler.data_dir)) == ['CN_actual.csv', 'CN_post_processed.csv']
+
+        # The flat files go once they would have been pruned as a version
+        for value in range(versions.keep - 1):
+            assert os.path.exists(tmp_path / 'CN_actual.csv')
+            with versions.commit() as staged:
+                write_yearly(os.path.join(staged, 'CN_post_processed.csv'), {2025: [float(value)] * 12})
+        assert not os.path.exists(tmp_path / 'CN_actual.csv')
+        assert os.path.exists(tmp_path / 'versions' / versions.current() / 'CN_actual.csv')
+
+    def test_pinned_reader_keeps_its_version(self, store, write_yearly):
+        versions = store.handler.versions
+        with versions.commit():
+            pass
+        assert versions.current() is None  # nothing changed, nothing published
+
+        with versions.commit() as staging:
+            write_yearly(os.path.join(staging, 'CN_post_processed.csv'), {2025: [110.0] * 12})
+        with versions.pin():
+            old = store.version()
+            with versions.commit() as staging:
+                write_yearly(os.path.join(staging, 'CN_post_processed.csv'), {2025: [130.0] * 12})
+                os.remove(os.path.join(staging, 'CN_actual.csv'))
+            assert store.version() == old
+            assert store.product('CN').baseline[2025][0] == 110.0
+            assert store.product('CN').actual[2025][0] == 90.0
+        assert store.version() == versions.current() != old
+        assert store.product('CN').baseline[2025][0] == 130.0
+        assert len(store.product('CN').actual) == 0
+        assert store.load_stats == {'read': 2, 'reused': 3}
+
+    def test_loaded_version_served_while_next_loads(self, store, write_yearly):
+        versions = store.handler.versions
+        with versions.commit() as staged:
+            write_yearly(os.path.join(staged, 'CN_post_processed.csv'), {2025: [110.0] * 12})
+        load, started, release, results = store._load, threading.Event(), threading.Event(), []
+
+        def slow_load(*args):
+            started.set()
+            release.wait(5)
+            return load(*args)
+
+        with versions.pin():
+            assert store.product('CN').baseline[2025][0] == 110.0
+            with versions.commit() as staged:
+                write_yearly(os.path.join(staged, 'CN_post_processed.csv'), {2025: [130.0] * 12})
+            store._load = slow_load
+            reader = threading.Thread(target=lambda: results.append(store.product('CN').baseline[2025][0]))
+            reader.start()
+            assert started.wait(5)
+            # The pinned version is served while the new one loads
+            waited = time.perf_counter()
+            assert store.product('CN').baseline[2025][0] == 110.0
+            assert time.perf_counter() - waited < 2
+            release.set()
+            reader.join(5)
+        assert results == [130.0]
+
+    def test_failed_commit_publishes_nothing(self, store, write_yearly):
+        versions = store.handler.versions
+        with pytest.raises(ValueError):
+            with versions.commit() as staging:
+                write_yearly(os.path.join(staging, 'CN_post_processed.csv'), {2025: [1.0] * 12})
+                raise ValueError('bad sheet')
+        assert versions.current() is None
+        assert store.product('CN').baseline[2025][0] == 100.0
+
+    def test_old_versions_pruned(self, tmp_path, store, write_yearly):
+        versions = store.handler.versions
+        for value in range(5):
+            with versions.commit() as staging:
+                write_yearly(os.path.join(staging, 'CN_post_processed.csv'), {2025: [float(value)] * 12})
+        published = sorted(os.listdir(tmp_path / 'versions'))
+        assert len(published) == versions.keep
+        assert published[-1] == versions.current()
+
+    def test_admin_delete_refreshes_the_published_version(self, tmp_path, store, write_yearly, client, auth_headers, monkeypatch):
+        write_yearly(tmp_path / 'HP_post_processed.csv', {2025: [50.0] * 12})
+        monkeypatch.setattr(excel_handler, 'versions', DatasetVersions(str(tmp_path)))
+        response = client.delete('/api/admin/delete/HP', headers=auth_headers)
+        assert response.get_json()['deleted_files'] == ['HP_post_processed.csv']
+        entry = data_store._loaded[excel_handler.versions.current()]
+        assert list(entry['derived']['aggregates']['products']) == ['CN']
@@ -36,7 +36,59 @@ export const adminService = {
         'Content-Type': 'multipart/form-data',
       },
     });
-    return response.data;
+    return this.waitForJob(response.data);
+  },
+
+  async uploadBulk(file) {
+    const formData = new FormData();
+    formData.append('file', file);
+
+    const response = await api.post('/admin/upload/bulk', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return this.waitForJob(response.data);
+  },
+
+  // Ingestion runs in the background; poll the job until it finishes,
+  // giving up after timeoutMs (the job may still finish on the server)
+  async waitForJob(queued, timeoutMs = 30 * 60 * 1000) {
+    if (!queued.job_id) {
+      return queued;
+    }
+
+    const deadline = Date.now() + timeoutMs;
+    let job = null;
+    do {
+      if (Date.now() > deadline) {
+        const message = `Upload is still processing after ${Math.round(timeoutMs / 60000)} minutes; check the job status later`;
+        return {
+          success: false,
+          message,
+          files_created: [],
+          warnings: job?.warnings || [],
+          errors: [message],
+          job,
+        };
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+      job = await this.getJob(queued.job_id);
+    } while (job.status === 'queued' || job.status === 'running');
+
+    return {
+      success: job.status === 'done',
+      message: job.message,
+      files_created: job.files_created,
+      warnings: job.warnings,
+      errors: job.status === 'failed' ? [job.message] : [],
+      job,
+    };
+  },
+
+  async getJob(jobId) {
+    const response = await api.get(`/admin/jobs/${jobId}`);
+    return response.data.job;
   },
 
   async downloadTemplate(product, includeAps = false) {